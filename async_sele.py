@@ -0,0 +1,238 @@
+"""
+asyncio front end for Sele classes.
+WebDriver calls block, so an AsyncSele session runs its Sele on a dedicated
+single thread executor, one command at a time as chromedriver expects, and
+the coroutines awaiting it only wait. One event loop can then drive several
+sessions and HTTP fetches together, await them with timeouts, gather and
+cancel them, e.g. reading @static_page scenarios over HTTP while browser
+sessions run the others. A scenario that times out or is cancelled cannot
+be stopped inside its thread, so its session is discarded, which makes the
+blocked WebDriver call fail, and the session is closed from another thread.
+Set {"orchestration": "async"} in the event to run the handler scenarios this
+way, at most "concurrency" sessions at a time and each scenario within
+"scenario_timeout" seconds.
+"""
+import asyncio
+import functools
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.client import HTTPException
+from scenario_runner import (event_option, keep, merge_report, by_priority,
+                             record_duration, deadline_for, run_scenarios)
+from scenario_planner import page_groups
+from http_fast_path import (HTTP, fast_path_enabled, static_candidates, read_static, settle,
+                            run_static_first)
+from navigation import rewrite_url
+from structured_log import get_logger
+
+LOG = get_logger(__name__)
+
+HTTP_WORKERS = 8
+
+HTTP_EXECUTOR = ThreadPoolExecutor(max_workers=HTTP_WORKERS, thread_name_prefix="http")
+
+
+async def fetch(event, url, timeout=None):
+    """
+    :param event: aws event, for base_urls
+    :param url: absolute http or https url
+    :param timeout: seconds to wait for the response, None to wait
+    :return: (final url, body bytes, charset or None) read over the pooled
+             keep-alive connections
+    """
+    loop = asyncio.get_running_loop()
+    return await asyncio.wait_for(
+        loop.run_in_executor(HTTP_EXECUTOR, HTTP.get, rewrite_url(event, url)), timeout)
+
+
+class AsyncSele:
+    """
+    Awaitable wrapper of one Sele session, use it as
+    async with AsyncSele(Sele, event) as session:
+        result = await session.scenario("steam_get_text", timeout=30)
+    """
+
+    def __init__(self, sele_class, event):
+        self.sele = sele_class(event)
+        self.event = event
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="sele")
+        self.closing = None
+
+    async def run(self, func, *args):
+        """
+        :param func: callable touching the session
+        :param args: its arguments
+        :return: what func returns, run on the session thread
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, func, *args)
+
+    async def __aenter__(self):
+        try:
+            await self.run(self.sele.__enter__)
+        except BaseException:
+            self.executor.shutdown(wait=False)
+            raise
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        try:
+            if self.closing is not None:
+                await self.closing
+                suppressed = True
+            else:
+                suppressed = await self.run(self.sele.__exit__, exc_type, exc_val, exc_tb)
+        finally:
+            self.executor.shutdown(wait=False)
+        return suppressed and not (exc_type and issubclass(exc_type, asyncio.CancelledError))
+
+    def abandon(self, exc_type):
+        """
+        Discard the session while a call is still running on its thread.
+        :param exc_type: exception that ended the wait
+        """
+        if self.closing is None:
+            loop = asyncio.get_running_loop()
+            self.closing = loop.run_in_executor(None, self.sele.__exit__, exc_type, None, None)
+
+    async def call(self, name, *args, timeout=None):
+        """
+        :param name: Sele method name
+        :param args: its arguments
+        :param timeout: seconds to wait, None to wait until it returns
+        :return: what the method returns
+        :raises asyncio.TimeoutError: when it took longer, the session is then abandoned
+        """
+        if self.closing is not None:
+            raise RuntimeError("Session was abandoned")
+        try:
+            return await asyncio.wait_for(self.run(getattr(self.sele, name), *args), timeout)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as error:
+            self.abandon(type(error))
+            raise
+
+    async def scenario(self, name, timeout=None):
+        """
+        :param name: scenario method name
+        :param timeout: seconds to wait, None to wait until it returns
+        :return: scenario result, its duration is recorded for the scheduler
+        """
+        start = time.time()
+        try:
+            result = await self.call(name, timeout=timeout)
+        except asyncio.TimeoutError:
+            raise
+        except Exception as error:
+            LOG.error("scenario failed", scenario=name, error=error)
+            raise
+        record_duration(name, time.time() - start)
+        return result
+
+
+async def gather_scenarios(sele_class, event, scenarios, report=None, sink=None, deadline=None,
+                           fast_path=False):
+    """
+    Run scenarios on at most "concurrency" sessions at once. The scenarios of
+    one page run one after another on the same session in planned order.
+    With fast_path, @static_page scenarios are first fetched over HTTP
+    alongside the browser sessions and only go to Chrome when that fails.
+    A scenario that raises, or the first one of a session that cannot be
+    launched, is listed under "failed" and the rest of its page under "skipped".
+    :param sele_class: Sele class of the calling module
+    :param event: aws event
+    :param scenarios: dict of output key -> method name
+    :param report: optional dict collecting the report sections of the sessions
+    :param sink: optional NdjsonSink receiving each result as it finishes
+    :param deadline: time.time() after which unfinished scenarios are cancelled
+    :param fast_path: try the HTTP fast path of http_fast_path first
+    :return: dict of output key -> scenario result for the completed ones
+    """
+    sessions = asyncio.Semaphore(max(1, int(event_option(event, "concurrency", 1))))
+    timeout = event_option(event, "scenario_timeout")
+    finished, timed_out, failed = {}, [], []
+    paths = {"http": [], "browser": []}
+    static = []
+    if fast_path and fast_path_enabled(event):
+        static = static_candidates(sele_class, scenarios, paths)
+    fetched = {key for key, _, _, _ in static}
+
+    async def run_group(group):
+        async with sessions:
+            session = AsyncSele(sele_class, event)
+            running = None
+            try:
+                async with session:
+                    for key, name in group:
+                        running = key
+                        try:
+                            result = await session.scenario(name, timeout)
+                        except asyncio.TimeoutError:
+                            timed_out.append(key)
+                            running = None
+                            break
+                        running = None
+                        keep(finished, key, result, sink)
+                if running is not None:
+                    failed.append(running)
+            except Exception as error:  # pylint: disable=broad-except
+                LOG.error("session failed", keys=[key for key, _ in group], error=error)
+                failed.append(group[0][0] if running is None else running)
+            finally:
+                merge_report(report, session.sele.report)
+
+    async def run_static(key, name, url, page):
+        try:
+            _, body, charset = await fetch(event, url)
+            text = read_static(url, body, charset, page)
+        except (OSError, HTTPException) as error:
+            LOG.warning("fast path fetch failed", url=url, error=error)
+            text = None
+        settle(paths, key, name, url, text)
+        if text is None:
+            await run_group([(key, name)])
+        else:
+            keep(finished, key, text, sink)
+
+    browser = {key: name for key, name in scenarios.items() if key not in fetched}
+    runs = asyncio.gather(*[run_static(*candidate) for candidate in static] + [
+        run_group(group) for group in by_priority(event, page_groups(sele_class, browser))])
+    try:
+        await asyncio.wait_for(runs, None if deadline is None else max(0, deadline - time.time()))
+    except asyncio.TimeoutError:
+        LOG.warning("deadline reached", finished=len(finished), total=len(scenarios))
+    if static and report is not None:
+        report["fast_path"] = paths
+    skipped = [key for key in scenarios
+               if key not in finished and key not in timed_out and key not in failed]
+    merge_report(report, {"skipped": skipped, "timed_out": timed_out, "failed": failed})
+    return {key: finished[key] for key in scenarios if key in finished}
+
+
+def run_async(sele_class, event, scenarios, report=None, sink=None, context=None,
+              fast_path=False):
+    """
+    run_scenarios on an event loop, scenarios still running at the Lambda
+    deadline are cancelled and listed as skipped.
+    :param sele_class: Sele class of the calling module
+    :param event: aws event
+    :param scenarios: dict of output key -> method name
+    :param report: optional dict collecting the report sections of the sessions
+    :param sink: optional NdjsonSink receiving each result as it finishes
+    :param context: aws context, for its deadline
+    :param fast_path: try the HTTP fast path first, see gather_scenarios
+    :return: dict of output key -> scenario result
+    """
+    return asyncio.run(gather_scenarios(sele_class, event, scenarios, report, sink,
+                                        deadline_for(event, context), fast_path))
+
+
+def runner_for(event, fast_path=False):
+    """
+    :param event: aws event
+    :param fast_path: serve @static_page scenarios over HTTP when possible
+    :return: run_async when the event sets "orchestration" to "async", else
+             run_scenarios, or run_static_first with fast_path
+    """
+    if event_option(event, "orchestration") == "async":
+        return functools.partial(run_async, fast_path=fast_path)
+    return run_static_first if fast_path else run_scenarios
@@ -0,0 +1,157 @@
+"""
+Local HTTP server for the benchmark suite.
+Serves recorded pages that are structurally equivalent to the live sites the
+Sele scenarios visit, so a run does not depend on tech.gov.sg, Steam or Expedia.
+"""
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from string import Template
+from urllib.parse import urlsplit, parse_qs, quote
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+PAGE_SIZE = 25
+TOTAL = 175
+TAGS = ["Indie", "Action", "Adventure", "Casual", "Simulation", "Strategy", "RPG", "Free to Play"]
+PLAYERS = ["Single-player", "Online Multi-Player", "Local Multi-Player", "Online Co-op"]
+PIXEL = bytes.fromhex("47494638396101000100800000ffffff00000021f90401000000002c"
+                      "00000000010001000002024401003b")
+
+ROUTES = {
+    "/govtech": ("govtech.html", "Home"),
+    "/govtech/digital-government-transformation": ("govtech.html", "Digital Government"),
+    "/govtech/who-we-are/our-role": ("govtech.html", "Our Role"),
+    "/govtech/careers/overview": ("govtech.html", "Careers"),
+    "/govtech/media": ("govtech.html", "Media"),
+    "/govtech/contact-us": ("govtech.html", "Contact Us"),
+    "/steam": ("steam_store.html", "Store"),
+    "/steam/search": ("steam_search.html", "Search"),
+    "/steam/login": ("steam_login.html", "Sign In"),
+    "/steam/account": ("steam_account.html", "Account"),
+    "/steam/account/details": ("plain.html", "Account details"),
+    "/steam/stats": ("plain.html", "Steam & Game Stats"),
+    "/community": ("plain.html", "Steam Community"),
+    "/expedia": ("expedia.html", "Expedia")
+}
+
+BASE_URLS = {
+    "https://www.tech.gov.sg": "/govtech",
+    "https://store.steampowered.com": "/steam",
+    "https://steamcommunity.com": "/community",
+    "https://www.expedia.com.sg": "/expedia"
+}
+
+
+def result_rows(term, page, label=""):
+    """
+    :param term: search term
+    :param page: 1 based page number
+    :param label: filter the rows were narrowed by
+    :return: html of one page of search result rows
+    """
+    first = (page - 1) * PAGE_SIZE + 1
+    return "\n".join(
+        '<a class="search_result_row" href="/steam/app/{0}/">'
+        '<span class="title">{1} Game {0} {2}</span>'
+        '<span class="search_price">S${3}.99</span></a>'.format(
+            number, term.upper() or "Fixture", label, number % 60)
+        for number in range(first, first + PAGE_SIZE))
+
+
+def filter_rows(names):
+    """
+    :param names: filter labels
+    :return: html of clickable filter rows
+    """
+    return "\n".join(
+        '<div class="tab_filter_control" onclick="toggleFilter(this)">{}</div>'.format(name)
+        for name in names)
+
+
+def paragraphs(count):
+    """
+    :param count: number of filler blocks
+    :return: html filler so pages have a realistic number of elements
+    """
+    return "\n".join(
+        '<div class="card"><h3>Item {0}</h3><p>Fixture text {0} about a, b and c.</p>'
+        '<a href="#item{0}">Read more</a></div>'.format(number) for number in range(count))
+
+
+def render(path, query):
+    """
+    :param path: request path without query string or trailing slash
+    :param query: parsed query string
+    :return: html body or None for an unknown path
+    """
+    if path == "/steam/search/results":
+        return result_rows("", 1, query.get("filter", [""])[0])
+    if path not in ROUTES:
+        return None
+    if "slow" in query:
+        return render(path, {key: value for key, value in query.items() if key != "slow"}).replace(
+            "</body>", '<img src="/slow?ms={}"></body>'.format(query["slow"][0]))
+    name, title = ROUTES[path]
+    with open(os.path.join(FIXTURES, name)) as fixture:
+        template = Template(fixture.read())
+    term = query.get("term", [""])[0]
+    page = int(query.get("page", ["1"])[0])
+    rows = result_rows(term, page) if name == "steam_search.html" else paragraphs(60)
+    return template.safe_substitute(
+        title=title, rows=rows, term=quote(term), start=(page - 1) * PAGE_SIZE + 1,
+        end=min(page * PAGE_SIZE, TOTAL), next=page + 1,
+        tags=filter_rows(TAGS), players=filter_rows(PLAYERS))
+
+
+class FixtureHandler(BaseHTTPRequestHandler):
+    """
+    GET only, every route renders a fixture template
+    """
+
+    def do_GET(self):  # pylint: disable=invalid-name
+        """
+        Serve the fixture page matching the request path
+        """
+        parts = urlsplit(self.path)
+        if parts.path == "/slow":
+            self.send_slow_pixel(int(parse_qs(parts.query).get("ms", ["1000"])[0]))
+            return
+        body = render(parts.path.rstrip("/") or "/", parse_qs(parts.query))
+        if body is None:
+            self.send_error(404)
+            return
+        data = body.encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def send_slow_pixel(self, delay_ms):
+        """
+        Hold back the load event of the page embedding it, like a slow third party image
+        :param delay_ms: milliseconds to wait before answering
+        """
+        time.sleep(delay_ms / 1000.0)
+        self.send_response(200)
+        self.send_header("Content-Type", "image/gif")
+        self.send_header("Content-Length", str(len(PIXEL)))
+        self.end_headers()
+        self.wfile.write(PIXEL)
+
+    def log_message(self, *args):
+        """
+        Keep benchmark output readable
+        """
+
+
+def start(port=0):
+    """
+    :param port: port to listen on, 0 picks a free one
+    :return: (server, {live origin: local url}) with the server running in a thread
+    """
+    server = ThreadingHTTPServer(("127.0.0.1", port), FixtureHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    root = "http://127.0.0.1:{}".format(server.server_address[1])
+    return server, {origin: root + path for origin, path in BASE_URLS.items()}
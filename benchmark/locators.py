@@ -0,0 +1,107 @@
+"""
+Micro-benchmark of the locator compiler rewrite rules.
+Run from the repository root:
+    python -m benchmark.locators --repeat 200
+Every case is looked up --repeat times as written and as compiled, through
+WebDriver (round-trip included) and inside the page (evaluation only), on the
+local fixture server. Results are written to
+benchmark/results/locators-<commit>.json.
+"""
+import argparse
+import json
+import os
+import statistics
+import time
+from selenium.webdriver.common.by import By
+import method_property
+from bulk_query import LOCATE_JS
+from locator_compiler import compile_xpath
+from benchmark import fixture_server
+from benchmark.run import RESULTS, commit_id
+
+CASES = [
+    ("https://store.steampowered.com/search", "//*[@id='search_results']"),
+    ("https://store.steampowered.com/login", "//*[@name='username']"),
+    ("https://store.steampowered.com/search", "//html"),
+    ("https://store.steampowered.com/search", "//div[@id='search_results']"),
+    ("https://store.steampowered.com/search", "//input[@id='store_nav_search_term']"),
+    ("https://store.steampowered.com/search",
+     "//div[@id='additional_search_options']//div[2]//a[1]"),
+    ("https://store.steampowered.com/", "//*[@type]"),
+    ("https://store.steampowered.com/login", "//button[contains(@class,'btn_medium')]")
+]
+
+IN_PAGE_JS = LOCATE_JS + """
+var start = performance.now();
+for (var i = 0; i < arguments[2]; i++) { locate(arguments[0], arguments[1]); }
+return (performance.now() - start) * 1000 / arguments[2];
+"""
+
+
+def round_trip_ms(driver, by, value, repeat):
+    """
+    :param driver: WebDriver on the case page
+    :param by: selenium By strategy
+    :param value: locator value
+    :param repeat: lookups to time
+    :return: median milliseconds of one find_elements call
+    """
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        driver.find_elements(by, value)
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+def measure(driver, xpath, repeat):
+    """
+    :param driver: WebDriver on the case page
+    :param xpath: locator as written in a scenario
+    :param repeat: lookups to time
+    :return: json ready timings of the XPath and its compiled form
+    """
+    by, value, rule = compile_xpath(xpath)
+    xpath_ms = round_trip_ms(driver, By.XPATH, xpath, repeat)
+    compiled_ms = round_trip_ms(driver, by, value, repeat)
+    xpath_us = driver.execute_script(IN_PAGE_JS, By.XPATH, xpath, repeat)
+    compiled_us = driver.execute_script(IN_PAGE_JS, by, value, repeat)
+    return {
+        "rule": rule,
+        "compiled": [by, value],
+        "round_trip_ms": [round(xpath_ms, 3), round(compiled_ms, 3)],
+        "in_page_us": [round(xpath_us, 2), round(compiled_us, 2)],
+        "gain_ms": round(xpath_ms - compiled_ms, 3)
+    }
+
+
+def main():
+    """
+    Command line entry point
+    """
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--repeat", type=int, default=100)
+    args = parser.parse_args()
+
+    server, base_urls = fixture_server.start()
+    results = {}
+    try:
+        with method_property.Sele({"base_urls": base_urls}) as sele:
+            for url, xpath in CASES:
+                sele.navigate(url, force=True)
+                results[xpath] = measure(sele.driver, xpath, args.repeat)
+                print("{}: {}".format(xpath, results[xpath]))
+    finally:
+        server.shutdown()
+
+    commit = commit_id()
+    os.makedirs(RESULTS, exist_ok=True)
+    path = os.path.join(RESULTS, "locators-{}.json".format(commit))
+    with open(path, "w") as output:
+        json.dump({"commit": commit, "created": time.time(), "repeat": args.repeat,
+                   "cases": results}, output, indent=2)
+    print("Results written to " + path)
+
+
+if __name__ == '__main__':
+    main()
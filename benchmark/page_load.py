@@ -0,0 +1,75 @@
+"""
+Benchmark of the page load strategies behind @scenario(load=...).
+Run from the repository root:
+    python -m benchmark.page_load --repeat 10 --delay 1500
+A fixture page whose load event is held back by a slow image is loaded
+--repeat times with every navigate load on sessions launched with the
+"normal" and the "eager" pageLoadStrategy. Only an eager session lets
+"eager" and "none" return before the image. Results are written to
+benchmark/results/page_load-<commit>.json.
+"""
+import argparse
+import json
+import os
+import statistics
+import time
+from selenium.webdriver.common.by import By
+import method_property
+from benchmark import fixture_server
+from benchmark.run import RESULTS, commit_id
+
+URL = "https://www.tech.gov.sg/media/?slow={}"
+READY = (By.TAG_NAME, "h1")
+SESSIONS = ["normal", "eager"]
+LOADS = ["normal", "eager", "none"]
+
+
+def load_ms(sele, url, load, repeat):
+    """
+    :param sele: entered Sele instance
+    :param url: page to load
+    :param load: navigate load strategy
+    :param repeat: loads to time
+    :return: median milliseconds until navigate returned
+    """
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        sele.navigate(url, force=True, load=load, ready=READY)
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+def main():
+    """
+    Command line entry point
+    """
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--delay", type=int, default=1500, help="image delay in ms")
+    args = parser.parse_args()
+
+    server, base_urls = fixture_server.start()
+    url = URL.format(args.delay)
+    results = {}
+    try:
+        for session in SESSIONS:
+            event = {"base_urls": base_urls, "page_load": session}
+            with method_property.Sele(event) as sele:
+                results[session] = {load: round(load_ms(sele, url, load, args.repeat), 1)
+                                    for load in LOADS}
+            print("{} session: {}".format(session, results[session]))
+    finally:
+        server.shutdown()
+
+    commit = commit_id()
+    os.makedirs(RESULTS, exist_ok=True)
+    path = os.path.join(RESULTS, "page_load-{}.json".format(commit))
+    with open(path, "w") as output:
+        json.dump({"commit": commit, "created": time.time(), "repeat": args.repeat,
+                   "delay_ms": args.delay, "load_ms": results}, output, indent=2)
+    print("Results written to " + path)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,209 @@
+"""
+Offline benchmark of the Sele scenarios against the local fixture server.
+Run from the repository root:
+    python -m benchmark.run --runs 5
+Every scenario of find_element, work_element, method_property and wait_types
+is run --runs times. Wall time, WebDriver command count and peak Chrome RSS are
+written to benchmark/results/<commit>.json, --compare prints the change
+against an earlier result file.
+"""
+import argparse
+import importlib
+import json
+import os
+import statistics
+import subprocess
+import threading
+import time
+from scenario_planner import target_of
+from benchmark import fixture_server
+
+MODULES = ["find_element", "work_element", "method_property", "wait_types"]
+RESULTS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+RSS_INTERVAL = 0.05
+
+
+def process_tree(root_pid):
+    """
+    :param root_pid: chromedriver pid
+    :return: pids of root_pid and all its descendants, read from /proc
+    """
+    parents = {}
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open("/proc/{}/stat".format(entry)) as stat:
+                fields = stat.read().rsplit(")", 1)[1].split()
+        except OSError:
+            continue
+        parents.setdefault(int(fields[1]), []).append(int(entry))
+    tree, pending = [], [root_pid]
+    while pending:
+        pid = pending.pop()
+        tree.append(pid)
+        pending.extend(parents.get(pid, []))
+    return tree
+
+
+def rss_bytes(pids):
+    """
+    :param pids: process ids
+    :return: summed resident set size in bytes
+    """
+    total = 0
+    for pid in pids:
+        try:
+            with open("/proc/{}/statm".format(pid)) as statm:
+                total += int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+        except OSError:
+            continue
+    return total
+
+
+class RssSampler:
+    """
+    Sample the RSS of the Chrome process tree in a background thread
+    """
+
+    def __init__(self, driver):
+        self.root_pid = driver.service.process.pid
+        self.peak = 0
+        self.running = False
+        self.thread = threading.Thread(target=self.sample, daemon=True)
+
+    def __enter__(self):
+        self.running = True
+        self.thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.running = False
+        self.thread.join()
+
+    def sample(self):
+        """
+        Keep the largest RSS seen until the sampler exits
+        """
+        while self.running:
+            self.peak = max(self.peak, rss_bytes(process_tree(self.root_pid)))
+            time.sleep(RSS_INTERVAL)
+
+
+def run_scenario(module, name, event, setup=None):
+    """
+    :param module: imported scenario module
+    :param name: scenario method name
+    :param event: event pointing the Sele class at the fixture server
+    :param setup: untimed scenario to run first, for scenarios that continue
+                  on the page left by the previous one
+    :return: wall seconds, WebDriver command count, peak Chrome RSS in bytes
+    """
+    sele = module.Sele(event)
+    with sele:
+        if setup is not None:
+            getattr(sele, setup)()
+        with RssSampler(sele.driver) as sampler:
+            start = time.perf_counter()
+            getattr(sele, name)()
+            wall = time.perf_counter() - start
+    commands = sele.report.get("timings", {}).get(name, {}).get("*", {}).get("count", 0)
+    return wall, commands, sampler.peak
+
+
+def summarize(samples):
+    """
+    :param samples: list of (wall, commands, rss) tuples of one scenario
+    :return: json ready statistics
+    """
+    walls = [sample[0] for sample in samples]
+    return {
+        "runs": len(samples),
+        "wall_min": round(min(walls), 4),
+        "wall_median": round(statistics.median(walls), 4),
+        "wall_max": round(max(walls), 4),
+        "commands": max(sample[1] for sample in samples),
+        "peak_rss_mb": round(max(sample[2] for sample in samples) / 2 ** 20, 1)
+    }
+
+
+def commit_id():
+    """
+    :return: short hash of HEAD, "worktree" outside of git
+    """
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "worktree"
+
+
+def benchmark(runs, modules, event_options):
+    """
+    :param runs: repetitions per scenario
+    :param modules: names of the scenario modules to run
+    :param event_options: extra event keys, e.g. a resource profile
+    :return: {"module.scenario key": statistics}
+    """
+    server, base_urls = fixture_server.start()
+    event = dict(event_options, base_urls=base_urls, timings=True)
+    results = {}
+    try:
+        for module_name in modules:
+            module = importlib.import_module(module_name)
+            previous = None
+            for key, name in module.SCENARIOS.items():
+                setup = previous if target_of(module.Sele, name).url is None else None
+                samples = [run_scenario(module, name, event, setup) for _ in range(runs)]
+                label = "{}.{}".format(module_name, key)
+                results[label] = summarize(samples)
+                print("{}: {}".format(label, results[label]))
+                previous = name
+    finally:
+        server.shutdown()
+    return results
+
+
+def compare(current, previous_path):
+    """
+    Print the median wall time and command count change per scenario.
+    :param current: results of this run
+    :param previous_path: json file written by an earlier run
+    """
+    with open(previous_path) as previous_file:
+        previous = json.load(previous_file)["scenarios"]
+    for key, stats in current.items():
+        before = previous.get(key)
+        if before is None:
+            continue
+        print("{}: wall {:+.3f}s, commands {:+d}".format(
+            key, stats["wall_median"] - before["wall_median"],
+            stats["commands"] - before["commands"]))
+
+
+def main():
+    """
+    Command line entry point
+    """
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--modules", nargs="+", default=MODULES)
+    parser.add_argument("--resources", help="resource profile to run under")
+    parser.add_argument("--compare", help="earlier result file to compare with")
+    args = parser.parse_args()
+
+    event_options = {"resources": args.resources} if args.resources else {}
+    results = benchmark(args.runs, args.modules, event_options)
+    commit = commit_id()
+    os.makedirs(RESULTS, exist_ok=True)
+    path = os.path.join(RESULTS, "{}.json".format(commit))
+    with open(path, "w") as output:
+        json.dump({"commit": commit, "created": time.time(), "runs": args.runs,
+                   "event": event_options, "scenarios": results}, output, indent=2)
+    print("Results written to " + path)
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == '__main__':
+    main()
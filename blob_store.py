@@ -0,0 +1,78 @@
+"""
+Content-hash deduplication of page text in handler results.
+Most scenarios end by reading //body, often from a page another scenario
+already read. With {"dedupe": true} every long string is stored once under
+its sha256 and the result refers to it as {"blob": hash}. With
+{"dedupe": "diff"} a text close to an earlier blob is sent as a unified diff
+against it instead: {"base": hash, "diff": [lines]}.
+"""
+import difflib
+import hashlib
+from collections import OrderedDict
+
+MIN_BLOB = 1024
+MAX_DIFF_RATIO = 0.5
+
+
+class BlobStore:
+    """
+    Distinct texts keyed by hash, in the order they were first seen
+    """
+
+    def __init__(self, diffs=False, min_blob=MIN_BLOB):
+        self.diffs = diffs
+        self.min_blob = min_blob
+        self.blobs = OrderedDict()
+        self.texts = OrderedDict()
+
+    def put(self, text):
+        """
+        :param text: text to store
+        :return: hash of the text
+        """
+        digest = hashlib.sha256(text.encode("utf-8")).hexdigest()
+        if digest not in self.blobs:
+            self.blobs[digest] = self.encode(text)
+            self.texts[digest] = text
+        return digest
+
+    def encode(self, text):
+        """
+        :param text: text not stored yet
+        :return: the text, or a diff against the last blob when that is
+                 less than half its size
+        """
+        if not self.diffs or not self.texts:
+            return text
+        base, previous = next(reversed(self.texts.items()))
+        diff = list(difflib.unified_diff(
+            previous.splitlines(), text.splitlines(), lineterm="", n=0))
+        if sum(len(line) + 1 for line in diff) > MAX_DIFF_RATIO * len(text):
+            return text
+        return {"base": base, "diff": diff}
+
+    def dedupe(self, value):
+        """
+        :param value: result value, strings inside dicts and lists are stored too
+        :return: value with every string of at least min_blob characters
+                 replaced by {"blob": hash}
+        """
+        if isinstance(value, str) and len(value) >= self.min_blob:
+            return {"blob": self.put(value)}
+        if isinstance(value, dict):
+            return {key: self.dedupe(item) for key, item in value.items()}
+        if isinstance(value, list):
+            return [self.dedupe(item) for item in value]
+        return value
+
+
+def dedupe_result(obj, mode):
+    """
+    :param obj: handler result dict
+    :param mode: True to store blobs once, "diff" to also diff near-identical ones
+    :return: result referencing blobs, with the blobs under "blobs"
+    """
+    store = BlobStore(diffs=mode == "diff")
+    result = store.dedupe(obj)
+    result["blobs"] = dict(store.blobs)
+    return result
@@ -0,0 +1,77 @@
+"""
+Read properties of every element matched by a locator in one execute_script call.
+Looping over find_elements and calling is_displayed / get_attribute costs one
+WebDriver round-trip per element per property, this costs one in total.
+"""
+from locator_compiler import compile_locator
+
+LOCATE_JS = """
+function locate(by, value) {
+    var root = document, found = [];
+    if (by === 'xpath') {
+        var snap = document.evaluate(value, root, null, XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null);
+        for (var i = 0; i < snap.snapshotLength; i++) { found.push(snap.snapshotItem(i)); }
+        return found;
+    }
+    if (by === 'id') { return Array.prototype.slice.call(root.querySelectorAll('[id="' + CSS.escape(value) + '"]')); }
+    if (by === 'name') { return Array.prototype.slice.call(root.querySelectorAll('[name="' + CSS.escape(value) + '"]')); }
+    if (by === 'class name') { return Array.prototype.slice.call(root.getElementsByClassName(value)); }
+    if (by === 'tag name') { return Array.prototype.slice.call(root.getElementsByTagName(value)); }
+    if (by === 'link text' || by === 'partial link text') {
+        return Array.prototype.filter.call(root.getElementsByTagName('a'), function (a) {
+            var text = a.innerText.trim();
+            return by === 'link text' ? text === value : text.indexOf(value) !== -1;
+        });
+    }
+    return Array.prototype.slice.call(root.querySelectorAll(value));
+}
+"""
+
+BULK_QUERY_JS = LOCATE_JS + """
+var by = arguments[0], value = arguments[1], props = arguments[2];
+function displayed(el) {
+    if (!el.isConnected) { return false; }
+    var style = window.getComputedStyle(el);
+    if (style.visibility === 'hidden' || style.visibility === 'collapse') { return false; }
+    for (var node = el; node && node.nodeType === 1; node = node.parentElement) {
+        var nodeStyle = window.getComputedStyle(node);
+        if (nodeStyle.display === 'none' || nodeStyle.opacity === '0') { return false; }
+    }
+    return el.getClientRects().length > 0;
+}
+function read(el, prop) {
+    if (prop === 'enabled') { return !el.disabled; }
+    if (prop === 'displayed') { return displayed(el); }
+    if (prop === 'selected') { return !!(el.checked || el.selected); }
+    var result = el[prop];
+    if (result === undefined || result === null || typeof result === 'object') {
+        result = el.getAttribute(prop);
+    }
+    return result === null ? null : String(result);
+}
+return locate(by, value).map(function (el) {
+    var row = {};
+    props.forEach(function (prop) { row[prop] = read(el, prop); });
+    return row;
+});
+"""
+
+
+class BulkQuery:
+    """
+    Mixin for Sele classes, needs self.driver
+    """
+
+    def query_elements(self, by, value, properties):
+        """
+        Property names follow WebElement: "enabled", "displayed" and "selected"
+        mirror is_enabled / is_displayed / is_selected, anything else is read
+        like get_attribute (DOM property first, then the attribute).
+        "displayed" is an approximation of the WebDriver visibility atom.
+        :param by: selenium By strategy
+        :param value: locator value
+        :param properties: list of property names to read
+        :return: list of dicts, one per matched element, in document order
+        """
+        by, value = compile_locator(by, value)
+        return self.driver.execute_script(BULK_QUERY_JS, by, value, list(properties))
@@ -0,0 +1,210 @@
+"""
+Warm WebDriver pool shared by every Sele class.
+A Lambda container keeps module level objects alive between invocations,
+so a Chrome session launched by one request can be handed to the next one.
+"""
+import threading
+import time
+from urllib.parse import urlsplit
+from urllib3.exceptions import HTTPError
+from selenium.common.exceptions import WebDriverException
+
+IDLE_TIMEOUT = 300
+MAX_USES = 50
+MAX_IDLE = 4
+STORAGE_TYPES = "local_storage,indexeddb,websql,cache_storage,service_workers,file_systems"
+DEAD_SESSION = (WebDriverException, OSError, HTTPError)
+
+
+class PooledDriver:
+    """
+    Book keeping around a single Chrome session
+    """
+
+    def __init__(self, key, driver):
+        self.key = key
+        self.driver = driver
+        self.uses = 0
+        self.last_used = time.time()
+
+    def expired(self, idle_timeout, max_uses):
+        """
+        :param idle_timeout: seconds a session may sit unused
+        :param max_uses: number of borrows before the session is recycled
+        :return: True when the session should be evicted
+        """
+        return (time.time() - self.last_used > idle_timeout
+                or self.uses >= max_uses)
+
+
+class DriverPool:
+    """
+    Keep healthy Chrome sessions alive between invocations.
+    Sessions are keyed by the launch options, so two Sele classes with
+    different window sizes never share a browser.
+    """
+
+    def __init__(self, idle_timeout=IDLE_TIMEOUT, max_uses=MAX_USES, max_idle=MAX_IDLE):
+        self.idle_timeout = idle_timeout
+        self.max_uses = max_uses
+        self.max_idle = max_idle
+        self.idle = []
+        self.busy = {}
+        self.lock = threading.Lock()
+
+    def borrow(self, key, launch):
+        """
+        :param key: hashable signature of the launch options
+        :param launch: callable returning a new webdriver when the pool is empty
+        :return: a webdriver ready for use
+        """
+        self.evict()
+        while True:
+            with self.lock:
+                pooled = next((item for item in self.idle if item.key == key), None)
+                if pooled is not None:
+                    self.idle.remove(pooled)
+            if pooled is None:
+                pooled = PooledDriver(key, launch())
+                break
+            if healthy(pooled.driver):
+                break
+            shutdown(pooled.driver)
+        pooled.uses += 1
+        with self.lock:
+            self.busy[id(pooled.driver)] = pooled
+        return pooled.driver
+
+    def release(self, driver, discard=False):
+        """
+        Reset the session and put it back for the next borrower.
+        :param driver: webdriver previously returned by borrow
+        :param discard: quit the session instead of keeping it
+        """
+        with self.lock:
+            pooled = self.busy.pop(id(driver), None)
+        if pooled is None or discard:
+            shutdown(driver)
+            return
+        pooled.last_used = time.time()
+        if pooled.expired(self.idle_timeout, self.max_uses) or not reset(driver):
+            shutdown(driver)
+            return
+        with self.lock:
+            if len(self.idle) < self.max_idle:
+                self.idle.append(pooled)
+                return
+        shutdown(driver)
+
+    def evict(self):
+        """
+        Quit every idle session past its idle timeout or use limit
+        """
+        with self.lock:
+            stale = [item for item in self.idle
+                     if item.expired(self.idle_timeout, self.max_uses)]
+            self.idle = [item for item in self.idle if item not in stale]
+        for item in stale:
+            shutdown(item.driver)
+
+    def clear(self):
+        """
+        Quit every idle session
+        """
+        with self.lock:
+            stale, self.idle = self.idle, []
+        for item in stale:
+            shutdown(item.driver)
+
+
+def healthy(driver):
+    """
+    :param driver: webdriver to probe
+    :return: True when the browser still answers commands, a chromedriver
+             that died surfaces as a socket or urllib3 error instead of a
+             WebDriverException
+    """
+    try:
+        return driver.execute_script("return 1") == 1
+    except DEAD_SESSION:
+        return False
+
+
+def origin_of(url):
+    """
+    :param url: page or frame url
+    :return: scheme://host[:port] of an http(s) url, else None
+    """
+    parts = urlsplit(url or "")
+    if parts.scheme in ("http", "https"):
+        return "{}://{}".format(parts.scheme, parts.netloc)
+    return None
+
+
+def visited_origins(driver):
+    """
+    :param driver: webdriver switched to the tab to inspect
+    :return: set of origins in the history of the tab and of the frames,
+             third-party iframes included, of its current page
+    """
+    urls = [entry.get("url") for entry in
+            driver.execute_cdp_cmd("Page.getNavigationHistory", {}).get("entries", [])]
+    frames = [driver.execute_cdp_cmd("Page.getFrameTree", {}).get("frameTree", {})]
+    while frames:
+        node = frames.pop()
+        urls.append(node.get("frame", {}).get("url"))
+        frames.extend(node.get("childFrames", []))
+    return {origin for origin in map(origin_of, urls) if origin is not None}
+
+
+def reset(driver):
+    """
+    Drop cookies, storage and extra tabs left behind by the last borrower.
+    Cookies are cleared for the whole browser and storage for every origin
+    in the history of its tabs and in the frames of their current pages.
+    Storage of an iframe on a page the tab navigated away from is not seen.
+    :param driver: webdriver to clean
+    :return: True when the session is clean and reusable
+    """
+    try:
+        handles = driver.window_handles
+        origins = set()
+        for handle in handles[1:]:
+            driver.switch_to.window(handle)
+            origins |= visited_origins(driver)
+            driver.close()
+        driver.switch_to.window(handles[0])
+        origins |= visited_origins(driver)
+        driver.execute_script(
+            "try { window.localStorage.clear(); window.sessionStorage.clear(); } catch (e) {}")
+        driver.get("about:blank")
+        driver.execute_cdp_cmd("Network.clearBrowserCookies", {})
+        for origin in origins:
+            driver.execute_cdp_cmd("Storage.clearDataForOrigin",
+                                   {"origin": origin, "storageTypes": STORAGE_TYPES})
+    except DEAD_SESSION:
+        return False
+    return True
+
+
+def shutdown(driver):
+    """
+    :param driver: webdriver to quit, errors are ignored
+    """
+    try:
+        driver.quit()
+    except DEAD_SESSION:
+        pass
+
+
+def options_key(options):
+    """
+    :param options: chrome Options used to launch the browser
+    :return: hashable signature of the options
+    """
+    return (options.binary_location, tuple(options.arguments),
+            repr(sorted(options.experimental_options.items())),
+            repr(sorted(options.capabilities.items())))
+
+
+POOL = DriverPool()
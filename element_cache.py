@@ -0,0 +1,68 @@
+"""
+Element handle cache for Sele classes.
+Loops that look up the same locator on every iteration pay a find_element
+round-trip each time although the element rarely changes. cached() keeps the
+element per locator for the current document and hands out a CachedElement,
+which finds the element again when the browser reports it stale, e.g. after
+the page was replaced by a click, and retries the call once.
+"""
+from selenium.common.exceptions import StaleElementReferenceException
+
+
+class CachedElement:
+    """
+    WebElement proxy, element gives the WebElement itself for calls that
+    need a real one such as execute_script arguments or ActionChains
+    """
+
+    def __init__(self, resolve):
+        self.resolve = resolve
+        self.element = resolve()
+
+    def refresh(self):
+        """
+        Find the element again
+        """
+        self.element = self.resolve()
+
+    def __getattr__(self, name):
+        if name in ("resolve", "element"):
+            raise AttributeError(name)
+        try:
+            attribute = getattr(self.element, name)
+        except StaleElementReferenceException:
+            self.refresh()
+            attribute = getattr(self.element, name)
+        if not callable(attribute):
+            return attribute
+
+        def call(*args, **kwargs):
+            try:
+                return getattr(self.element, name)(*args, **kwargs)
+            except StaleElementReferenceException:
+                self.refresh()
+                return getattr(self.element, name)(*args, **kwargs)
+
+        return call
+
+
+class ElementCache:
+    """
+    Mixin for Sele classes, needs AdaptiveWait and Navigator. Entries belong
+    to the document loaded by the last navigate, loading another one drops them.
+    """
+    element_cache = None
+
+    def cached(self, by, value, timeout=None):
+        """
+        :param by: selenium By strategy
+        :param value: locator value
+        :param timeout: seconds to wait for the element when it has to be found
+        :return: CachedElement for the locator on the current document
+        """
+        if self.element_cache is None or self.element_cache[0] != self.document_id:
+            self.element_cache = (self.document_id, {})
+        elements = self.element_cache[1]
+        if (by, value) not in elements:
+            elements[(by, value)] = CachedElement(lambda: self.wait_for(by, value, timeout))
+        return elements[(by, value)]
@@ -2,46 +2,70 @@
 Simple Usage with headless chrome
 layers are located at /opt/ directory.
 """
-import json
+import sys
 import time
 from selenium import webdriver
 from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.common.by import By
-from selenium.common.exceptions import (
-    NoSuchElementException, ElementNotVisibleException, WebDriverException
-)
+from selenium.common.exceptions import WebDriverException
+from driver_pool import POOL, options_key
+from navigation import Navigator, page_cache_for
+from resource_profiles import ResourceProfile
+from instrumentation import Instrumentation
+from offline_extract import OfflineExtract
+from async_sele import runner_for
+from http_fast_path import static_page
+from result_stream import open_sink
+from response_encoding import build_response
+from structured_log import get_logger, configure_logging, flush
+from scenario_planner import scenario
+
+SCENARIOS = {
+    "id name": "element_govtech_id_name",
+    "xpath css": "element_govtech_xpath_css",
+    "link text": "element_govtech_link_text",
+    "class tag": "element_govtech_class_tag",
+    "by class": "element_govtech_by_class",
+    "element list": "govtech_list_of_elements"
+}
+
+LOG = get_logger(__name__)
 
 
 def handler(event, context):
     """
     blue development server ip: 13.250.110.171
+    Set "concurrency" in the event to load several pages at the same time.
+    Set "stream" in the event to write each result as an NDJSON line instead.
+    Scenarios that cannot finish before the Lambda times out are listed as skipped
+    or timed_out, also with "concurrency" or the HTTP fast path.
+    Set "orchestration" to "async" in the event to run them from an asyncio event loop.
+    Set "extract" to "offline" in the event to count elements in page_source with lxml.
+    Server-rendered pages are read over plain HTTP, set "fast_path" to false to use Chrome.
+    Their text comes from the raw HTML, hidden elements included, instead of the
+    rendered WebElement.text, the "fast_path" section of the body lists which
+    keys were read over "http" and which in the "browser".
     :param event: aws event
     :param context: aws context
     :return: json status code and body
     """
-    print(event, context)
-    with Sele(event) as sele:
-        try:
-            obj = {
-                "id name": sele.element_govtech_id_name(),
-                "xpath css": sele.element_govtech_xpath_css(),
-                "link text": sele.element_govtech_link_text(),
-                "class tag": sele.element_govtech_class_tag(),
-                "by class": sele.element_govtech_by_class(),
-                "element list": sele.govtech_list_of_elements()
-            }
-        except KeyboardInterrupt:
-            obj = {"error": KeyboardInterrupt}
-            print(KeyboardInterrupt)
-
-    return {
-        "statusCode": 200,
-        "body": json.dumps(obj),
-        'headers': {'Content-Type': 'application/json'}
-    }
-
-
-class Sele:
+    configure_logging(event)
+    LOG.info("invocation", event=event, context=context)
+    try:
+        report = {}
+        with open_sink(event, context) as sink:
+            obj = runner_for(event, fast_path=True)(Sele, event, SCENARIOS, report, sink, context)
+        obj.update(report)
+    except KeyboardInterrupt:
+        obj = {"error": str(KeyboardInterrupt)}
+        LOG.error("interrupted")
+
+    response = build_response(obj, event)
+    flush()
+    return response
+
+
+class Sele(Instrumentation, ResourceProfile, Navigator, OfflineExtract):
     """
     Initiate the driver instance.
     Since this is a file system, you have to instantiate this class by writing...
@@ -52,6 +76,8 @@ class Sele:
         self.event = event
         self.driver = None
         self.options = Options()
+        self.report = {}
+        self.page_cache = page_cache_for(event)
 
     def __enter__(self):
         if self.event != 'main':
@@ -60,151 +86,161 @@ class Sele:
         self.options.add_argument('--no-sandbox')
         self.options.add_argument('--single-process')
         self.options.add_argument('--disable-dev-shm-usage')
-        self.driver = webdriver.Chrome('/opt/chromedriver', options=self.options)
+        self.apply_profile_options()
+        self.apply_load_strategy()
+        self.driver = POOL.borrow(options_key(self.options), self.launch)
+        self.apply_profile_session()
+        self.instrument()
         return self
 
     def __exit__(self, exc_type, exc_val, exc_tb):
-        self.driver.close()
-        self.driver.quit()
-        if exc_type or exc_val or exc_tb:
-            return str(exc_type, exc_val, exc_tb)
+        if exc_type is None:
+            self.record_other_loads()
+        self.uninstrument()
+        POOL.release(self.driver, discard=exc_type is not None)
         return True
 
+    def launch(self):
+        """
+        :return: a new chrome session, only used when the pool has none to lend
+        """
+        return webdriver.Chrome('/opt/chromedriver', options=self.options)
+
+    @static_page(requires=[(By.ID, "navbar"), (By.NAME, "viewport")],
+                 text=(By.XPATH, "//div[@id='main-content']"))
+    @scenario("https://www.tech.gov.sg", load="eager",
+              ready=(By.ID, "main-content"))
     def element_govtech_id_name(self):
         """
         :return: search result from govtech website
         """
         base_url = "https://www.tech.gov.sg"
-        self.driver.get(base_url)
+        self.navigate(base_url)
         body = ""
         try:
             self.driver.find_element_by_id("navbar")
-            print("We found an element by id='navbar'")
+            LOG.debug("We found an element by id='navbar'")
             self.driver.find_element_by_name("viewport")
-            print("We found an element by name='viewport'")
-            body = self.driver.find_element_by_xpath("//div[@id='main-content']").text
-            print(body)
-        except NoSuchElementException:
-            print(NoSuchElementException)
-        except ElementNotVisibleException:
-            print(ElementNotVisibleException)
-        except WebDriverException:
-            print(WebDriverException)
+            LOG.debug("We found an element by name='viewport'")
+            body = self.find(By.XPATH, "//div[@id='main-content']").text
+            LOG.debug("page body", body=body)
+        except WebDriverException as error:
+            LOG.warning("element lookup failed", error=error)
         return body
 
+    @static_page(requires=[(By.XPATH, "//input[@id='search-box-mobile']"),
+                           (By.CSS_SELECTOR, "#search-activate")],
+                 text=(By.XPATH, "//div[@id='main-content']"))
+    @scenario("https://www.tech.gov.sg/digital-government-transformation/", load="eager",
+              ready=(By.ID, "main-content"))
     def element_govtech_xpath_css(self):
         """
         :return: search result from govtech website
         """
         base_url = "https://www.tech.gov.sg/digital-government-transformation/"
-        self.driver.get(base_url)
+        self.navigate(base_url)
         body = ""
         try:
-            self.driver.find_element_by_xpath("//input[@id='search-box-mobile']")
-            print("We found an element by xpath='//input[@id='search-box-mobile']'")
+            self.find(By.XPATH, "//input[@id='search-box-mobile']")
+            LOG.debug("We found an element by xpath='//input[@id='search-box-mobile']'")
             self.driver.find_element_by_css_selector("#search-activate")
-            print("We found an element by css='#search-activate'")
-            body = self.driver.find_element_by_xpath("//div[@id='main-content']").text
-            print(body)
-        except NoSuchElementException:
-            print(NoSuchElementException)
-        except ElementNotVisibleException:
-            print(ElementNotVisibleException)
-        except WebDriverException:
-            print(WebDriverException)
+            LOG.debug("We found an element by css='#search-activate'")
+            body = self.find(By.XPATH, "//div[@id='main-content']").text
+            LOG.debug("page body", body=body)
+        except WebDriverException as error:
+            LOG.warning("element lookup failed", error=error)
         return body
 
+    @static_page(requires=[(By.LINK_TEXT, "A Singapore Government Agency Website"),
+                           (By.PARTIAL_LINK_TEXT, "Digital")],
+                 text=(By.XPATH, "//div[@id='main-content']"))
+    @scenario("https://www.tech.gov.sg/who-we-are/our-role/", load="eager",
+              ready=(By.ID, "main-content"))
     def element_govtech_link_text(self):
         """
         :return: search result from govtech website
         """
         base_url = "https://www.tech.gov.sg/who-we-are/our-role/"
-        self.driver.get(base_url)
+        self.navigate(base_url)
         body = ""
         try:
             self.driver.find_element_by_link_text("A Singapore Government Agency Website")
-            print("We found an element by link_text='A Singapore Government Agency Website'")
+            LOG.debug("We found an element by link_text='A Singapore Government Agency Website'")
             self.driver.find_element_by_partial_link_text("Digital")
-            print("We found an element by partial_link_text='Digital'")
-            body = self.driver.find_element_by_xpath("//div[@id='main-content']").text
-            print(body)
-        except NoSuchElementException:
-            print(NoSuchElementException)
-        except ElementNotVisibleException:
-            print(ElementNotVisibleException)
-        except WebDriverException:
-            print(WebDriverException)
+            LOG.debug("We found an element by partial_link_text='Digital'")
+            body = self.find(By.XPATH, "//div[@id='main-content']").text
+            LOG.debug("page body", body=body)
+        except WebDriverException as error:
+            LOG.warning("element lookup failed", error=error)
         return body
 
+    @scenario("https://www.tech.gov.sg/careers/overview/", writes=True)
     def element_govtech_class_tag(self):
         """
         :return: search result from govtech website
         """
         base_url = "https://www.tech.gov.sg/careers/overview/"
-        self.driver.get(base_url)
+        self.navigate(base_url)
+        self.mark_dirty()
         body = ""
         try:
             self.driver.find_element_by_class_name("navbar-burger").click()
             key = self.driver.find_element_by_class_name("input")
             key.send_keys("test")
-            print("We found an element by class_name='input'")
+            LOG.debug("We found an element by class_name='input'")
             key_text = self.driver.find_element_by_tag_name("div")
-            print("We found an element by tag_name=" + key_text.text)
-            body = self.driver.find_element_by_xpath("//div[@id='main-content']").text
-            print(body)
-        except NoSuchElementException:
-            print(NoSuchElementException)
-        except ElementNotVisibleException:
-            print(ElementNotVisibleException)
-        except WebDriverException:
-            print(WebDriverException)
+            LOG.debug("We found an element by tag_name", text=key_text.text)
+            body = self.find(By.XPATH, "//div[@id='main-content']").text
+            LOG.debug("page body", body=body)
+        except WebDriverException as error:
+            LOG.warning("element lookup failed", error=error)
         return body
 
+    @static_page(requires=[(By.ID, "2008"), (By.XPATH, "//input[@id='search-box']"),
+                           (By.LINK_TEXT, "Overview")],
+                 text=(By.XPATH, "//div[@id='main-content']"))
+    @scenario("https://www.tech.gov.sg/media/", load="eager",
+              ready=(By.ID, "main-content"))
     def element_govtech_by_class(self):
         """
         :return: search result from govtech website
         """
         base_url = "https://www.tech.gov.sg/media/"
-        self.driver.get(base_url)
+        self.navigate(base_url)
         body = ""
         try:
             # noinspection PyArgumentEqualDefault
             self.driver.find_element(By.ID, "2008")
-            print("We found an element by id='2008'")
-            self.driver.find_element(By.XPATH, "//input[@id='search-box']")
-            print("We found an element by xpath='//input[@id='search-box']'")
+            LOG.debug("We found an element by id='2008'")
+            self.find(By.XPATH, "//input[@id='search-box']")
+            LOG.debug("We found an element by xpath='//input[@id='search-box']'")
             self.driver.find_element(By.LINK_TEXT, "Overview")
-            print("We found an element by link_text='Overview'")
-            body = self.driver.find_element_by_xpath("//div[@id='main-content']").text
-            print(body)
-        except NoSuchElementException:
-            print(NoSuchElementException)
-        except ElementNotVisibleException:
-            print(ElementNotVisibleException)
-        except WebDriverException:
-            print(WebDriverException)
+            LOG.debug("We found an element by link_text='Overview'")
+            body = self.find(By.XPATH, "//div[@id='main-content']").text
+            LOG.debug("page body", body=body)
+        except WebDriverException as error:
+            LOG.warning("element lookup failed", error=error)
         return body
 
+    @static_page(text=(By.XPATH, "//div[@id='main-content']"))
+    @scenario("https://www.tech.gov.sg/contact-us/", load="eager",
+              ready=(By.ID, "main-content"))
     def govtech_list_of_elements(self):
         """
         :return: search result from govtech website
         """
         base_url = "https://www.tech.gov.sg/contact-us/"
-        self.driver.get(base_url)
+        self.navigate(base_url)
         body = ""
         try:
-            class_list = self.driver.find_elements_by_class_name("row")
-            print("ClassName -> Size of the list is: " + str(len(class_list)))
-            tag_list = self.driver.find_elements_by_tag_name("div")
-            print("TagName -> Size of the list is: " + str(len(tag_list)))
-            body = self.driver.find_element_by_xpath("//div[@id='main-content']").text
-            print(body)
-        except NoSuchElementException:
-            print(NoSuchElementException)
-        except ElementNotVisibleException:
-            print(ElementNotVisibleException)
-        except WebDriverException:
-            print(WebDriverException)
+            class_count = self.count(By.CLASS_NAME, "row")
+            LOG.debug("ClassName -> Size of the list", size=class_count)
+            tag_count = self.count(By.TAG_NAME, "div")
+            LOG.debug("TagName -> Size of the list", size=tag_count)
+            body = self.find(By.XPATH, "//div[@id='main-content']").text
+            LOG.debug("page body", body=body)
+        except WebDriverException as error:
+            LOG.warning("element lookup failed", error=error)
         return body
 
 
@@ -212,4 +248,5 @@ if __name__ == '__main__':
     START = time.time()
     HAND = handler('main', 'main')
     END = time.time()
-    print("Time spent opening 6 webpage and retrieve data: " + str(END - START) + " seconds")
+    print("Time spent opening 6 webpage and retrieve data: " + str(END - START) + " seconds",
+          file=sys.stderr)
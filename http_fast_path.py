@@ -0,0 +1,286 @@
+"""
+Browserless fast path for server-rendered pages.
+A scenario declared with @static_page only reads elements that are already in
+the HTML the server sends. run_fast_path fetches those pages over pooled
+keep-alive HTTP connections and runs the scenario's locators with lxml, so
+when every page is static no Chrome is started at all. When a required
+element is missing from the raw HTML the scenario is left for Sele, and the
+path that worked is remembered per url and scenario for PATH_TTL seconds. Set
+{"fast_path": false} in the event to always use Chrome.
+Text read over HTTP is the text of the raw HTML, see offline_extract.inner_text,
+not the rendered text of WebElement.text: elements hidden by CSS are included
+and whitespace can differ. report["fast_path"] lists which keys took which path.
+"""
+import gzip
+import http.client
+import threading
+import time
+import zlib
+from collections import namedtuple
+from urllib.parse import urlsplit, urljoin
+from scenario_runner import event_option, keep, run_scenarios, deadline_for
+from scenario_planner import target_of
+from navigation import rewrite_url
+from offline_extract import DomSnapshot, inner_text, lxml, etree
+from structured_log import get_logger
+
+LOG = get_logger(__name__)
+
+HTTP_TIMEOUT = 10
+MAX_IDLE = 4
+MAX_REDIRECTS = 5
+PATH_TTL = 3600
+USER_AGENT = ("Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 "
+              "(KHTML, like Gecko) HeadlessChrome/75.0 Safari/537.36")
+
+StaticPage = namedtuple("StaticPage", ["requires", "text"])
+
+PATHS = {}
+
+
+def static_page(requires=(), text=None):
+    """
+    Declare that a scenario only reads the server-rendered page of its
+    @scenario url, put it above @scenario.
+    :param requires: (by, value) locators that must be in the raw HTML
+    :param text: (by, value) locator of the element whose text is the result
+    :return: decorator attaching the declaration to the method
+    """
+    def decorate(func):
+        func.static_page = StaticPage(tuple(requires), text)
+        return func
+    return decorate
+
+
+class HttpPool:
+    """
+    Idle keep-alive connections per (scheme, host), reused across warm invocations
+    """
+
+    def __init__(self, max_idle=MAX_IDLE, timeout=HTTP_TIMEOUT):
+        self.max_idle = max_idle
+        self.timeout = timeout
+        self.idle = {}
+        self.lock = threading.Lock()
+
+    def connect(self, scheme, netloc):
+        """
+        :param scheme: "http" or "https"
+        :param netloc: host with optional port
+        :return: (connection, True when it was idle in the pool)
+        """
+        with self.lock:
+            idle = self.idle.get((scheme, netloc))
+            if idle:
+                return idle.pop(), True
+        if scheme == "https":
+            return http.client.HTTPSConnection(netloc, timeout=self.timeout), False
+        return http.client.HTTPConnection(netloc, timeout=self.timeout), False
+
+    def release(self, scheme, netloc, connection):
+        """
+        :param scheme: "http" or "https"
+        :param netloc: host with optional port
+        :param connection: connection whose response was read completely
+        """
+        with self.lock:
+            idle = self.idle.setdefault((scheme, netloc), [])
+            if len(idle) < self.max_idle:
+                idle.append(connection)
+                return
+        connection.close()
+
+    def request(self, url):
+        """
+        :param url: absolute http or https url
+        :return: (status, headers, body bytes), a connection that went stale
+                 while idle is replaced once
+        """
+        parts = urlsplit(url)
+        path = (parts.path or "/") + ("?" + parts.query if parts.query else "")
+        headers = {"User-Agent": USER_AGENT, "Accept": "text/html",
+                   "Accept-Encoding": "gzip", "Connection": "keep-alive"}
+        while True:
+            connection, reused = self.connect(parts.scheme, parts.netloc)
+            try:
+                connection.request("GET", path, headers=headers)
+                response = connection.getresponse()
+                body = response.read()
+            except (http.client.HTTPException, OSError):
+                connection.close()
+                if reused:
+                    continue
+                raise
+            if response.will_close:
+                connection.close()
+            else:
+                self.release(parts.scheme, parts.netloc, connection)
+            return response.status, response.headers, body
+
+    def get(self, url):
+        """
+        :param url: absolute http or https url
+        :return: (final url, body bytes, charset of the Content-Type header or
+                 None) after following redirects
+        :raises OSError: on connection failures, non 200 responses and gzip
+                         bodies that are truncated or corrupt
+        """
+        for _ in range(MAX_REDIRECTS + 1):
+            status, headers, body = self.request(url)
+            if status in (301, 302, 303, 307, 308) and headers.get("Location"):
+                url = urljoin(url, headers["Location"])
+                continue
+            if status != 200:
+                raise OSError("HTTP {} for {}".format(status, url))
+            if headers.get("Content-Encoding") == "gzip":
+                try:
+                    body = gzip.decompress(body)
+                except (EOFError, zlib.error) as error:
+                    raise OSError("Bad gzip body for {}: {}".format(url, error))
+            return url, body, headers.get_content_charset()
+        raise OSError("Too many redirects for {}".format(url))
+
+
+HTTP = HttpPool()
+
+
+def remembered(url, name):
+    """
+    :param url: normalized page url
+    :param name: scenario method name
+    :return: "http" or "browser" when a recent run settled it, else None
+    """
+    entry = PATHS.get((url, name))
+    if entry is None or time.time() - entry[1] > PATH_TTL:
+        return None
+    return entry[0]
+
+
+def read_static(url, body, charset, page):
+    """
+    :param url: normalized page url, for the log
+    :param body: response body bytes
+    :param charset: charset of the Content-Type header or None
+    :param page: StaticPage declaration
+    :return: text of page.text, None when the raw HTML lacks a required
+             element or cannot be decoded or parsed
+    """
+    if not body.strip():
+        return None
+    try:
+        snapshot = DomSnapshot(body.decode(charset, "replace") if charset else body)
+    except (etree.LxmlError, ValueError, LookupError) as error:
+        LOG.warning("fast path parse failed", url=url, error=error)
+        return None
+    for by, value in page.requires + (page.text,):
+        try:
+            if not snapshot.find_elements(by, value):
+                return None
+        except ValueError:
+            return None
+    return inner_text(snapshot.find_elements(*page.text)[0])
+
+
+def fetch_static(event, url, page):
+    """
+    :param event: aws event, for base_urls
+    :param url: normalized page url
+    :param page: StaticPage declaration
+    :return: text of page.text, see read_static
+    """
+    _, body, charset = HTTP.get(rewrite_url(event, url))
+    return read_static(url, body, charset, page)
+
+
+def fast_path_enabled(event):
+    """
+    :param event: aws event
+    :return: True unless lxml is missing or the event sets "fast_path" to false
+    """
+    return lxml is not None and bool(event_option(event, "fast_path", True))
+
+
+def static_candidates(sele_class, scenarios, paths):
+    """
+    :param sele_class: Sele class owning the methods
+    :param scenarios: dict of output key -> method name
+    :param paths: {"http": [...], "browser": [...]}, keys a recent run sent
+                  to the browser are added to "browser"
+    :return: list of (key, name, url, StaticPage) worth fetching over HTTP
+    """
+    candidates = []
+    for key, name in scenarios.items():
+        page = getattr(getattr(sele_class, name), "static_page", None)
+        url = target_of(sele_class, name).url
+        if page is None or page.text is None or url is None:
+            continue
+        if remembered(url, name) == "browser":
+            paths["browser"].append(key)
+            continue
+        candidates.append((key, name, url, page))
+    return candidates
+
+
+def settle(paths, key, name, url, text):
+    """
+    Remember which path served a scenario.
+    :param paths: {"http": [...], "browser": [...]}
+    :param key: output key
+    :param name: scenario method name
+    :param url: normalized page url
+    :param text: text read over HTTP, None when the browser is needed
+    """
+    path = "browser" if text is None else "http"
+    PATHS[(url, name)] = (path, time.time())
+    paths[path].append(key)
+
+
+def run_fast_path(sele_class, event, scenarios, report=None, sink=None, deadline=None):
+    """
+    :param sele_class: Sele class owning the methods
+    :param event: aws event
+    :param scenarios: dict of output key -> method name
+    :param report: optional dict, gets "fast_path": {"http": [...], "browser": [...]}
+    :param sink: optional NdjsonSink receiving each result
+    :param deadline: optional time.time() after which no page is fetched
+    :return: dict of output key -> result for the scenarios served over HTTP
+    """
+    results = {}
+    if not fast_path_enabled(event):
+        return results
+    paths = {"http": [], "browser": []}
+    for key, name, url, page in static_candidates(sele_class, scenarios, paths):
+        if deadline is not None and time.time() >= deadline:
+            break
+        try:
+            text = fetch_static(event, url, page)
+        except (OSError, http.client.HTTPException) as error:
+            LOG.warning("fast path fetch failed", url=url, error=error)
+            text = None
+        settle(paths, key, name, url, text)
+        if text is not None:
+            keep(results, key, text, sink)
+    if report is not None:
+        report["fast_path"] = paths
+    return results
+
+
+def run_static_first(sele_class, event, scenarios, report=None, sink=None, context=None):
+    """
+    run_scenarios for the scenarios run_fast_path could not serve over HTTP,
+    both within the deadline of the context.
+    :param sele_class: Sele class of the calling module
+    :param event: aws event
+    :param scenarios: dict of output key -> method name
+    :param report: optional dict collecting the report sections
+    :param sink: optional NdjsonSink receiving each result as it finishes
+    :param context: aws context
+    :return: dict of output key -> scenario result in the declared key order
+    """
+    deadline = deadline_for(event, context)
+    results = run_fast_path(sele_class, event, scenarios, report, sink, deadline)
+    remaining = {key: name for key, name in scenarios.items() if key not in results}
+    if remaining:
+        results.update(run_scenarios(sele_class, event, remaining, report, sink, context,
+                                     deadline))
+    return {key: results[key] for key in scenarios if key in results}
@@ -0,0 +1,115 @@
+"""
+WebDriver command latency per scenario.
+Every WebDriver command, including the ones sent by WebElement methods, goes
+through driver.execute. Wrapping it on the session times each command and tags
+it with the scenario running at the time.
+"""
+import math
+import time
+from collections import defaultdict
+from scenario_runner import event_option
+
+
+def percentile(values, fraction):
+    """
+    :param values: sorted list of numbers
+    :param fraction: 0.5 for the median, 0.95 for p95
+    :return: nearest-rank percentile
+    """
+    return values[max(math.ceil(fraction * len(values)) - 1, 0)]
+
+
+def histogram(samples):
+    """
+    :param samples: list of durations in seconds
+    :return: count, p50, p95, max and total in milliseconds
+    """
+    ordered = sorted(samples)
+    return {
+        "count": len(ordered),
+        "p50": round(percentile(ordered, 0.5) * 1000, 2),
+        "p95": round(percentile(ordered, 0.95) * 1000, 2),
+        "max": round(ordered[-1] * 1000, 2),
+        "total": round(sum(ordered) * 1000, 2)
+    }
+
+
+class CommandTimings:
+    """
+    Durations of WebDriver commands grouped by scenario and command name
+    """
+
+    def __init__(self):
+        self.samples = defaultdict(lambda: defaultdict(list))
+
+    def record(self, scenario, command, seconds):
+        """
+        :param scenario: scenario method name
+        :param command: WebDriver command name, e.g. "get" or "clickElement"
+        :param seconds: time the command took
+        """
+        self.samples[scenario][command].append(seconds)
+
+    def count(self):
+        """
+        :return: number of commands recorded
+        """
+        return sum(len(samples) for commands in self.samples.values()
+                   for samples in commands.values())
+
+    def summary(self):
+        """
+        :return: {scenario: {command: histogram}}, "*" holds all commands of a scenario
+        """
+        result = {}
+        for scenario, commands in self.samples.items():
+            result[scenario] = {command: histogram(samples)
+                                for command, samples in commands.items()}
+            result[scenario]["*"] = histogram(
+                [sample for samples in commands.values() for sample in samples])
+        return result
+
+
+class Instrumentation:
+    """
+    Mixin for Sele classes, needs self.event, self.driver and self.report.
+    Enabled by {"timings": true} in the event.
+    """
+    timings = None
+
+    def instrument(self, force=False):
+        """
+        Start timing every command sent on self.driver.
+        :param force: instrument even when the event did not ask for timings
+        """
+        if not (force or event_option(self.event, "timings")):
+            return
+        self.timings = CommandTimings()
+        execute = self.driver.execute
+
+        def timed(driver_command, params=None):
+            start = time.perf_counter()
+            try:
+                return execute(driver_command, params)
+            finally:
+                self.timings.record(self.scenario_tag(), driver_command,
+                                    time.perf_counter() - start)
+
+        self.driver.execute = timed
+
+    def scenario_tag(self):
+        """
+        :return: name of the running scenario, "session" outside of one
+        """
+        target = getattr(self, "current_target", None)
+        return target.name if target else "session"
+
+    def uninstrument(self):
+        """
+        Restore driver.execute before the session goes back to the pool and
+        add the histograms to the "timings" report section.
+        """
+        if self.timings is None:
+            return
+        self.driver.__dict__.pop("execute", None)
+        self.report.setdefault("timings", {}).update(self.timings.summary())
@@ -0,0 +1,120 @@
+"""
+Rewrite simple XPath locators into faster strategies.
+Chrome evaluates CSS selectors natively while XPath goes through
+document.evaluate, and most locators in the scenarios are plain
+//tag[@attr='value'] chains. compile_locator turns those into By.ID, By.NAME,
+By.TAG_NAME or By.CSS_SELECTOR once and caches the result. Anything using
+text(), axes other than / and //, or functions other than contains() and
+starts-with() on an attribute stays XPath. //tag[@id='x'] becomes
+tag[id="x"] rather than By.ID so the tag is still checked, chromedriver runs
+By.ID as that same CSS lookup. Navigator.find and page_text, AdaptiveWait,
+BulkQuery and OfflineExtract.count send their locators through it.
+"""
+import re
+from functools import lru_cache
+from selenium.webdriver.common.by import By
+
+STEP = re.compile(r"(//|/)(\*|[a-z][a-z0-9-]*)((?:\[[^\[\]]*\])*)")
+PREDICATE = re.compile(r"\[([^\[\]]*)\]")
+LITERAL = r"""(?:'([^']*)'|"([^"]*)")"""
+ATTRIBUTE_EQUALS = re.compile(r"@([\w-]+)\s*=\s*" + LITERAL + r"$")
+ATTRIBUTE_FUNCTION = re.compile(
+    r"(contains|starts-with)\(\s*@([\w-]+)\s*,\s*" + LITERAL + r"\s*\)$")
+ATTRIBUTE_PRESENT = re.compile(r"@([\w-]+)$")
+POSITION = re.compile(r"(\d+)$")
+CSS_OPERATORS = {"contains": "*=", "starts-with": "^="}
+
+
+def css_string(value):
+    """
+    :param value: attribute value
+    :return: value as a double quoted CSS string
+    """
+    return '"' + value.replace("\\", "\\\\").replace('"', '\\"') + '"'
+
+
+def compile_step(tag, predicates):
+    """
+    :param tag: element name or "*"
+    :param predicates: predicate expressions without brackets
+    :return: (CSS compound selector, [(attribute, value)] of equality tests),
+             None when a predicate has no CSS equivalent
+    """
+    css = "" if tag == "*" else tag
+    equals = []
+    for number, predicate in enumerate(predicates):
+        predicate = predicate.strip()
+        position = POSITION.match(predicate)
+        if position and number == 0:
+            css += ":nth-{}({})".format("child" if tag == "*" else "of-type", position.group(1))
+            continue
+        match = ATTRIBUTE_EQUALS.match(predicate)
+        if match:
+            value = match.group(2) if match.group(2) is not None else match.group(3)
+            css += "[{}={}]".format(match.group(1), css_string(value))
+            equals.append((match.group(1), value))
+            continue
+        match = ATTRIBUTE_FUNCTION.match(predicate)
+        if match:
+            value = match.group(3) if match.group(3) is not None else match.group(4)
+            css += "[{}{}{}]".format(
+                match.group(2), CSS_OPERATORS[match.group(1)], css_string(value))
+            continue
+        match = ATTRIBUTE_PRESENT.match(predicate)
+        if match:
+            css += "[{}]".format(match.group(1))
+            continue
+        return None
+    return css or "*", equals
+
+
+@lru_cache(maxsize=1024)
+def compile_xpath(xpath):
+    """
+    :param xpath: XPath locator value
+    :return: (by, value, rule) where rule names the rewrite applied:
+             "id", "name", "tag", "css" or "xpath" when left unchanged
+    """
+    if not xpath.startswith("//"):
+        return By.XPATH, xpath, "xpath"
+    steps, position = [], 0
+    while position < len(xpath):
+        match = STEP.match(xpath, position)
+        if match is None:
+            return By.XPATH, xpath, "xpath"
+        steps.append(match)
+        position = match.end()
+
+    selectors = []
+    for match in steps:
+        compiled = compile_step(match.group(2), PREDICATE.findall(match.group(3)))
+        if compiled is None:
+            return By.XPATH, xpath, "xpath"
+        if selectors:
+            selectors.append(">" if match.group(1) == "/" else "")
+        selectors.append(compiled[0])
+
+    if len(steps) == 1:
+        tag, predicates = steps[0].group(2), PREDICATE.findall(steps[0].group(3))
+        if tag != "*" and not predicates:
+            return By.TAG_NAME, tag, "tag"
+        equals = compile_step(tag, predicates)[1]
+        if tag == "*" and len(predicates) == 1 and len(equals) == 1:
+            attribute, value = equals[0]
+            if attribute == "id":
+                return By.ID, value, "id"
+            if attribute == "name":
+                return By.NAME, value, "name"
+    return By.CSS_SELECTOR, " ".join(part for part in selectors if part), "css"
+
+
+def compile_locator(by, value):
+    """
+    :param by: selenium By strategy
+    :param value: locator value
+    :return: (by, value) to actually send, XPath rewritten when possible
+    """
+    if by != By.XPATH:
+        return by, value
+    compiled_by, compiled_value, _ = compile_xpath(value)
+    return compiled_by, compiled_value
@@ -1,45 +1,74 @@
 """
 Selenium Web Driver. Useful methods and properties
 """
-import json
+import sys
 import time
 import string
+from urllib.parse import urlencode
 from selenium import webdriver
 from selenium.webdriver.common.by import By
 from selenium.webdriver.chrome.options import Options
-from selenium.common.exceptions import WebDriverException, NoSuchElementException
+from selenium.common.exceptions import WebDriverException
+from driver_pool import POOL, options_key
+from bulk_query import BulkQuery
+from navigation import Navigator, page_cache_for
+from resource_profiles import ResourceProfile
+from instrumentation import Instrumentation
+from wait_engine import AdaptiveWait
+from pagination import Paginator
+from text_index import TextSearch
+from search_fanout import SearchFanout
+from element_cache import ElementCache
+from offline_extract import OfflineExtract
+from async_sele import runner_for
+from result_stream import open_sink
+from response_encoding import build_response
+from structured_log import get_logger, configure_logging, flush
+from scenario_planner import scenario
+
+SCENARIOS = {
+    "get text": "steam_get_text",
+    "get value": "steam_get_value",
+    "wrapper method": "steam_wrapper_method",
+    "element presense": "steam_element_presense",
+    "dynamic xpath": "steam_dynamic_xpath"
+}
+
+LOG = get_logger(__name__)
 
 
 def handler(event, context):
     """
     This is the default aws lambda handler
+    Set "stream" in the event to write each result as an NDJSON line instead.
+    Scenarios that cannot finish before the Lambda times out are listed as skipped
+    or timed_out, also with "concurrency".
+    Set "orchestration" to "async" in the event to run them from an asyncio event loop.
+    Set "pages" and "tabs" in the event to read more search pages, several at a time.
+    Set "terms" and "fanout" in the event to choose the searches and how they are spread.
+    Set "extract" to "offline" in the event to read attributes from page_source with lxml.
     :param event: aws event
     :param context: aws context
     :return: json status code and body
     """
-    print(event, context)
-    with Sele(event) as sele:
-        try:
-            obj = {
-                "get text": sele.steam_get_text(),
-                "get value": sele.steam_get_value(),
-                "wrapper method": sele.steam_wrapper_method(),
-                "element presense": sele.steam_element_presense(),
-                "dynamic xpath": sele.steam_dynamic_xpath()
-            }
-            obj = json.dumps(obj)
-        except KeyboardInterrupt:
-            obj = {"error": str(KeyboardInterrupt)}
-            print(KeyboardInterrupt)
-
-    return {
-        "statusCode": 200,
-        "body": obj,
-        'headers': {'Content-Type': 'application/json'}
-    }
-
-
-class Sele:
+    configure_logging(event)
+    LOG.info("invocation", event=event, context=context)
+    try:
+        report = {}
+        with open_sink(event, context) as sink:
+            obj = runner_for(event)(Sele, event, SCENARIOS, report, sink, context)
+        obj.update(report)
+    except KeyboardInterrupt:
+        obj = {"error": str(KeyboardInterrupt)}
+        LOG.error("interrupted")
+
+    response = build_response(obj, event)
+    flush()
+    return response
+
+
+class Sele(Instrumentation, BulkQuery, ResourceProfile, Navigator, AdaptiveWait,
+           Paginator, TextSearch, SearchFanout, ElementCache, OfflineExtract):
     """
     Initiate the driver instance.
     Since this is a file system, you have to instantiate this class by writing...
@@ -50,6 +79,8 @@ class Sele:
         self.event = event
         self.driver = None
         self.options = Options()
+        self.report = {}
+        self.page_cache = page_cache_for(event)
 
     def __enter__(self):
         if self.event != 'main':
@@ -59,154 +90,161 @@ class Sele:
         self.options.add_argument('--single-process')
         self.options.add_argument('--disable-dev-shm-usage')
         self.options.add_argument('--window-size=1920,1080')
-        self.driver = webdriver.Chrome('/opt/chromedriver', options=self.options)
+        self.apply_profile_options()
+        self.apply_load_strategy()
+        self.driver = POOL.borrow(options_key(self.options), self.launch)
+        self.apply_profile_session()
+        self.instrument()
+        self.disable_implicit_wait()
         return self
 
     def __exit__(self, exc_type, exc_val, exc_tb):
-        self.driver.close()
-        self.driver.quit()
+        if exc_type is None:
+            self.record_other_loads()
+        self.uninstrument()
+        POOL.release(self.driver, discard=exc_type is not None)
         return True
 
+    def launch(self):
+        """
+        :return: a new chrome session, only used when the pool has none to lend
+        """
+        return webdriver.Chrome('/opt/chromedriver', options=self.options)
+
+    @scenario("https://store.steampowered.com/search", writes=True)
     def steam_get_text(self):
         """
-        :return: search result from steam website
+        :return: search results of every page, in page order
         """
         base_url = "https://store.steampowered.com/search"
         self.driver.maximize_window()
-        self.driver.implicitly_wait(1)
-        self.driver.get(base_url)
+        self.navigate(base_url)
+        self.mark_dirty()
         try:
-            for num in list(range(1, 8)):
-                self.driver.implicitly_wait(4)
-                self.driver.find_element(
-                    By.XPATH, "//a[contains(text(),'>')]"
-                ).click()
-                self.driver.implicitly_wait(4)
-                page = self.driver.find_element(
+            pages = self.page_numbers()
+            results = self.crawl(
+                pages,
+                pager=(By.XPATH, "//div[@class='search_pagination_right']//a"),
+                next_link=(By.XPATH, "//a[contains(text(),'>')]"),
+                ready=lambda num: (
                     By.XPATH,
                     "//div[@class='search_pagination_left'][contains(text(), '{}')]".format(
                         str(num*25)
                     )
-                ).get_attribute("innerText")
-                self.driver.implicitly_wait(2)
-                open_tab = self.driver.find_element(
+                ),
+                read=lambda num: self.wait_for(
                     By.XPATH, "//div[@id='search_results']"
                 ).get_attribute("innerText")
-                print(open_tab, page)
+            )
+            for num, open_tab in zip(pages, results):
+                LOG.debug("search page", sample=True, page=num, results=open_tab)
         except WebDriverException:
             self.driver.quit()
             raise WebDriverException
-        finally:
-            self.driver.implicitly_wait(1)
-            body = self.driver.find_element(By.XPATH, "//body").get_attribute("innerText")
-            print(body)
+        body = "\n".join(results)
+        LOG.debug("page body", body=body)
         return body
 
+    @scenario("https://store.steampowered.com/", load="eager")
     def steam_get_value(self):
         """
         :return: search result from steam website
         """
         base_url = "https://store.steampowered.com/"
         self.driver.maximize_window()
-        self.driver.implicitly_wait(1)
-        self.driver.get(base_url)
+        self.navigate(base_url)
         try:
-            types = self.driver.find_elements(
-                By.XPATH, "//*[@type]"
-            )
+            types = self.extract(By.XPATH, "//*[@type]", ["type"])
             for html_type in types:
-                print(html_type.get_attribute("type"))
+                LOG.debug("element type", sample=True, type=html_type["type"])
         except WebDriverException:
             self.driver.quit()
             raise WebDriverException
         finally:
-            self.driver.implicitly_wait(1)
-            body = self.driver.find_element(By.XPATH, "//body").get_attribute("innerText")
-            print(body)
+            body = self.page_text()
+            LOG.debug("page body", body=body)
         return body
 
+    @scenario("https://store.steampowered.com/", load="eager")
     def steam_wrapper_method(self):
         """
         :return: search result from steam website
         """
         base_url = "https://store.steampowered.com/"
         self.driver.maximize_window()
-        self.driver.implicitly_wait(1)
-        self.driver.get(base_url)
+        self.navigate(base_url)
         try:
-            self.driver.implicitly_wait(1)
-            types = self.driver.find_elements(By.XPATH, "//*[@type]")
+            types = self.extract(By.XPATH, "//*[@type]", ["type"])
             for html_type in types:
-                print(html_type.get_attribute("type"))
-            self.driver.implicitly_wait(1)
-            ids = self.driver.find_elements(By.XPATH, "//*[@id]")
+                LOG.debug("element type", sample=True, type=html_type["type"])
+            ids = self.extract(By.XPATH, "//*[@id]", ["id"])
             for html_id in ids:
-                print(html_id.get_attribute("id"))
+                LOG.debug("element id", sample=True, id=html_id["id"])
         except WebDriverException:
             self.driver.quit()
             raise WebDriverException
         finally:
-            self.driver.implicitly_wait(1)
-            body = self.driver.find_element(By.XPATH, "//body").get_attribute("innerText")
-            print(body)
+            body = self.page_text()
+            LOG.debug("page body", body=body)
         return body
 
+    @scenario("https://store.steampowered.com/", load="eager")
     def steam_element_presense(self):
         """
         :return: search result from steam website
         """
         base_url = "https://store.steampowered.com/"
         self.driver.maximize_window()
-        self.driver.implicitly_wait(1)
-        self.driver.get(base_url)
+        self.navigate(base_url)
         try:
+            index = self.text_index()
             for one_char in string.ascii_lowercase:
-                self.driver.implicitly_wait(1)
-                text = self.driver.find_elements(
-                    By.XPATH, "//*[contains(text(), '{}')]".format(one_char))
-                for html_text in text:
-                    print(html_text.get_attribute("innerText"))
-        except NoSuchElementException:
-            print("No more element presense.")
+                for html_text in index.containing(one_char):
+                    LOG.debug("element text", sample=True, text=html_text)
+        except WebDriverException:
             self.driver.quit()
+            raise WebDriverException
         finally:
-            self.driver.implicitly_wait(1)
-            body = self.driver.find_element(By.XPATH, "//body").get_attribute("innerText")
-            print(body)
+            body = self.page_text()
+            LOG.debug("page body", body=body)
         return body
 
+    @scenario("https://store.steampowered.com/search", writes=True)
     def steam_dynamic_xpath(self):
         """
-        :return: search result from steam website
+        :return: {term: {"results", "seconds", "attempts"}} for every search term
         """
         base_url = "https://store.steampowered.com/search"
         self.driver.maximize_window()
-        self.driver.implicitly_wait(1)
-        self.driver.get(base_url)
-        try:
-            for one_char in string.ascii_lowercase:
-                self.driver.implicitly_wait(1)
-                search = self.driver.find_element(By.XPATH, "//input[@id='store_nav_search_term']")
-                search.clear()
-                search.send_keys(one_char)
-                self.driver.implicitly_wait(1)
-                self.driver.find_element(By.XPATH, "//a[contains(text(),'2')]").click()
-                self.driver.implicitly_wait(1)
-                result = self.driver.find_element(
-                    By.XPATH, "//div[@id='search_results']").get_attribute("innerText")
-                print(result)
-        except WebDriverException:
-            self.driver.quit()
-            raise WebDriverException
-        finally:
-            self.driver.implicitly_wait(1)
-            body = self.driver.find_element(By.XPATH, "//body").get_attribute("innerText")
-            print(body)
-        return body
+        self.navigate(base_url)
+        self.mark_dirty()
+
+        def search(one_char):
+            search_box = self.cached(By.XPATH, "//input[@id='store_nav_search_term']")
+            search_box.clear()
+            search_box.send_keys(one_char)
+            self.wait_for(By.XPATH, "//a[contains(text(),'2')]").click()
+            return self.wait_for(
+                By.XPATH, "//div[@id='search_results']").get_attribute("innerText")
+
+        results = self.fan_out(
+            self.search_terms(),
+            url_for=lambda one_char: "{}/?{}".format(
+                base_url, urlencode({"term": one_char, "page": 2})),
+            ready=(By.ID, "search_results"),
+            read=lambda driver: driver.find_element(
+                By.ID, "search_results").get_attribute("innerText"),
+            fallback=search
+        )
+        for one_char, result in results.items():
+            LOG.debug("search results", sample=True, term=one_char,
+                      body=result.get("results"), error=result.get("error"))
+        return results
 
 
 if __name__ == '__main__':
     START = time.time()
     HAND = handler('main', 'main')
     END = time.time()
-    print("Time spent operating this lambda function: " + str(END - START) + " seconds")
+    print("Time spent operating this lambda function: " + str(END - START) + " seconds",
+          file=sys.stderr)
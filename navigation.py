@@ -0,0 +1,263 @@
+"""
+Navigation layer for Sele classes.
+Remembers which url is loaded and whether a scenario has touched the DOM since,
+so a read-only scenario on the same page skips the driver.get round-trip and
+reuses text already read from it. document_id changes with every page load.
+"""
+import time
+from collections import OrderedDict
+from urllib.parse import urlsplit, urlunsplit
+from selenium.webdriver.common.by import By
+from selenium.common.exceptions import WebDriverException
+from bulk_query import LOCATE_JS
+from wait_engine import poll_until
+from locator_compiler import compile_locator
+from scenario_runner import event_option
+
+CACHE_TTL = 60
+CACHE_SIZE = 16
+LOAD_TIMEOUT = 30
+LOAD_ORDER = ["none", "eager", "normal"]
+
+LEAVE_JS = "window.__seleLeaving = true; window.location.assign(arguments[0]);"
+
+LOADED_JS = LOCATE_JS + """
+if (window.__seleLeaving || document.URL === 'about:blank') { return false; }
+if (arguments[0] === 'eager' && document.readyState === 'loading') { return false; }
+if (arguments[0] === 'normal' && document.readyState !== 'complete') { return false; }
+if (arguments[1]) { return locate(arguments[1], arguments[2]).length > 0; }
+return true;
+"""
+
+
+def normalize_url(url):
+    """
+    :param url: absolute url
+    :return: url with lowercase host, an explicit root path and no fragment
+    """
+    parts = urlsplit(url)
+    return urlunsplit((parts.scheme.lower(), parts.netloc.lower(),
+                       parts.path or "/", parts.query, ""))
+
+
+def rewrite_url(event, url):
+    """
+    Point a site at another origin, e.g. the local fixture server of the
+    benchmark suite, with {"base_urls": {"https://www.tech.gov.sg": "http://..."}}.
+    :param event: aws event
+    :param url: url as written in the scenario
+    :return: url to actually load
+    """
+    base_urls = event_option(event, "base_urls") or {}
+    for origin in sorted(base_urls, key=len, reverse=True):
+        if url.startswith(origin):
+            return base_urls[origin] + url[len(origin):]
+    return url
+
+
+def wait_loaded(driver, url, load="eager", ready=None):
+    """
+    Poll the selected window until the document started with LEAVE_JS exists.
+    :param driver: WebDriver instance
+    :param url: page being loaded, for the timeout message
+    :param load: "normal" waits for the load event, "eager" for the DOM to be
+                 parsed and "none" only for the document
+    :param ready: optional (by, value) locator the page must contain
+    """
+    by, value = ready if ready else (None, None)
+
+    def loaded():
+        try:
+            return driver.execute_script(LOADED_JS, load, by, value)
+        except WebDriverException:
+            return False
+
+    poll_until(loaded, LOAD_TIMEOUT, message="Timed out loading {}".format(url))
+
+
+def page_cache_for(event):
+    """
+    :param event: aws event
+    :return: PageCache for one invocation, holding a single page when results
+             are streamed so memory stays bounded by the largest page
+    """
+    if event_option(event, "stream") is not None:
+        return PageCache(size=1)
+    return PageCache()
+
+
+class PageCache:
+    """
+    Snapshots of page text keyed by (url, locator), with a TTL and LRU eviction
+    """
+
+    def __init__(self, ttl=CACHE_TTL, size=CACHE_SIZE):
+        self.ttl = ttl
+        self.size = size
+        self.entries = OrderedDict()
+
+    def get(self, url, locator):
+        """
+        :param url: page url
+        :param locator: what was read from the page, e.g. "//body" or "page_source"
+        :return: cached text or None when missing or expired
+        """
+        key = (normalize_url(url), locator)
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        stored, text = entry
+        if time.time() - stored > self.ttl:
+            del self.entries[key]
+            return None
+        self.entries.move_to_end(key)
+        return text
+
+    def put(self, url, locator, text):
+        """
+        :param url: page url
+        :param locator: what was read from the page
+        :param text: snapshot to keep
+        """
+        key = (normalize_url(url), locator)
+        self.entries[key] = (time.time(), text)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.size:
+            self.entries.popitem(last=False)
+
+
+class Navigator:
+    """
+    Mixin for Sele classes, needs self.event, self.driver and self.page_cache
+    """
+    loaded_url = None
+    dom_clean = False
+    current_target = None
+    document_id = 0
+    session_load = "normal"
+
+    def page_load_strategy(self):
+        """
+        :return: pageLoadStrategy to launch the session with, "page_load" in
+                 the event or else the earliest load declared by a scenario of
+                 the class, so script started loads are not blocked by
+                 chromedriver waiting for the load event
+        """
+        strategy = event_option(self.event, "page_load")
+        if strategy in LOAD_ORDER:
+            return strategy
+        loads = [attribute.target.load for attribute in vars(type(self)).values()
+                 if getattr(attribute, "target", None) is not None]
+        return min(loads + ["normal"], key=LOAD_ORDER.index)
+
+    def apply_load_strategy(self):
+        """
+        Set the pageLoadStrategy capability before the session is borrowed,
+        options_key keeps sessions with different strategies apart.
+        """
+        self.session_load = self.page_load_strategy()
+        self.options.set_capability("pageLoadStrategy", self.session_load)
+
+    def navigate(self, url, force=False, load=None, ready=None):
+        """
+        load and ready default to the @scenario declaration of the running
+        scenario. "normal" waits for the load event like driver.get, "eager"
+        returns once the DOM is parsed and "none" as soon as the new document
+        exists, in both cases after the ready locator is present. They only
+        return earlier than "normal" on sessions launched with an earlier
+        pageLoadStrategy, see apply_load_strategy.
+        :param url: page to load
+        :param force: load even when the page is already loaded and clean
+        :param load: page load strategy, "normal", "eager" or "none"
+        :param ready: (by, value) locator the page must contain before returning
+        :return: True when the page was actually loaded
+        """
+        if not force and self.dom_clean and self.loaded_url == normalize_url(url):
+            return False
+        target = self.current_target
+        if load is None:
+            load = target.load if target else "normal"
+        if ready is None and target:
+            ready = target.ready
+        if load == "normal" and self.session_load == "normal":
+            self.driver.get(self.rewrite_url(url))
+        else:
+            self.load_early(self.rewrite_url(url), load, ready)
+        self.loaded_url = normalize_url(url)
+        self.dom_clean = True
+        self.document_id += 1
+        return True
+
+    def rewrite_url(self, url):
+        """
+        :param url: url as written in the scenario
+        :return: url to actually load, see rewrite_url
+        """
+        return rewrite_url(self.event, url)
+
+    def load_early(self, url, load, ready):
+        """
+        Start the navigation from script so WebDriver does not block on the
+        load event, then poll for the new document.
+        :param url: page to load
+        :param load: "normal", "eager" or "none"
+        :param ready: optional (by, value) locator
+        """
+        self.driver.execute_script(LEAVE_JS, url)
+        wait_loaded(self.driver, url, load, ready)
+
+    def mark_dirty(self):
+        """
+        Call before clicking, typing or leaving the page, the next navigate
+        reloads it and cached snapshots of it are no longer served.
+        """
+        self.dom_clean = False
+
+    def find(self, by, value):
+        """
+        :param by: selenium By strategy
+        :param value: locator value
+        :return: driver.find_element with the locator rewritten by compile_locator
+        """
+        return self.driver.find_element(*compile_locator(by, value))
+
+    def page_text(self, xpath="//body"):
+        """
+        :param xpath: element whose innerText is read
+        :return: innerText, from the cache when the page is still clean
+        """
+        if self.dom_clean:
+            text = self.page_cache.get(self.loaded_url, xpath)
+            if text is not None:
+                return text
+        text = self.find(By.XPATH, xpath).get_attribute("innerText")
+        if self.dom_clean:
+            self.page_cache.put(self.loaded_url, xpath, text)
+        return text
+
+    def page_source(self):
+        """
+        :return: page_source, from the cache when the page is still clean
+        """
+        if self.dom_clean:
+            source = self.page_cache.get(self.loaded_url, "page_source")
+            if source is not None:
+                return source
+        source = self.driver.page_source
+        if self.dom_clean:
+            self.page_cache.put(self.loaded_url, "page_source", source)
+        return source
+
+    def snapshot(self, url, xpath="//body"):
+        """
+        Read-only access to a page, served from the cache without touching
+        the browser when a fresh snapshot exists.
+        :param url: page url
+        :param xpath: element whose innerText is read
+        :return: innerText of the element
+        """
+        text = self.page_cache.get(url, xpath)
+        if text is not None:
+            return text
+        self.navigate(url)
+        return self.page_text(xpath)
@@ -0,0 +1,215 @@
+"""
+Offline extraction for read-only scenarios.
+With {"extract": "offline"} in the event, queries that only read the DOM run
+with lxml on page_source, fetched once per document, instead of costing
+WebDriver round-trips per element. Counts and attributes match the live
+page. innerText is approximated from the text nodes outside script and
+style, and "displayed" needs layout, so queries reading it stay live. Without
+lxml, or for locators lxml cannot run, the live query is used.
+"""
+import re
+from selenium.webdriver.common.by import By
+from scenario_runner import event_option
+from locator_compiler import compile_locator
+
+try:
+    import lxml.html
+    from lxml import etree
+except ImportError:
+    lxml = None
+    etree = None
+
+try:
+    from lxml.cssselect import CSSSelector
+except ImportError:
+    CSSSelector = None
+
+LIVE_ONLY = {"displayed"}
+SIMPLE_CSS = re.compile(r"^\s*([#.]?)([A-Za-z][\w-]*)\s*$")
+SPACES = re.compile(r"\s+")
+SKIPPED = {"script", "style", "noscript", "template", "head"}
+BLOCKS = {
+    "address", "article", "aside", "blockquote", "br", "dd", "div", "dl", "dt",
+    "fieldset", "figcaption", "figure", "footer", "form", "h1", "h2", "h3", "h4",
+    "h5", "h6", "header", "hr", "li", "main", "nav", "ol", "p", "pre", "section",
+    "table", "tr", "ul"
+}
+
+
+def literal(value):
+    """
+    :param value: string to compare with in an XPath expression
+    :return: value as an XPath 1.0 string literal
+    """
+    if "'" not in value:
+        return "'{}'".format(value)
+    if '"' not in value:
+        return '"{}"'.format(value)
+    return "concat('{}')".format("', \"'\", '".join(value.split("'")))
+
+
+def to_xpath(by, value):
+    """
+    :param by: selenium By strategy
+    :param value: locator value
+    :return: XPath selecting the same elements, None for CSS selectors
+             other than #id, .class or tag
+    """
+    if by == By.XPATH:
+        return value
+    if by == By.ID:
+        return "//*[@id={}]".format(literal(value))
+    if by == By.NAME:
+        return "//*[@name={}]".format(literal(value))
+    if by == By.TAG_NAME:
+        return "//{}".format(value)
+    if by == By.CLASS_NAME:
+        return "//*[contains(concat(' ', normalize-space(@class), ' '), {})]".format(
+            literal(" {} ".format(value)))
+    if by == By.LINK_TEXT:
+        return "//a[normalize-space(.)={}]".format(literal(value))
+    if by == By.PARTIAL_LINK_TEXT:
+        return "//a[contains(normalize-space(.), {})]".format(literal(value))
+    if by == By.CSS_SELECTOR:
+        match = SIMPLE_CSS.match(value)
+        if match:
+            return to_xpath({"#": By.ID, ".": By.CLASS_NAME, "": By.TAG_NAME}[match.group(1)],
+                            match.group(2))
+    return None
+
+
+def inner_text(element):
+    """
+    :param element: lxml element
+    :return: text of the element without script and style, whitespace
+             collapsed and one line per block element, close to innerText
+    """
+    parts = []
+
+    def walk(node):
+        if not isinstance(node.tag, str) or node.tag in SKIPPED:
+            return
+        block = node.tag in BLOCKS
+        if block:
+            parts.append("\n")
+        parts.append(SPACES.sub(" ", node.text or ""))
+        for child in node:
+            walk(child)
+            parts.append(SPACES.sub(" ", child.tail or ""))
+        if block:
+            parts.append("\n")
+
+    walk(element)
+    lines = (line.strip() for line in "".join(parts).split("\n"))
+    return "\n".join(line for line in lines if line)
+
+
+class DomSnapshot:
+    """
+    Parsed page_source answering element queries in-process. Text is
+    parsed as UTF-8 bytes, so an XML declaration does not stop lxml, and
+    bytes of unknown encoding are left to lxml to detect.
+    """
+
+    def __init__(self, source):
+        parser = None
+        if isinstance(source, str):
+            source = source.encode("utf-8")
+            parser = lxml.html.HTMLParser(encoding="utf-8")
+        self.root = lxml.html.document_fromstring(source, parser=parser)
+
+    def find_elements(self, by, value):
+        """
+        :param by: selenium By strategy
+        :param value: locator value
+        :return: matched lxml elements in document order
+        :raises ValueError: when the locator cannot be run offline
+        """
+        xpath = to_xpath(by, value)
+        try:
+            if xpath is not None:
+                found = self.root.xpath(xpath)
+            elif by == By.CSS_SELECTOR and CSSSelector is not None:
+                found = CSSSelector(value)(self.root)
+            else:
+                raise ValueError("No offline support for {} locators".format(by))
+        except etree.XPathError as error:
+            raise ValueError(str(error))
+        return [node for node in found if isinstance(node, etree.ElementBase)]
+
+    def read(self, element, prop):
+        """
+        :param element: lxml element
+        :param prop: property name as in BulkQuery.query_elements
+        :return: property value as the live query would give it
+        """
+        if prop == "innerText":
+            return inner_text(element)
+        if prop == "textContent":
+            return element.text_content()
+        if prop == "enabled":
+            return element.get("disabled") is None
+        if prop == "selected":
+            return element.get("checked") is not None or element.get("selected") is not None
+        return element.get(prop)
+
+    def query(self, by, value, properties):
+        """
+        :param by: selenium By strategy
+        :param value: locator value
+        :param properties: list of property names to read
+        :return: list of dicts, one per matched element, in document order
+        """
+        return [{prop: self.read(element, prop) for prop in properties}
+                for element in self.find_elements(by, value)]
+
+
+class OfflineExtract:
+    """
+    Mixin for Sele classes, needs BulkQuery and Navigator
+    """
+    dom_snapshot_cache = None
+
+    def offline(self):
+        """
+        :return: True when the event asked for offline extraction and lxml is installed
+        """
+        return lxml is not None and event_option(self.event, "extract", "live") == "offline"
+
+    def dom_snapshot(self):
+        """
+        :return: DomSnapshot of the current document, parsed once per page load
+        """
+        cache = self.dom_snapshot_cache
+        if cache is None or cache[0] != self.document_id or not self.dom_clean:
+            cache = (self.document_id, DomSnapshot(self.page_source()))
+            self.dom_snapshot_cache = cache
+        return cache[1]
+
+    def extract(self, by, value, properties):
+        """
+        BulkQuery.query_elements, answered from the page source when offline.
+        :param by: selenium By strategy
+        :param value: locator value
+        :param properties: list of property names to read
+        :return: list of dicts, one per matched element, in document order
+        """
+        if self.offline() and not LIVE_ONLY.intersection(properties):
+            try:
+                return self.dom_snapshot().query(by, value, properties)
+            except ValueError:
+                pass
+        return self.query_elements(by, value, properties)
+
+    def count(self, by, value):
+        """
+        :param by: selenium By strategy
+        :param value: locator value
+        :return: number of matched elements
+        """
+        if self.offline():
+            try:
+                return len(self.dom_snapshot().find_elements(by, value))
+            except ValueError:
+                pass
+        return len(self.driver.find_elements(*compile_locator(by, value)))
@@ -0,0 +1,81 @@
+"""
+Pagination crawler for Sele classes.
+When the pagination links of a listing carry the page number in a page= query
+parameter, every page is loaded directly and at the same time in a TabPool.
+Otherwise the crawler falls back to clicking the next link page by page.
+Event options:
+    "pages": number of pages to read, 7 by default
+    "tabs": tabs loading pages at the same time, 4 by default
+"""
+from urllib.parse import urlsplit, urlunsplit, parse_qs, urlencode
+from bulk_query import LOCATE_JS
+from scenario_runner import event_option
+from tab_pool import TabPool, TABS
+
+PAGES = 7
+
+LINK_HREFS_JS = LOCATE_JS + """
+return locate(arguments[0], arguments[1]).map(function (link) { return link.href || ''; });
+"""
+
+
+def page_url(href, page):
+    """
+    :param href: url of any page of the listing
+    :param page: page number wanted
+    :return: href with its page= parameter set to page
+    """
+    parts = urlsplit(href)
+    query = parse_qs(parts.query, keep_blank_values=True)
+    query["page"] = [str(page)]
+    return urlunsplit((parts.scheme, parts.netloc, parts.path,
+                       urlencode(query, doseq=True), ""))
+
+
+class Paginator:
+    """
+    Mixin for Sele classes, needs self.event, self.driver and AdaptiveWait
+    """
+
+    def page_numbers(self):
+        """
+        :return: pages 1 to the "pages" event option
+        """
+        return list(range(1, int(event_option(self.event, "pages", PAGES)) + 1))
+
+    def page_urls(self, pager, pages):
+        """
+        :param pager: (by, value) locator of the pagination links on the loaded page
+        :param pages: page numbers wanted
+        :return: url of every page, None when no link has a page= parameter
+        """
+        for href in self.driver.execute_script(LINK_HREFS_JS, *pager):
+            if "page" in parse_qs(urlsplit(href).query):
+                return [page_url(href, page) for page in pages]
+        return None
+
+    def crawl(self, pages, pager, next_link, ready, read):
+        """
+        Read pages of the listing loaded in the current tab, which is left on
+        the first page when direct urls are used.
+        :param pages: page numbers wanted, the first one is the loaded page
+                      when clicking through
+        :param pager: (by, value) locator of the pagination links
+        :param next_link: (by, value) locator of the link to the next page
+        :param ready: function of the page number returning a (by, value)
+                      locator present once that page is shown
+        :param read: function of the page number returning what to keep of it
+        :return: what read returned for every page, in page order
+        """
+        urls = self.page_urls(pager, pages)
+        if urls is not None:
+            with TabPool(self.driver, event_option(self.event, "tabs", TABS)) as tabs:
+                return tabs.map(urls, lambda index: read(pages[index]),
+                                lambda index: ready(pages[index]))
+        results = []
+        for number, page in enumerate(pages):
+            if number:
+                self.wait_for(*next_link).click()
+                self.wait_for(*ready(page))
+            results.append(read(page))
+        return results
@@ -0,0 +1,127 @@
+"""
+Readiness waits driven by the page instead of the clock.
+An injected MutationObserver records when a region last changed and wrapped
+XMLHttpRequest / fetch count the requests still in flight, so a scenario can
+move on as soon as the page has settled rather than after a fixed sleep.
+"""
+from selenium.common.exceptions import TimeoutException
+from bulk_query import LOCATE_JS
+from wait_engine import poll_until
+
+QUIET = 0.3
+NETWORK_IDLE = 0.5
+READY_CAP = 5
+
+READINESS_JS = LOCATE_JS + """
+var key = arguments[0], by = arguments[1], value = arguments[2];
+var state = window.__seleReady;
+if (!state) {
+    state = window.__seleReady = {inflight: 0, lastNetwork: Date.now(), regions: {}};
+    var send = XMLHttpRequest.prototype.send;
+    XMLHttpRequest.prototype.send = function () {
+        state.inflight++;
+        this.addEventListener('loadend', function () {
+            state.inflight--;
+            state.lastNetwork = Date.now();
+        });
+        return send.apply(this, arguments);
+    };
+    if (window.fetch) {
+        var fetch = window.fetch;
+        window.fetch = function () {
+            state.inflight++;
+            var done = function () { state.inflight--; state.lastNetwork = Date.now(); };
+            return fetch.apply(this, arguments).then(
+                function (response) { done(); return response; },
+                function (error) { done(); throw error; });
+        };
+    }
+}
+if (!state.regions[key]) {
+    var target = by ? locate(by, value)[0] : document.documentElement;
+    if (target) {
+        state.regions[key] = {lastMutation: Date.now()};
+        new MutationObserver(function () {
+            state.regions[key].lastMutation = Date.now();
+        }).observe(target, {childList: true, subtree: true, attributes: true, characterData: true});
+    }
+}
+var region = state.regions[key];
+return {
+    now: Date.now(),
+    inflight: state.inflight,
+    lastNetwork: state.lastNetwork,
+    lastMutation: region ? region.lastMutation : null
+};
+"""
+
+
+class Readiness:
+    """
+    Mixin for Sele classes, needs self.driver.
+    Call watch before the click or submit so the requests and mutations it
+    causes are seen, then settle to wait for them to finish.
+    """
+
+    def watch(self, by=None, value=None):
+        """
+        Install the observers on the current document.
+        :param by: selenium By strategy of the region, None for the whole document
+        :param value: locator value of the region
+        :return: readiness state read from the page
+        """
+        key = "{}:{}".format(by, value) if by else "document"
+        return self.driver.execute_script(READINESS_JS, key, by, value)
+
+    def settle(self, by=None, value=None, quiet=QUIET, network_idle=NETWORK_IDLE,
+               timeout=READY_CAP):
+        """
+        Wait until the region has not changed for quiet seconds and no request
+        has been in flight for network_idle seconds. Pass network_idle=None
+        to only watch the DOM, or quiet=None to only watch the network.
+        :param by: selenium By strategy of the region, None for the whole document
+        :param value: locator value of the region
+        :param quiet: seconds without DOM mutations
+        :param network_idle: seconds without requests in flight
+        :param timeout: hard cap in seconds
+        :return: True when the page settled, False when the cap was hit
+        """
+        start = self.watch(by, value)["now"]
+
+        def check():
+            state = self.watch(by, value)
+            now = state["now"]
+            if quiet is not None:
+                last = max(state["lastMutation"] or start, start)
+                if now - last < quiet * 1000:
+                    return False
+            if network_idle is not None:
+                if state["inflight"] > 0:
+                    return False
+                if now - max(state["lastNetwork"], start) < network_idle * 1000:
+                    return False
+            return True
+
+        try:
+            poll_until(check, timeout)
+        except TimeoutException:
+            return False
+        return True
+
+    def wait_dom_quiet(self, by=None, value=None, quiet=QUIET, timeout=READY_CAP):
+        """
+        :param by: selenium By strategy of the region, None for the whole document
+        :param value: locator value of the region
+        :param quiet: seconds without DOM mutations
+        :param timeout: hard cap in seconds
+        :return: True when the region stopped changing before the cap
+        """
+        return self.settle(by, value, quiet=quiet, network_idle=None, timeout=timeout)
+
+    def wait_network_idle(self, network_idle=NETWORK_IDLE, timeout=READY_CAP):
+        """
+        :param network_idle: seconds without requests in flight
+        :param timeout: hard cap in seconds
+        :return: True when the network went idle before the cap
+        """
+        return self.settle(quiet=None, network_idle=network_idle, timeout=timeout)
@@ -0,0 +1,160 @@
+"""
+Named resource blocking profiles for faster page loads.
+None of the scenarios read images, video, fonts or tracker responses, an
+event can pick a profile with {"resources": "text-only"} and Chrome will not
+download them. Images are switched off through Chrome prefs, everything else
+is blocked by url pattern through the DevTools Network domain. Page weight
+is measured from the Network events of Chrome's performance log, the
+encoded bytes Chrome actually received, so cross-origin responses count too.
+The last "full" load of a url in the container is its baseline, later loads
+under another profile report what they saved against it.
+"""
+import json
+import time
+from selenium.common.exceptions import WebDriverException
+from scenario_runner import event_option
+from structured_log import get_logger
+
+MEDIA = ["*.mp4", "*.webm", "*.m3u8", "*.ogg", "*.mp3", "*.ts?*"]
+FONTS = ["*.woff", "*.woff2", "*.ttf", "*.otf", "*fonts.googleapis.com*"]
+TRACKERS = [
+    "*google-analytics.com*", "*googletagmanager.com*", "*doubleclick.net*",
+    "*facebook.net*", "*hotjar.com*", "*scorecardresearch.com*", "*adservice.google.*"
+]
+NO_IMAGES = {"profile.managed_default_content_settings.images": 2}
+LOG = get_logger(__name__)
+
+PROFILES = {
+    "full": {"prefs": {}, "blocked": []},
+    "no-media": {"prefs": NO_IMAGES, "blocked": MEDIA},
+    "text-only": {"prefs": NO_IMAGES, "blocked": MEDIA + FONTS + TRACKERS}
+}
+
+PERFORMANCE_LOG = {"performance": "ALL"}
+OTHER_LOADS = "other"
+
+BASELINES = {}
+
+
+class ResourceProfile:
+    """
+    Mixin for Sele classes, needs self.event, self.options, self.driver and
+    self.report. List it before Navigator so navigate() is wrapped.
+    """
+
+    def profile_name(self):
+        """
+        :return: profile selected by the event, "full" by default
+        """
+        name = event_option(self.event, "resources", "full")
+        if name not in PROFILES:
+            LOG.warning("Unknown resource profile", profile=name)
+            return "full"
+        return name
+
+    def apply_profile_options(self):
+        """
+        Add the profile prefs to self.options, call before launching Chrome.
+        When the event asked for a profile the performance log is switched on
+        to measure the pages.
+        """
+        prefs = PROFILES[self.profile_name()]["prefs"]
+        if prefs:
+            self.options.add_experimental_option("prefs", prefs)
+        if event_option(self.event, "resources") is not None:
+            self.options.set_capability("goog:loggingPrefs", PERFORMANCE_LOG)
+
+    def apply_profile_session(self):
+        """
+        Set the blocked url patterns on the session, pooled sessions keep the
+        patterns of their last borrower so "full" clears them.
+        """
+        try:
+            self.driver.execute_cdp_cmd("Network.enable", {})
+            self.driver.execute_cdp_cmd(
+                "Network.setBlockedURLs", {"urls": PROFILES[self.profile_name()]["blocked"]})
+        except WebDriverException as error:
+            LOG.warning("Resource blocking unavailable", error=error)
+
+    def navigate(self, url, force=False, load=None, ready=None):
+        """
+        Navigator.navigate, recording the page weight when the event asked
+        for a resource profile.
+        :param url: page to load
+        :param force: load even when the page is already loaded and clean
+        :param load: page load strategy, "normal", "eager" or "none"
+        :param ready: (by, value) locator the page must contain before returning
+        :return: True when the page was actually loaded
+        """
+        measure = event_option(self.event, "resources") is not None
+        if measure:
+            self.record_other_loads()
+        start = time.time()
+        loaded = super().navigate(url, force, load, ready)
+        if loaded and measure:
+            self.record_page_stats(url, (time.time() - start) * 1000)
+        return loaded
+
+    def record_other_loads(self):
+        """
+        Add the requests made since the last measured navigate, by driver.get,
+        TabPool or fan-out tabs, as one "other" entry of the "resources"
+        report. Call it before the session is released too.
+        """
+        if event_option(self.event, "resources") is None:
+            return
+        weight = page_weight(self.network_events())
+        if weight["requests"] or weight["blocked"]:
+            self.report.setdefault("resources", []).append(
+                dict({"url": OTHER_LOADS, "profile": self.profile_name()}, **weight))
+
+    def network_events(self):
+        """
+        :return: DevTools Network events logged since the last call
+        """
+        try:
+            entries = self.driver.get_log("performance")
+        except WebDriverException:
+            return []
+        events = []
+        for entry in entries:
+            message = json.loads(entry["message"]).get("message", {})
+            if message.get("method", "").startswith("Network."):
+                events.append(message)
+        return events
+
+    def record_page_stats(self, url, navigate_ms):
+        """
+        Add the weight of the loaded page to the "resources" report, see
+        page_weight, with navigate_ms and the bytes and milliseconds saved
+        against the "full" baseline of the url, None without one.
+        :param url: page just loaded
+        :param navigate_ms: wall time of the navigate call
+        """
+        name = self.profile_name()
+        entry = dict({"url": url, "profile": name, "navigate_ms": round(navigate_ms),
+                      "bytes_saved": None, "load_ms_saved": None},
+                     **page_weight(self.network_events()))
+        if name == "full":
+            BASELINES[url] = entry
+        elif url in BASELINES:
+            entry["bytes_saved"] = BASELINES[url]["bytes"] - entry["bytes"]
+            entry["load_ms_saved"] = BASELINES[url]["navigate_ms"] - entry["navigate_ms"]
+        self.report.setdefault("resources", []).append(entry)
+
+
+def page_weight(events):
+    """
+    Images switched off by prefs are never requested, so they are not
+    counted as blocked.
+    :param events: DevTools Network events of one or more page loads
+    :return: {"bytes": encoded bytes of the finished requests, "requests":
+             their number, "blocked": requests the profile's url patterns
+             blocked}
+    """
+    finished = [event["params"] for event in events
+                if event["method"] == "Network.loadingFinished"]
+    blocked = [event for event in events if event["method"] == "Network.loadingFailed"
+               and event["params"].get("blockedReason")]
+    return {"bytes": int(sum(params.get("encodedDataLength", 0) for params in finished)),
+            "requests": len(finished), "blocked": len(blocked)}
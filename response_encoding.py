@@ -0,0 +1,103 @@
+"""
+Encode handler results into a Lambda proxy response.
+Event options:
+    "max_field_bytes": cap every string in the result, with a truncation marker
+    "dedupe": store repeated page text once, see blob_store, after truncation
+              so the blob keys describe the text actually sent
+    "encoding": "gzip", "zstd", "identity" or "auto" (default)
+    "compress_above": body size in bytes above which "auto" compresses
+Compressed bodies are base64 encoded with isBase64Encoded set, the encoding
+used is given in the Content-Encoding header. X-Body-Encoding names it for
+every response, "identity" included.
+"""
+import base64
+import gzip
+import json
+from scenario_runner import event_option
+from blob_store import dedupe_result
+from structured_log import get_logger
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+COMPRESS_ABOVE = 256 * 1024
+TRUNCATED = "...[truncated {} bytes]"
+LOG = get_logger(__name__)
+
+
+def truncate(value, limit, counter):
+    """
+    :param value: result value, strings inside dicts and lists are capped too
+    :param limit: maximum utf-8 bytes per string
+    :param counter: one item list counting truncated strings
+    :return: value with every string cut to limit bytes plus a marker
+    """
+    if isinstance(value, str):
+        data = value.encode("utf-8")
+        if len(data) <= limit:
+            return value
+        counter[0] += 1
+        kept = data[:limit].decode("utf-8", "ignore")
+        return kept + TRUNCATED.format(len(data) - len(kept.encode("utf-8")))
+    if isinstance(value, dict):
+        return {key: truncate(item, limit, counter) for key, item in value.items()}
+    if isinstance(value, list):
+        return [truncate(item, limit, counter) for item in value]
+    return value
+
+
+def compress(data, encoding):
+    """
+    :param data: body bytes
+    :param encoding: "gzip" or "zstd"
+    :return: (compressed bytes, encoding actually used)
+    """
+    if encoding == "zstd":
+        if zstandard is not None:
+            return zstandard.ZstdCompressor().compress(data), "zstd"
+        LOG.warning("zstandard is not installed, using gzip")
+    return gzip.compress(data, compresslevel=6), "gzip"
+
+
+def build_response(obj, event, headers=None):
+    """
+    :param obj: json serializable handler result
+    :param event: aws event carrying the encoding options
+    :param headers: extra response headers
+    :return: Lambda proxy response dict
+    """
+    headers = dict({'Content-Type': 'application/json'}, **(headers or {}))
+    limit = event_option(event, "max_field_bytes")
+    if limit:
+        counter = [0]
+        obj = truncate(obj, int(limit), counter)
+        headers['X-Truncated-Fields'] = str(counter[0])
+    mode = event_option(event, "dedupe")
+    if mode and isinstance(obj, dict):
+        obj = dedupe_result(obj, mode)
+
+    body = json.dumps(obj)
+    data = body.encode("utf-8")
+    encoding = event_option(event, "encoding", "auto")
+    if encoding == "auto":
+        threshold = int(event_option(event, "compress_above", COMPRESS_ABOVE))
+        encoding = "gzip" if len(data) > threshold else "identity"
+    if encoding == "identity":
+        headers['X-Body-Encoding'] = "identity"
+        return {
+            "statusCode": 200,
+            "body": body,
+            'headers': headers
+        }
+
+    data, encoding = compress(data, encoding)
+    headers['Content-Encoding'] = encoding
+    headers['X-Body-Encoding'] = encoding
+    return {
+        "statusCode": 200,
+        "body": base64.b64encode(data).decode("ascii"),
+        "isBase64Encoded": True,
+        'headers': headers
+    }
@@ -0,0 +1,58 @@
+"""
+Streaming NDJSON output for handlers.
+With {"stream": "/tmp/results.ndjson"} (or "-" for stdout, or a named pipe) in
+the event, each scenario result is written as one JSON line as soon as the
+scenario finishes and is not kept for the response body. Logs and other
+output go to stderr, so stdout carries only the records. A runtime that gives
+the handler a Lambda response stream can attach it as context.response_stream.
+"""
+import io
+import json
+import sys
+from contextlib import contextmanager
+from scenario_runner import event_option
+
+
+class NdjsonSink:
+    """
+    Write one {"scenario": key, "result": value} line per record
+    """
+
+    def __init__(self, stream):
+        self.stream = stream
+        self.text = isinstance(stream, io.TextIOBase)
+        self.records = 0
+
+    def write(self, key, result):
+        """
+        :param key: output key of the scenario
+        :param result: scenario result, must be json serializable
+        :return: number of bytes written
+        """
+        line = json.dumps({"scenario": key, "result": result}) + "\n"
+        data = line.encode("utf-8")
+        self.stream.write(line if self.text else data)
+        if hasattr(self.stream, "flush"):
+            self.stream.flush()
+        self.records += 1
+        return len(data)
+
+
+@contextmanager
+def open_sink(event, context=None):
+    """
+    :param event: aws event, "stream" selects the target
+    :param context: aws context, its response_stream wins when present
+    :return: context manager yielding an NdjsonSink, or None when not streaming
+    """
+    response_stream = getattr(context, "response_stream", None)
+    target = event_option(event, "stream")
+    if response_stream is not None:
+        yield NdjsonSink(response_stream)
+    elif target is None:
+        yield None
+    elif target in ("-", "stdout"):
+        yield NdjsonSink(sys.__stdout__)
+    else:
+        with open(target, "w", encoding="utf-8") as stream:
+            yield NdjsonSink(stream)
@@ -0,0 +1,157 @@
+"""
+Reorder scenarios so that work on the same page runs back to back.
+Each scenario method declares the page it starts on and whether it leaves the
+DOM dirty, the planner groups them by page and runs read-only ones first so
+the Navigator can skip the reload between them. A scenario that changes the
+browser session, e.g. logs in or sets cookies, is a barrier: nothing is
+moved across it.
+"""
+import functools
+from collections import namedtuple, OrderedDict
+from navigation import normalize_url
+from scenario_runner import run_scenarios, event_option
+
+Target = namedtuple("Target", ["name", "url", "writes", "load", "ready", "session"])
+Plan = namedtuple("Plan", ["order", "naive", "planned", "saved"])
+Unit = namedtuple("Unit", ["url", "writes", "session", "members"])
+
+
+def scenario(url=None, writes=False, load="normal", ready=None, session=False):
+    """
+    Declare the page a scenario method starts on and how much of it it needs.
+    While the method runs the Sele instance exposes the declaration as
+    self.current_target, which Navigator.navigate uses for its defaults.
+    :param url: page the scenario loads first, None when it continues on
+                the page left by the scenario listed before it
+    :param writes: True when the scenario clicks, types or navigates away
+    :param load: page load strategy, "normal", "eager" or "none"
+    :param ready: (by, value) locator that must exist before the scenario starts
+    :param session: True when the scenario changes state of the browser
+                    session that later scenarios see, such as cookies or a login
+    :return: decorator attaching the target to the method
+    """
+    def decorate(func):
+        target = Target(func.__name__, normalize_url(url) if url else None,
+                        writes, load, ready, session)
+
+        @functools.wraps(func)
+        def run(self, *args, **kwargs):
+            previous = getattr(self, "current_target", None)
+            self.current_target = target
+            try:
+                return func(self, *args, **kwargs)
+            finally:
+                self.current_target = previous
+
+        run.target = target
+        return run
+    return decorate
+
+
+def target_of(sele_class, name):
+    """
+    :param sele_class: Sele class owning the method
+    :param name: scenario method name
+    :return: declared Target, undeclared methods are treated as writing
+             to a page of their own and changing the session
+    """
+    return getattr(getattr(sele_class, name), "target",
+                   Target(name, name, True, "normal", None, True))
+
+
+def count_loads(sele_class, scenarios):
+    """
+    :param sele_class: Sele class owning the methods
+    :param scenarios: dict of output key -> method name, in run order
+    :return: number of driver.get calls the Navigator will make
+    """
+    loads = 0
+    loaded, clean = None, False
+    for name in scenarios.values():
+        target = target_of(sele_class, name)
+        if target.url is not None:
+            if target.url != loaded or not clean:
+                loads += 1
+            loaded = target.url
+            clean = True
+        clean = clean and not target.writes
+    return loads
+
+
+def plan_scenarios(sele_class, scenarios):
+    """
+    :param sele_class: Sele class owning the methods
+    :param scenarios: dict of output key -> method name, in declared order
+    :return: Plan with the new order and the page loads before and after
+    """
+    units = []
+    for key, name in scenarios.items():
+        target = target_of(sele_class, name)
+        if target.url is None and units:
+            units[-1].members.append((key, name))
+            units[-1] = units[-1]._replace(writes=units[-1].writes or target.writes,
+                                           session=units[-1].session or target.session)
+        else:
+            units.append(Unit(target.url, target.writes, target.session, [(key, name)]))
+
+    segments = [[]]
+    for unit in units:
+        if unit.session:
+            segments.extend([[unit], []])
+        else:
+            segments[-1].append(unit)
+
+    order = OrderedDict()
+    for segment in segments:
+        pages = OrderedDict()
+        for unit in segment:
+            pages.setdefault(unit.url, []).append(unit)
+        for page_units in pages.values():
+            for unit in sorted(page_units, key=lambda item: item.writes):
+                order.update(unit.members)
+
+    naive = count_loads(sele_class, scenarios)
+    planned = count_loads(sele_class, order)
+    return Plan(order, naive, planned, naive - planned)
+
+
+def page_groups(sele_class, scenarios):
+    """
+    :param sele_class: Sele class owning the methods
+    :param scenarios: dict of output key -> method name
+    :return: lists of (key, name) in planned order, one per page, a scenario
+             declared without a url stays with the one before it and the
+             scenarios after one that changes the session stay with it
+    """
+    groups = OrderedDict()
+    url, barrier = None, None
+    for key, name in plan_scenarios(sele_class, scenarios).order.items():
+        target = target_of(sele_class, name)
+        if barrier is None:
+            url = target.url or url
+            if target.session:
+                barrier = url
+        groups.setdefault(barrier or url, []).append((key, name))
+    return list(groups.values())
+
+
+def run_planned(sele_class, event, scenarios, report=None, sink=None, context=None,
+                runner=run_scenarios):
+    """
+    :param sele_class: Sele class of the calling module
+    :param event: aws event
+    :param scenarios: dict of output key -> method name
+    :param report: optional dict collecting the report sections of the sessions
+    :param sink: optional NdjsonSink receiving each result as it finishes
+    :param context: aws context, for its deadline
+    :param runner: run_scenarios or a function taking the same arguments
+    :return: (results in the declared key order, Plan used to run them or
+             None when they did not run one after another on one session in
+             planned order, e.g. with "concurrency" or async orchestration)
+    """
+    plan = plan_scenarios(sele_class, scenarios)
+    results = runner(sele_class, event, plan.order, report, sink, context)
+    sequential = (runner is run_scenarios and not event_option(event, "priorities")
+                  and int(event_option(event, "concurrency", 1)) <= 1)
+    return ({key: results[key] for key in scenarios if key in results},
+            plan if sequential else None)
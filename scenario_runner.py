@@ -0,0 +1,364 @@
+"""
+Run the scenario methods of a Sele class and collect their results.
+Scenarios are given as an ordered dict of output key -> method name so the
+handler body keeps the same keys whatever order they actually run in.
+Under a deadline, from the Lambda context or {"deadline": seconds} in the
+event, scenarios run by "priorities" (higher first), each within a budget,
+and the ones that cannot finish are listed under "skipped", "timed_out"
+and "failed".
+"""
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed, TimeoutError as FutureTimeout
+from structured_log import get_logger
+
+RESERVE = 2
+BUDGET_FACTOR = 3
+MIN_BUDGET = 10
+DURATION_WEIGHT = 0.3
+
+DURATIONS = {}
+LOG = get_logger(__name__)
+
+
+def event_option(event, key, default=None):
+    """
+    :param event: aws event, or the string 'main' when run locally
+    :param key: option name
+    :param default: value used when the event does not set the option
+    :return: option value
+    """
+    if isinstance(event, dict):
+        return event.get(key, default)
+    return default
+
+
+def keep(results, key, result, sink=None):
+    """
+    :param results: dict of output key -> scenario result
+    :param key: output key of the finished scenario
+    :param result: scenario result
+    :param sink: optional NdjsonSink, the result is written there and only
+                 its size is kept
+    """
+    if sink is None:
+        results[key] = result
+    else:
+        results[key] = {"streamed": sink.write(key, result)}
+
+
+def run_logged(sele, key, name):
+    """
+    :param sele: an entered Sele instance
+    :param key: output key of the scenario
+    :param name: scenario method name
+    :return: scenario result, an exception is logged and raised again for
+             Sele.__exit__ to handle
+    """
+    try:
+        return getattr(sele, name)()
+    except Exception as error:
+        LOG.error("scenario failed", key=key, scenario=name, error=error)
+        raise
+
+
+def run_sequential(sele, scenarios, results, sink=None):
+    """
+    :param sele: an entered Sele instance
+    :param scenarios: dict of output key -> method name
+    :param results: dict filled with output key -> scenario result as each
+                    scenario finishes, so a failure keeps earlier results
+    :param sink: optional NdjsonSink receiving each result as it finishes
+    :return: results
+    """
+    for key, name in scenarios.items():
+        keep(results, key, run_logged(sele, key, name), sink)
+    return results
+
+
+def merge_report(report, sections):
+    """
+    Add the report sections collected by one Sele session to the handler's.
+    List sections are concatenated, dict sections are updated.
+    :param report: dict of section name -> list or dict, updated in place
+    :param sections: report dict of a Sele instance
+    """
+    if report is None:
+        return
+    for name, section in sections.items():
+        if isinstance(section, list):
+            report.setdefault(name, []).extend(section)
+        else:
+            report.setdefault(name, {}).update(section)
+
+
+def run_parallel(sele_class, event, scenarios, limit, report=None, sink=None, deadline=None):
+    """
+    Run every scenario on its own browser session, at most limit at a time.
+    A scenario declared without a url shares the session of the one before
+    it. Sessions come from the driver pool, so a warm container keeps up to
+    limit Chrome processes alive. A scenario that raises, or the first one of
+    a session that cannot be launched, is listed under "failed" and the rest
+    of its session under "skipped". At the deadline the running scenarios
+    are listed under "timed_out", the ones not started under "skipped", and
+    the sessions still running are left to finish without waiting for them.
+    :param sele_class: Sele class of the calling module
+    :param event: aws event passed to every Sele instance
+    :param scenarios: dict of output key -> method name
+    :param limit: maximum number of concurrent browser sessions
+    :param report: optional dict collecting the report sections of every session
+    :param sink: optional NdjsonSink receiving each result as soon as its
+                 scenario finishes, writes are serialized by a lock
+    :param deadline: optional time.time() by which scenarios must be done
+    :return: dict of output key -> scenario result for the completed ones
+    """
+    finished, failed, skipped, timed_out = {}, [], [], []
+    started = set()
+    lock = threading.Lock()
+    closed = threading.Event()
+
+    def run_unit(unit):
+        sele = sele_class(event)
+        done = 0
+        try:
+            with sele:
+                for key, name in unit:
+                    if closed.is_set():
+                        break
+                    started.add(key)
+                    result = run_logged(sele, key, name)
+                    with lock:
+                        if closed.is_set():
+                            break
+                        keep(finished, key, result, sink)
+                    done += 1
+        except Exception as error:  # pylint: disable=broad-except
+            LOG.error("session failed", keys=[key for key, _ in unit[done:]], error=error)
+        return done, sele.report
+
+    def settle(future, unit):
+        done, sections = future.result()
+        missing = [key for key, _ in unit[done:]]
+        failed.extend(missing[:1])
+        skipped.extend(missing[1:])
+        merge_report(report, sections)
+
+    executor = ThreadPoolExecutor(max_workers=limit)
+    futures = {executor.submit(run_unit, unit): unit
+               for unit in priority_units(sele_class, event, scenarios)}
+    settled = set()
+    try:
+        timeout = None if deadline is None else max(0, deadline - time.time())
+        for future in as_completed(futures, timeout=timeout):
+            settled.add(future)
+            settle(future, futures[future])
+    except FutureTimeout:
+        closed.set()
+        LOG.warning("deadline reached", finished=len(finished), total=len(scenarios))
+        with lock:
+            for future, unit in futures.items():
+                if future in settled:
+                    continue
+                if future.done() and not future.cancelled():
+                    settle(future, unit)
+                    continue
+                future.cancel()
+                for key, _ in unit:
+                    if key not in finished:
+                        (timed_out if key in started else skipped).append(key)
+    finally:
+        executor.shutdown(wait=False)
+    merge_report(report, {"failed": failed, "skipped": skipped, "timed_out": timed_out})
+    return {key: finished[key] for key in scenarios if key in finished}
+
+
+def deadline_for(event, context):
+    """
+    :param event: aws event, "deadline" gives seconds when run outside Lambda
+    :param context: aws context
+    :return: time.time() by which scenarios must be done, None without a deadline
+    """
+    remaining = getattr(context, "get_remaining_time_in_millis", None)
+    if callable(remaining):
+        seconds = remaining() / 1000.0
+    elif event_option(event, "deadline") is not None:
+        seconds = float(event_option(event, "deadline"))
+    else:
+        return None
+    return time.time() + seconds - float(event_option(event, "deadline_reserve", RESERVE))
+
+
+def record_duration(name, seconds):
+    """
+    Keep a moving average of how long a scenario takes.
+    :param name: scenario method name
+    :param seconds: observed run time
+    """
+    previous = DURATIONS.get(name)
+    if previous is None:
+        DURATIONS[name] = seconds
+    else:
+        DURATIONS[name] = previous + DURATION_WEIGHT * (seconds - previous)
+
+
+def scenario_budget(event, key, name, left):
+    """
+    :param event: aws event, "budgets" maps output keys to seconds
+    :param key: output key of the scenario
+    :param name: scenario method name
+    :param left: seconds until the deadline
+    :return: seconds the scenario may run, a few times its usual duration
+             once it has one
+    """
+    budgets = event_option(event, "budgets") or {}
+    if key in budgets:
+        return min(left, float(budgets[key]))
+    observed = DURATIONS.get(name)
+    if observed is None:
+        return left
+    return min(left, max(observed * BUDGET_FACTOR, MIN_BUDGET))
+
+
+def by_priority(event, units):
+    """
+    :param event: aws event, "priorities" maps output keys to numbers, 0 by default
+    :param units: lists of (key, name) that run together
+    :return: units sorted by their highest priority, highest first, stable otherwise
+    """
+    priorities = event_option(event, "priorities") or {}
+    return sorted(units, key=lambda unit: -max(priorities.get(key, 0) for key, _ in unit))
+
+
+def priority_units(sele_class, event, scenarios):
+    """
+    :param sele_class: Sele class of the calling module
+    :param event: aws event, for by_priority
+    :param scenarios: dict of output key -> method name
+    :return: lists of (key, name) that run together, a scenario declared
+             without a url stays behind the one before it and scenarios after
+             one that changes the session stay behind that one, highest
+             priority first
+    """
+    units = []
+    barrier = False
+    for key, name in scenarios.items():
+        target = getattr(getattr(sele_class, name), "target", None)
+        if units and (barrier or (target is not None and target.url is None)):
+            units[-1].append((key, name))
+        else:
+            units.append([(key, name)])
+        barrier = barrier or target is None or target.session
+    return by_priority(event, units)
+
+
+def abandon(sele):
+    """
+    Discard the session of a scenario that outlived its budget without
+    waiting for it. chromedriver only answers the quit after the command that
+    is still blocked, which can take the whole page load timeout.
+    :param sele: entered Sele instance, its report is read before this call
+    """
+    threading.Thread(target=sele.__exit__, args=(FutureTimeout, None, None),
+                     daemon=True).start()
+
+
+def run_deadline(sele_class, event, scenarios, deadline, report=None, sink=None):
+    """
+    Run scenarios on one session, highest priority first. A scenario is
+    skipped when its usual duration no longer fits before the deadline and
+    abandoned when it outlives its budget, its session is then discarded in
+    the background, see abandon. After a timeout, a failure or a session
+    that cannot be launched the rest of the scenarios that share its page
+    are skipped and the next ones get a new session.
+    :param sele_class: Sele class of the calling module
+    :param event: aws event
+    :param scenarios: dict of output key -> method name
+    :param deadline: time.time() by which scenarios must be done
+    :param report: optional dict collecting the report sections of the sessions
+    :param sink: optional NdjsonSink receiving each result as it finishes
+    :return: dict of output key -> scenario result for the completed ones
+    """
+    results, skipped, timed_out, failed = {}, [], [], []
+    executor = ThreadPoolExecutor(max_workers=1)
+    sele = None
+    try:
+        for unit in priority_units(sele_class, event, scenarios):
+            for position, (key, name) in enumerate(unit):
+                left = deadline - time.time()
+                if left <= DURATIONS.get(name, 0):
+                    skipped.extend(item for item, _ in unit[position:])
+                    break
+                if sele is None:
+                    sele = sele_class(event)
+                    try:
+                        sele.__enter__()
+                    except Exception as error:  # pylint: disable=broad-except
+                        LOG.error("session failed", keys=[item for item, _ in unit[position:]],
+                                  error=error)
+                        merge_report(report, sele.report)
+                        sele = None
+                        failed.append(key)
+                        skipped.extend(item for item, _ in unit[position + 1:])
+                        break
+                start = time.time()
+                future = executor.submit(run_logged, sele, key, name)
+                try:
+                    result = future.result(timeout=scenario_budget(event, key, name, left))
+                except FutureTimeout:
+                    timed_out.append(key)
+                    skipped.extend(item for item, _ in unit[position + 1:])
+                    abandoned, sele = sele, None
+                    merge_report(report, abandoned.report)
+                    abandon(abandoned)
+                    executor.shutdown(wait=False)
+                    executor = ThreadPoolExecutor(max_workers=1)
+                    break
+                except Exception as error:  # pylint: disable=broad-except
+                    broken, sele = sele, None
+                    merge_report(report, broken.report)
+                    if broken.__exit__(type(error), error, error.__traceback__):
+                        failed.append(key)
+                        skipped.extend(item for item, _ in unit[position + 1:])
+                        break
+                    raise
+                record_duration(name, time.time() - start)
+                keep(results, key, result, sink)
+    finally:
+        if sele is not None:
+            sele.__exit__(None, None, None)
+            merge_report(report, sele.report)
+        executor.shutdown(wait=False)
+        merge_report(report, {"skipped": skipped, "timed_out": timed_out, "failed": failed})
+    return {key: results[key] for key in scenarios if key in results}
+
+
+def run_scenarios(sele_class, event, scenarios, report=None, sink=None, context=None,
+                  deadline=None):
+    """
+    Run scenarios one after another on a single session, or concurrently when
+    the event sets "concurrency" above 1. Only use concurrency for scenarios
+    that each load their own page. Both follow the deadline of the context,
+    see run_deadline and run_parallel.
+    :param sele_class: Sele class of the calling module
+    :param event: aws event
+    :param scenarios: dict of output key -> method name
+    :param report: optional dict collecting the report sections of the sessions
+    :param sink: optional NdjsonSink receiving each result as it finishes
+    :param context: aws context
+    :param deadline: time.time() to use instead of the one of the context,
+                     when an earlier step already spent part of it
+    :return: dict of output key -> scenario result
+    """
+    if deadline is None:
+        deadline = deadline_for(event, context)
+    limit = min(int(event_option(event, "concurrency", 1)), len(scenarios))
+    if limit > 1:
+        return run_parallel(sele_class, event, scenarios, limit, report, sink, deadline)
+    if deadline is not None:
+        return run_deadline(sele_class, event, scenarios, deadline, report, sink)
+    results = {}
+    sele = sele_class(event)
+    with sele:
+        run_sequential(sele, scenarios, results, sink)
+    merge_report(report, sele.report)
+    return results
@@ -0,0 +1,137 @@
+"""
+Search fan-out for Sele classes.
+Runs a list of search terms by loading the results url of each term directly,
+several at a time, in the tabs of the current session or on sessions of their
+own. Terms that fail are retried, terms that still fail after the last retry
+go through the scenario's own fallback, e.g. typing into the search box.
+Event options:
+    "terms": search terms, a to z by default
+    "fanout": "tabs" (default) or "drivers"
+    "fanout_size": tabs or sessions working at the same time, 4 by default
+    "retries": extra attempts for failed terms, 2 by default
+"""
+import string
+import time
+from concurrent.futures import ThreadPoolExecutor
+from selenium.common.exceptions import WebDriverException
+from scenario_runner import event_option, merge_report
+from tab_pool import TabPool, TABS
+
+TERMS = list(string.ascii_lowercase)
+RETRIES = 2
+
+
+class SearchFanout:
+    """
+    Mixin for Sele classes, needs self.event, self.driver, self.report and Navigator
+    """
+
+    def search_terms(self):
+        """
+        :return: terms from the event, a to z by default
+        """
+        return list(event_option(self.event, "terms", TERMS))
+
+    def fan_out(self, terms, url_for, ready, read, fallback=None):
+        """
+        :param terms: search terms
+        :param url_for: function of a term returning its results url
+        :param ready: (by, value) locator present once results are shown
+        :param read: function of a driver showing the results, returning what to keep
+        :param fallback: optional function of a term returning its results
+                         another way, run in the current tab after the retries
+        :return: {term: {"results": ..., "seconds": ..., "attempts": ...}} in
+                 the order of terms, "error" instead of "results" when a term
+                 failed every attempt
+        """
+        outcome = {term: {"attempts": 0} for term in terms}
+        pending = list(terms)
+        retries = int(event_option(self.event, "retries", RETRIES))
+        for _ in range(retries + 1):
+            if not pending:
+                break
+            urls = [self.rewrite_url(url_for(term)) for term in pending]
+            if event_option(self.event, "fanout", "tabs") == "drivers":
+                fetched = self.fetch_on_drivers(urls, ready, read)
+            else:
+                fetched = self.fetch_in_tabs(urls, ready, read)
+            failed = []
+            for term, (result, seconds, error) in zip(pending, fetched):
+                entry = outcome[term]
+                entry["attempts"] += 1
+                entry["seconds"] = round(entry.get("seconds", 0) + seconds, 3)
+                if error is None:
+                    entry.pop("error", None)
+                    entry["results"] = result
+                else:
+                    entry["error"] = str(error)
+                    failed.append(term)
+            pending = failed
+        if fallback is None:
+            return outcome
+        for term in pending:
+            entry = outcome[term]
+            entry["attempts"] += 1
+            start = time.time()
+            try:
+                entry["results"] = fallback(term)
+                entry.pop("error", None)
+            except WebDriverException as error:
+                entry["error"] = str(error)
+            entry["seconds"] = round(entry["seconds"] + time.time() - start, 3)
+        return outcome
+
+    def fanout_size(self):
+        """
+        :return: tabs or sessions working at the same time
+        """
+        return max(1, int(event_option(self.event, "fanout_size", TABS)))
+
+    def fetch_in_tabs(self, urls, ready, read):
+        """
+        :param urls: results urls
+        :param ready: (by, value) locator present once results are shown
+        :param read: function of a driver returning what to keep
+        :return: (result, seconds, error or None) per url
+        """
+        errors = {}
+        with TabPool(self.driver, self.fanout_size()) as tabs:
+            results = tabs.map(urls, lambda index: read(self.driver),
+                               lambda index: ready, errors)
+        return [(result, tabs.elapsed.get(index, 0), errors.get(index))
+                for index, result in enumerate(results)]
+
+    def fetch_on_drivers(self, urls, ready, read):
+        """
+        Load every url on a session of its own from the driver pool, the
+        report sections of those sessions are merged into self.report. A
+        session that cannot be launched counts as a failed attempt.
+        :param urls: results urls
+        :param ready: (by, value) locator present once results are shown
+        :param read: function of a driver returning what to keep
+        :return: (result, seconds, error or None) per url
+        """
+        def fetch(url):
+            sele = type(self)(self.event)
+            outcome = (None, 0, None)
+            start = time.time()
+            try:
+                with sele:
+                    try:
+                        sele.load_early(url, "eager", ready)
+                        outcome = (read(sele.driver), time.time() - start, None)
+                    except WebDriverException as error:
+                        outcome = (None, time.time() - start, error)
+                        # Sele.__exit__ swallows it after discarding the session
+                        raise
+            except Exception as error:  # pylint: disable=broad-except
+                # the session could not be launched, the term is retried
+                outcome = (None, time.time() - start, error)
+            return outcome, sele.report
+
+        fetched = []
+        with ThreadPoolExecutor(max_workers=self.fanout_size()) as executor:
+            for outcome, sections in executor.map(fetch, urls):
+                fetched.append(outcome)
+                merge_report(self.report, sections)
+        return fetched
@@ -0,0 +1,135 @@
+"""
+Structured logging for the Lambda handlers.
+Records are JSON lines with a level, a message and named fields. They are put
+on an in-memory queue and written to stderr by a background thread, so a
+scenario never blocks on CloudWatch and stdout stays free for a result
+stream. Long fields are cut to MAX_FIELD
+characters and records logged with sample=True are only kept at the sample
+rate. Event options, read by configure_logging:
+    "log_level": DEBUG, INFO (default), WARNING or ERROR
+    "log_sample": fraction of sampled records to keep, 0.01 by default
+    "log_full_body": log page bodies at DEBUG without truncation
+"""
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import sys
+import time
+
+MAX_FIELD = 1000
+SAMPLE_RATE = 0.01
+SETTINGS = {"max_field": MAX_FIELD, "sample": SAMPLE_RATE}
+
+
+class JsonFormatter(logging.Formatter):
+    """
+    One JSON object per record, fields cut to SETTINGS["max_field"] characters
+    """
+
+    def format(self, record):
+        entry = {
+            "ts": round(record.created, 3),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage()
+        }
+        limit = SETTINGS["max_field"]
+        for key, value in getattr(record, "fields", {}).items():
+            if not isinstance(value, (int, float, bool, type(None))):
+                value = str(value)
+                if limit is not None and len(value) > limit:
+                    value = value[:limit] + "...[{} more]".format(len(value) - limit)
+            entry[key] = value
+        return json.dumps(entry)
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Drop records logged with sample=True except for SETTINGS["sample"] of them
+    """
+
+    def filter(self, record):
+        if getattr(record, "sampled", False):
+            return random.random() < SETTINGS["sample"]
+        return True
+
+
+class StructuredLogger(logging.LoggerAdapter):
+    """
+    logger.debug("page body", body=text) puts body in the record fields,
+    sample=True marks high volume records for sampling
+    """
+
+    def log(self, level, msg, *args, sample=False, **fields):  # pylint: disable=arguments-differ
+        if self.isEnabledFor(level):
+            self.logger.log(level, msg, *args, extra={"fields": fields, "sampled": sample})
+
+    def debug(self, msg, *args, **fields):
+        self.log(logging.DEBUG, msg, *args, **fields)
+
+    def info(self, msg, *args, **fields):
+        self.log(logging.INFO, msg, *args, **fields)
+
+    def warning(self, msg, *args, **fields):
+        self.log(logging.WARNING, msg, *args, **fields)
+
+    def error(self, msg, *args, **fields):
+        self.log(logging.ERROR, msg, *args, **fields)
+
+
+def start_listener():
+    """
+    :return: QueueListener writing queued records to stderr in a thread
+    """
+    records = queue.Queue(-1)
+    output = logging.StreamHandler(sys.stderr)
+    output.setFormatter(JsonFormatter())
+    listener = logging.handlers.QueueListener(records, output)
+    listener.start()
+    atexit.register(listener.stop)
+    handler = logging.handlers.QueueHandler(records)
+    handler.addFilter(SamplingFilter())
+    root = logging.getLogger("sele")
+    root.addHandler(handler)
+    root.setLevel(os.environ.get("LOG_LEVEL", "INFO"))
+    root.propagate = False
+    return listener
+
+
+LISTENER = start_listener()
+
+
+def get_logger(name):
+    """
+    :param name: module name
+    :return: StructuredLogger under the queued "sele" logger
+    """
+    return StructuredLogger(logging.getLogger("sele." + name), {})
+
+
+def configure_logging(event):
+    """
+    Apply the logging options of one invocation.
+    :param event: aws event, or the string 'main' when run locally
+    """
+    options = event if isinstance(event, dict) else {}
+    full_body = bool(options.get("log_full_body"))
+    default = "DEBUG" if full_body else os.environ.get("LOG_LEVEL", "INFO")
+    logging.getLogger("sele").setLevel(options.get("log_level", default))
+    SETTINGS["max_field"] = None if full_body else MAX_FIELD
+    SETTINGS["sample"] = float(options.get("log_sample", SAMPLE_RATE))
+
+
+def flush(timeout=2):
+    """
+    Wait for queued records to be written, call before the handler returns
+    so the Lambda freeze does not hold them back until the next invocation.
+    :param timeout: seconds to wait at most
+    """
+    deadline = time.time() + timeout
+    while not LISTENER.queue.empty() and time.time() < deadline:
+        time.sleep(0.01)
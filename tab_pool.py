@@ -0,0 +1,94 @@
+"""
+Load several pages at the same time in the tabs of one Chrome session.
+WebDriver runs one command at a time per session, but a navigation started
+from script returns at once, so Chrome downloads and renders every tab of a
+batch in parallel and the driver only visits the tabs to read them.
+"""
+import time
+from selenium.common.exceptions import WebDriverException
+from navigation import LEAVE_JS, wait_loaded
+
+TABS = 4
+
+OPEN_TABS_JS = "for (var i = 0; i < arguments[0]; i++) { window.open('about:blank', '_blank'); }"
+
+
+class TabPool:
+    """
+    Extra tabs of a session, closed again when the pool exits.
+    with TabPool(driver, 4) as tabs:
+        texts = tabs.map(urls, read)
+    """
+
+    def __init__(self, driver, size=TABS):
+        self.driver = driver
+        self.size = max(1, int(size))
+        self.home = None
+        self.tabs = []
+        self.elapsed = {}
+
+    def __enter__(self):
+        self.home = self.driver.current_window_handle
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        try:
+            for handle in self.tabs:
+                self.driver.switch_to.window(handle)
+                self.driver.close()
+        finally:
+            self.tabs = []
+            self.driver.switch_to.window(self.home)
+
+    def grow(self, count):
+        """
+        Open tabs until the pool has count of them.
+        :param count: tabs needed
+        """
+        missing = count - len(self.tabs)
+        if missing <= 0:
+            return
+        known = set(self.driver.window_handles)
+        self.driver.execute_script(OPEN_TABS_JS, missing)
+        opened = [handle for handle in self.driver.window_handles if handle not in known]
+        if not opened:
+            raise WebDriverException("Chrome did not open any tab")
+        self.tabs.extend(opened)
+
+    def map(self, urls, read, ready=None, errors=None):
+        """
+        Load urls in batches of one per tab and read each page once loaded.
+        Seconds from starting the navigation to having read each page are
+        kept in self.elapsed by url index.
+        :param urls: pages to load
+        :param read: function of the url index, called with the tab of that page selected
+        :param ready: function of the url index returning a (by, value) locator
+                      the page must contain before it is read
+        :param errors: optional dict filled with url index -> WebDriverException
+                       for pages that failed, their result is None. Without it
+                       the first failure is raised.
+        :return: what read returned for every url, in the order of urls
+        """
+        results = []
+        self.elapsed = {}
+        while len(results) < len(urls):
+            first = len(results)
+            self.grow(min(self.size, len(urls) - first))
+            batch = list(zip(self.tabs, range(first, len(urls))))
+            started = {}
+            for handle, index in batch:
+                self.driver.switch_to.window(handle)
+                started[index] = time.time()
+                self.driver.execute_script(LEAVE_JS, urls[index])
+            for handle, index in batch:
+                try:
+                    self.driver.switch_to.window(handle)
+                    wait_loaded(self.driver, urls[index], "eager", ready(index) if ready else None)
+                    results.append(read(index))
+                except WebDriverException as error:
+                    if errors is None:
+                        raise
+                    errors[index] = error
+                    results.append(None)
+                self.elapsed[index] = time.time() - started[index]
+        return results
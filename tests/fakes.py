@@ -0,0 +1,66 @@
+"""
+Stand-ins for the Sele classes, scenarios run without a browser.
+"""
+import threading
+import time
+from scenario_planner import scenario
+
+LOCK = threading.Lock()
+
+
+class FakeSele:
+    """
+    Records which session ran which scenario, suppresses errors like Sele.
+    The launches numbered in failing_launches raise like a Chrome that
+    does not start.
+    """
+    sessions = []
+    launches = []
+    failing_launches = set()
+
+    def __init__(self, event):
+        self.event = event
+        self.report = {"sessions": [id(self)]}
+        self.ran = []
+        self.exits = []
+        self.page = None
+
+    def __enter__(self):
+        with LOCK:
+            number = len(FakeSele.launches)
+            FakeSele.launches.append(self)
+        if number in FakeSele.failing_launches:
+            raise RuntimeError("chrome failed to start")
+        FakeSele.sessions.append(self)
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.exits.append(exc_type)
+        return True
+
+    @scenario("https://example.com/a")
+    def read_a(self):
+        self.ran.append("read_a")
+        self.page = "a"
+        return "A"
+
+    @scenario()
+    def follow_a(self):
+        self.ran.append("follow_a")
+        return "follows " + str(self.page)
+
+    @scenario("https://example.com/b")
+    def read_b(self):
+        self.ran.append("read_b")
+        return "B"
+
+    @scenario("https://example.com/c")
+    def broken(self):
+        self.ran.append("broken")
+        raise ValueError("broken scenario")
+
+    @scenario("https://example.com/d")
+    def slow(self):
+        self.ran.append("slow")
+        time.sleep(1.5)
+        return "slow"
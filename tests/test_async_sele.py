@@ -0,0 +1,53 @@
+import time
+import pytest
+import scenario_runner
+from async_sele import run_async, runner_for
+from fakes import FakeSele
+
+
+@pytest.fixture(autouse=True)
+def fresh_state(monkeypatch):
+    monkeypatch.setattr(scenario_runner, "DURATIONS", {})
+    FakeSele.sessions, FakeSele.launches, FakeSele.failing_launches = [], [], set()
+
+
+def test_scenarios_of_one_page_share_a_session():
+    results = run_async(FakeSele, {"concurrency": 3},
+                        {"a": "read_a", "f": "follow_a", "b": "read_b"})
+    assert results == {"a": "A", "b": "B", "f": "follows a"}
+    assert sorted(sele.ran for sele in FakeSele.sessions) == [["read_a", "follow_a"], ["read_b"]]
+
+
+def test_failures_and_timeouts_are_reported():
+    report = {}
+    start = time.time()
+    results = run_async(FakeSele, {"concurrency": 3, "scenario_timeout": 0.3},
+                        {"x": "broken", "s": "slow", "a": "read_a"}, report)
+    assert time.time() - start < 1.2
+    assert results == {"a": "A"}
+    assert report["failed"] == ["x"]
+    assert report["timed_out"] == ["s"]
+
+
+def test_deadline_cancels_what_is_still_running():
+    report = {}
+    results = run_async(FakeSele, {"deadline": 0.5, "deadline_reserve": 0},
+                        {"a": "read_a", "s": "slow"}, report)
+    assert results == {"a": "A"}
+    assert report["skipped"] == ["s"]
+
+
+def test_a_session_that_cannot_launch_keeps_the_other_results():
+    FakeSele.failing_launches = {1}
+    report = {}
+    results = run_async(FakeSele, {"concurrency": 2},
+                        {"a": "read_a", "f": "follow_a", "b": "read_b"}, report)
+    lost = [key for key in ["a", "b"] if key not in results]
+    assert len(lost) == 1
+    assert report["failed"] == lost
+    assert report["skipped"] == (["f"] if lost == ["a"] else [])
+
+
+def test_runner_for():
+    assert runner_for({}) is scenario_runner.run_scenarios
+    assert runner_for({"orchestration": "async"}).func is run_async
@@ -0,0 +1,34 @@
+import hashlib
+import json
+from blob_store import BlobStore, dedupe_result
+from response_encoding import build_response, TRUNCATED
+
+
+def test_blob_store_stores_repeated_text_once():
+    text = "x" * 2000
+    result = dedupe_result({"a": text, "b": [text], "c": "short"}, True)
+    digest = hashlib.sha256(text.encode("utf-8")).hexdigest()
+    assert result["a"] == result["b"][0] == {"blob": digest}
+    assert result["c"] == "short"
+    assert result["blobs"] == {digest: text}
+
+
+def test_blob_store_diffs_near_identical_text():
+    store = BlobStore(diffs=True, min_blob=1)
+    first = "\n".join("line {}".format(number) for number in range(100))
+    base = store.put(first)
+    second = store.put(first.replace("line 50", "changed"))
+    assert store.blobs[second] == {"base": base,
+                                   "diff": ["--- ", "+++ ", "@@ -51 +51 @@", "-line 50", "+changed"]}
+
+
+def test_truncation_runs_before_dedupe():
+    text = "y" * 3000
+    response = build_response({"a": text, "b": "y" * 2000 + "z" * 1000},
+                              {"max_field_bytes": 2000, "dedupe": True})
+    body = json.loads(response["body"])
+    kept = "y" * 2000 + TRUNCATED.format(1000)
+    assert body["a"] == {"blob": hashlib.sha256(kept.encode("utf-8")).hexdigest()}
+    assert body["a"] == body["b"]
+    assert list(body["blobs"].values()) == [kept]
+    assert response["headers"]["X-Truncated-Fields"] == "2"
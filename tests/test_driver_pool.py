@@ -0,0 +1,125 @@
+import pytest
+import urllib3
+from selenium.common.exceptions import WebDriverException
+from selenium.webdriver.chrome.options import Options
+import driver_pool
+from driver_pool import DriverPool, healthy, reset, options_key
+
+
+class FakeDriver:
+    def __init__(self, error=None):
+        self.error = error
+        self.handles = ["main", "tab"]
+        self.current = "main"
+        self.commands = []
+        self.quit_called = False
+
+    def execute_script(self, script, *args):
+        if self.error is not None:
+            raise self.error
+        self.commands.append(("script", self.current))
+        return 1
+
+    def execute_cdp_cmd(self, command, params):
+        self.commands.append((command, params.get("origin")))
+        if command == "Page.getNavigationHistory":
+            return {"entries": [{"url": "https://{}.example/".format(self.current)},
+                                {"url": "about:blank"}]}
+        if command == "Page.getFrameTree":
+            return {"frameTree": {"frame": {"url": "https://{}.example/".format(self.current)},
+                                  "childFrames": [{"frame": {"url": "https://ads.example/f"}}]}}
+        return {}
+
+    @property
+    def window_handles(self):
+        return list(self.handles)
+
+    @property
+    def switch_to(self):
+        return self
+
+    def window(self, handle):
+        self.current = handle
+
+    def close(self):
+        self.handles.remove(self.current)
+
+    def get(self, url):
+        self.commands.append(("get", url))
+
+    def quit(self):
+        self.quit_called = True
+
+
+def test_borrow_reuses_a_released_session():
+    pool, launched = DriverPool(), []
+
+    def launch():
+        launched.append(FakeDriver())
+        return launched[-1]
+
+    first = pool.borrow("key", launch)
+    pool.release(first)
+    assert pool.borrow("key", launch) is first
+    assert pool.borrow("other", launch) is launched[1]
+    assert len(launched) == 2
+
+
+def test_reset_clears_every_tab_and_frame_origin():
+    driver = FakeDriver()
+    assert reset(driver)
+    assert driver.handles == ["main"]
+    cleared = {origin for command, origin in driver.commands
+               if command == "Storage.clearDataForOrigin"}
+    assert cleared == {"https://main.example", "https://tab.example", "https://ads.example"}
+    assert ("get", "about:blank") in driver.commands
+
+
+@pytest.mark.parametrize("error", [WebDriverException("gone"), ConnectionRefusedError(),
+                                   urllib3.exceptions.MaxRetryError(None, "/session")])
+def test_dead_sessions_are_unhealthy(error):
+    assert not healthy(FakeDriver(error))
+    assert not reset(FakeDriver(error))
+
+
+def test_borrow_replaces_a_dead_session():
+    pool = DriverPool()
+    dead = pool.borrow("key", FakeDriver)
+    pool.release(dead)
+    dead.error = ConnectionRefusedError()
+    fresh = pool.borrow("key", FakeDriver)
+    assert fresh is not dead
+    assert dead.quit_called
+
+
+def test_release_discards_and_limits_idle_sessions():
+    pool = DriverPool(max_idle=1)
+    drivers = [pool.borrow("key", FakeDriver) for _ in range(3)]
+    pool.release(drivers[0], discard=True)
+    pool.release(drivers[1])
+    pool.release(drivers[2])
+    assert [item.driver for item in pool.idle] == [drivers[1]]
+    assert drivers[0].quit_called and drivers[2].quit_called
+
+
+def test_evict_quits_sessions_past_their_limits(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(driver_pool.time, "time", lambda: now[0])
+    pool = DriverPool(idle_timeout=10, max_uses=2)
+    driver = pool.borrow("key", FakeDriver)
+    pool.release(driver)
+    now[0] += 11
+    pool.evict()
+    assert not pool.idle and driver.quit_called
+    driver = pool.borrow("key", FakeDriver)
+    pool.release(driver)
+    assert pool.borrow("key", FakeDriver) is driver
+    pool.release(driver)
+    assert not pool.idle
+
+
+def test_options_key_tells_launch_options_apart():
+    eager, normal = Options(), Options()
+    eager.set_capability("pageLoadStrategy", "eager")
+    assert options_key(eager) != options_key(normal)
+    assert options_key(Options()) == options_key(normal)
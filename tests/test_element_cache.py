@@ -0,0 +1,61 @@
+import pytest
+from selenium.common.exceptions import StaleElementReferenceException
+from element_cache import CachedElement, ElementCache
+
+
+class Element:
+    def __init__(self, number):
+        self.number = number
+        self.stale = False
+
+    @property
+    def tag_name(self):
+        if self.stale:
+            raise StaleElementReferenceException("stale")
+        return "input"
+
+    def send_keys(self, text):
+        if self.stale:
+            raise StaleElementReferenceException("stale")
+        return "{} got {}".format(self.number, text)
+
+
+class Page(ElementCache):
+    def __init__(self):
+        self.document_id = 1
+        self.found = []
+
+    def wait_for(self, by, value, timeout=None):
+        self.found.append(Element(len(self.found)))
+        return self.found[-1]
+
+
+def test_stale_elements_are_found_again_and_the_call_retried():
+    page = Page()
+    box = page.cached("id", "search")
+    assert box.send_keys("a") == "0 got a"
+    page.found[0].stale = True
+    assert box.send_keys("b") == "1 got b"
+    page.found[1].stale = True
+    assert box.tag_name == "input"
+    assert len(page.found) == 3
+    assert box.element is page.found[2]
+
+
+def test_a_second_stale_error_is_raised():
+    elements = [Element(0), Element(1)]
+    for element in elements:
+        element.stale = True
+    cached = CachedElement(lambda: elements.pop(0))
+    with pytest.raises(StaleElementReferenceException):
+        cached.send_keys("a")
+
+
+def test_entries_belong_to_the_current_document():
+    page = Page()
+    first = page.cached("id", "search")
+    assert page.cached("id", "search") is first
+    assert page.cached("name", "q") is not first
+    page.document_id = 2
+    assert page.cached("id", "search") is not first
+    assert len(page.found) == 3
@@ -0,0 +1,78 @@
+import gzip
+import time
+import pytest
+from selenium.webdriver.common.by import By
+import http_fast_path
+from http_fast_path import StaticPage, HttpPool, read_static, run_fast_path, static_page
+from scenario_planner import scenario
+
+PAGE = StaticPage(((By.ID, "price"),), (By.TAG_NAME, "h1"))
+URL = "https://example.com/"
+
+
+def test_read_static_reads_the_text_element():
+    body = '<html><body><h1>Caf\xe9</h1><span id="price">1</span></body></html>'
+    assert read_static(URL, body.encode("latin-1"), "latin-1", PAGE) == "Caf\xe9"
+
+
+def test_read_static_needs_every_required_element():
+    assert read_static(URL, b"<html><body><h1>Title</h1></body></html>", None, PAGE) is None
+
+
+def test_read_static_gives_up_on_unreadable_bodies():
+    assert read_static(URL, b"  ", None, PAGE) is None
+    assert read_static(URL, b"<!-- only a comment -->", None, PAGE) is None
+    assert read_static(URL, b"<h1>x</h1>", "no-such-charset", PAGE) is None
+
+
+class Headers(dict):
+    def get_content_charset(self):
+        return None
+
+
+@pytest.mark.parametrize("body", [gzip.compress(b"<h1>x</h1>")[:-6], b"\x1f\x8b\x08\x00garbage"])
+def test_bad_gzip_bodies_raise_os_error(monkeypatch, body):
+    pool = HttpPool()
+    monkeypatch.setattr(pool, "request",
+                        lambda url: (200, Headers({"Content-Encoding": "gzip"}), body))
+    with pytest.raises(OSError):
+        pool.get(URL)
+
+
+class Site:
+    @static_page(requires=[(By.ID, "price")], text=(By.TAG_NAME, "h1"))
+    @scenario("https://example.com/static")
+    def static_title(self):
+        pass
+
+    @static_page(text=(By.TAG_NAME, "h1"))
+    @scenario("https://example.com/broken")
+    def broken_title(self):
+        pass
+
+    @scenario("https://example.com/dynamic")
+    def dynamic_title(self):
+        pass
+
+
+def serve(url):
+    if url.endswith("/broken"):
+        return 200, Headers({"Content-Encoding": "gzip"}), b"\x1f\x8b\x08\x00garbage"
+    return 200, Headers(), b'<h1>Static</h1><span id="price">1</span>'
+
+
+def test_fast_path_serves_static_pages_and_leaves_the_rest(monkeypatch):
+    monkeypatch.setattr(http_fast_path, "PATHS", {})
+    monkeypatch.setattr(http_fast_path.HTTP, "request", serve)
+    report = {}
+    results = run_fast_path(Site, {}, {"s": "static_title", "b": "broken_title",
+                                       "d": "dynamic_title"}, report)
+    assert results == {"s": "Static"}
+    assert report["fast_path"] == {"http": ["s"], "browser": ["b"]}
+    assert run_fast_path(Site, {"fast_path": False}, {"s": "static_title"}) == {}
+
+
+def test_fast_path_fetches_nothing_after_the_deadline(monkeypatch):
+    monkeypatch.setattr(http_fast_path, "PATHS", {})
+    monkeypatch.setattr(http_fast_path.HTTP, "request", serve)
+    assert run_fast_path(Site, {}, {"s": "static_title"}, deadline=time.time() - 1) == {}
@@ -0,0 +1,61 @@
+from instrumentation import Instrumentation, histogram, percentile
+from scenario_planner import scenario
+
+
+def test_percentile_is_nearest_rank():
+    values = list(range(1, 21))
+    assert percentile(values, 0.5) == 10
+    assert percentile(values, 0.95) == 19
+    assert percentile([7], 0.95) == 7
+
+
+def test_histogram_in_milliseconds():
+    assert histogram([0.003, 0.001, 0.002]) == {
+        "count": 3, "p50": 2.0, "p95": 3.0, "max": 3.0, "total": 6.0}
+
+
+class Driver:
+    def __init__(self):
+        self.sent = []
+
+    def execute(self, driver_command, params=None):
+        self.sent.append(driver_command)
+        return {"value": driver_command}
+
+
+class Page(Instrumentation):
+    def __init__(self, event):
+        self.event = event
+        self.driver = Driver()
+        self.report = {}
+
+    @scenario("https://example.com/")
+    def read(self):
+        self.driver.execute("findElement", {})
+        self.driver.execute("getElementText", {})
+
+
+def test_commands_are_timed_per_scenario():
+    page = Page({"timings": True})
+    page.instrument()
+    page.driver.execute("get", {})
+    page.read()
+    page.uninstrument()
+    timings = page.report["timings"]
+    assert set(timings) == {"session", "read"}
+    assert set(timings["read"]) == {"findElement", "getElementText", "*"}
+    assert timings["read"]["*"]["count"] == 2
+    assert timings["session"]["get"]["count"] == 1
+    assert page.driver.sent == ["get", "findElement", "getElementText"]
+    assert "execute" not in page.driver.__dict__
+
+
+def test_nothing_is_timed_unless_asked():
+    page = Page({})
+    page.instrument()
+    page.read()
+    page.uninstrument()
+    assert page.report == {} and "execute" not in page.driver.__dict__
+    page.instrument(force=True)
+    page.read()
+    assert page.timings.count() == 2
@@ -0,0 +1,110 @@
+import pytest
+from lxml import etree, html
+from selenium.webdriver.common.by import By
+from locator_compiler import compile_xpath, compile_locator
+from offline_extract import to_xpath
+from navigation import Navigator, PageCache
+
+PAGE = """
+<html><body>
+<div id="search_results"><a class="btn_medium x" href="http://a">1</a><a href="/b">2</a></div>
+<div id="additional_search_options">
+  <div><a>first</a></div>
+  <div><span>s</span><a>second</a><a>third</a></div>
+</div>
+<form><input name="username" type="text"><input id="store_nav_search_term"></form>
+<button class="btn_medium">go</button>
+</body></html>
+"""
+
+
+@pytest.mark.parametrize("xpath, expected", [
+    ("//*[@id='search_results']", (By.ID, "search_results", "id")),
+    ("//*[@name='username']", (By.NAME, "username", "name")),
+    ("//html", (By.TAG_NAME, "html", "tag")),
+    ("//div[@id='search_results']", (By.CSS_SELECTOR, 'div[id="search_results"]', "css")),
+    ("//div[@id='x']//div[2]//a[1]",
+     (By.CSS_SELECTOR, 'div[id="x"] div:nth-of-type(2) a:nth-of-type(1)', "css")),
+    ("//div/span", (By.CSS_SELECTOR, "div > span", "css")),
+    ("//*[2]", (By.CSS_SELECTOR, ":nth-child(2)", "css")),
+    ("//*[@type]", (By.CSS_SELECTOR, "[type]", "css")),
+    ("//button[contains(@class,'btn_medium')]",
+     (By.CSS_SELECTOR, 'button[class*="btn_medium"]', "css")),
+    ('//a[starts-with(@href,"http")]', (By.CSS_SELECTOR, 'a[href^="http"]', "css")),
+    ("//a[@title='say \"hi\"']", (By.CSS_SELECTOR, 'a[title="say \\"hi\\""]', "css")),
+])
+def test_rewrites(xpath, expected):
+    assert compile_xpath(xpath) == expected
+
+
+@pytest.mark.parametrize("xpath", [
+    "//a[text()='x']",
+    "//a[contains(text(),'x')]",
+    "//a[@x='1'][2]",
+    "//a[@x='1' or @y='2']",
+    "//a[@x=1]",
+    "//div[last()]",
+    "//a/..",
+    "/html/body",
+    "(//a)[1]",
+    "//div/following-sibling::div",
+])
+def test_stays_xpath(xpath):
+    assert compile_xpath(xpath) == (By.XPATH, xpath, "xpath")
+
+
+def test_compile_locator_leaves_other_strategies_alone():
+    assert compile_locator(By.ID, "x") == (By.ID, "x")
+    assert compile_locator(By.XPATH, "//*[@id='x']") == (By.ID, "x")
+
+
+@pytest.mark.parametrize("xpath", [
+    "//*[@id='search_results']",
+    "//*[@name='username']",
+    "//html",
+    "//div[@id='search_results']",
+    "//div[@id='additional_search_options']//div[2]//a[1]",
+    "//div[@id='additional_search_options']/div/a",
+    "//div/span",
+    "//*[2]",
+    "//*[@type]",
+    "//button[contains(@class,'btn_medium')]",
+    "//a[starts-with(@href,'http')]",
+    "//div//*[@id='store_nav_search_term']",
+])
+def test_rewrite_matches_the_same_elements(xpath):
+    pytest.importorskip("cssselect", reason="cssselect is not installed, see tests/requirements.txt")
+    from lxml.cssselect import CSSSelector
+    root = html.document_fromstring(PAGE)
+    by, value, _ = compile_xpath(xpath)
+    if by == By.CSS_SELECTOR:
+        compiled = CSSSelector(value)(root)
+    else:
+        compiled = root.xpath(to_xpath(by, value))
+    assert [etree.tostring(node) for node in compiled] == \
+        [etree.tostring(node) for node in root.xpath(xpath)]
+
+
+class Page(Navigator):
+    def __init__(self):
+        self.page_cache = PageCache()
+        self.dom_clean = False
+        self.lookups = []
+
+    @property
+    def driver(self):
+        return self
+
+    def find_element(self, by, value):
+        self.lookups.append((by, value))
+        return self
+
+    def get_attribute(self, name):
+        return "text"
+
+
+def test_direct_lookups_are_compiled():
+    page = Page()
+    page.find(By.XPATH, "//div[@id='main-content']")
+    assert page.page_text() == "text"
+    assert page.lookups == [(By.CSS_SELECTOR, 'div[id="main-content"]'), (By.TAG_NAME, "body")]
@@ -0,0 +1,36 @@
+from navigation import PageCache, normalize_url, rewrite_url
+
+
+def test_normalize_url():
+    assert normalize_url("HTTPS://Example.COM#top") == "https://example.com/"
+    assert normalize_url("https://example.com/a?q=1#x") == "https://example.com/a?q=1"
+
+
+def test_rewrite_url_prefers_the_longest_origin():
+    event = {"base_urls": {"https://a.com": "http://local:1",
+                           "https://a.com/shop": "http://local:2"}}
+    assert rewrite_url(event, "https://a.com/shop/x") == "http://local:2/x"
+    assert rewrite_url(event, "https://a.com/news") == "http://local:1/news"
+    assert rewrite_url("main", "https://a.com/news") == "https://a.com/news"
+
+
+def test_page_cache_expires_entries(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr("navigation.time.time", lambda: now[0])
+    cache = PageCache(ttl=60)
+    cache.put("https://example.com", "//body", "text")
+    assert cache.get("https://EXAMPLE.com/", "//body") == "text"
+    assert cache.get("https://example.com/", "page_source") is None
+    now[0] += 61
+    assert cache.get("https://example.com/", "//body") is None
+    assert not cache.entries
+
+
+def test_page_cache_evicts_the_least_recently_used():
+    cache = PageCache(size=2)
+    cache.put("https://example.com/a", "//body", "a")
+    cache.put("https://example.com/b", "//body", "b")
+    cache.get("https://example.com/a", "//body")
+    cache.put("https://example.com/c", "//body", "c")
+    assert cache.get("https://example.com/b", "//body") is None
+    assert cache.get("https://example.com/a", "//body") == "a"
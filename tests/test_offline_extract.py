@@ -0,0 +1,45 @@
+import pytest
+from selenium.webdriver.common.by import By
+from offline_extract import DomSnapshot, literal, to_xpath
+
+SOURCE = """<?xml version="1.0" encoding="utf-8"?>
+<html><head><style>p {}</style></head><body>
+<div id="main" class="box  wide">Café <b>menu</b><script>var x;</script>
+<p name="it's">First</p><p>Second</p></div>
+<input type="checkbox" checked disabled>
+<a href="/next"> Next  page </a>
+</body></html>"""
+
+
+@pytest.fixture
+def snapshot():
+    return DomSnapshot(SOURCE)
+
+
+def test_literal_quotes_both_kinds():
+    assert literal("a") == "'a'"
+    assert literal("it's") == '"it\'s"'
+    assert literal("it's \"x\"") == "concat('it', \"'\", 's \"x\"')"
+
+
+def test_to_xpath_leaves_complex_css_alone():
+    assert to_xpath(By.CSS_SELECTOR, "#main") == "//*[@id='main']"
+    assert to_xpath(By.CSS_SELECTOR, "div > p") is None
+
+
+def test_queries_match_the_live_driver(snapshot):
+    assert snapshot.query(By.CLASS_NAME, "box", ["id"]) == [{"id": "main"}]
+    assert snapshot.query(By.NAME, "it's", ["innerText"]) == [{"innerText": "First"}]
+    assert snapshot.query(By.LINK_TEXT, "Next page", ["href"]) == [{"href": "/next"}]
+    assert snapshot.query(By.TAG_NAME, "input", ["enabled", "selected"]) == [
+        {"enabled": False, "selected": True}]
+
+
+def test_inner_text_skips_scripts_and_breaks_blocks(snapshot):
+    assert snapshot.query(By.ID, "main", ["innerText"]) == [
+        {"innerText": "Café menu\nFirst\nSecond"}]
+
+
+def test_unsupported_locators_raise_value_error(snapshot):
+    with pytest.raises(ValueError):
+        snapshot.find_elements(By.XPATH, "//*[")
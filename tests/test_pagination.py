@@ -0,0 +1,76 @@
+import pagination
+from pagination import Paginator, page_url
+
+PAGER = ("xpath", "//div[@class='pager']//a")
+NEXT = ("xpath", "//a[contains(text(),'>')]")
+
+
+def test_page_url_sets_the_page_parameter():
+    assert page_url("https://store.example/search/?term=a&page=2#top", 5) == \
+        "https://store.example/search/?term=a&page=5"
+    assert page_url("https://store.example/search?term=", 1) == \
+        "https://store.example/search?term=&page=1"
+
+
+class Link:
+    def __init__(self, page):
+        self.page = page
+
+    def click(self):
+        self.page.shown += 1
+
+
+class Listing(Paginator):
+    def __init__(self, hrefs, pages=3):
+        self.event = {"pages": pages, "tabs": 2}
+        self.hrefs = hrefs
+        self.shown = 1
+        self.waits = []
+
+    @property
+    def driver(self):
+        return self
+
+    def execute_script(self, script, by, value):
+        assert (by, value) == PAGER
+        return self.hrefs
+
+    def wait_for(self, by, value):
+        self.waits.append(value)
+        return Link(self)
+
+
+def test_crawl_clicks_through_without_page_links():
+    listing = Listing(["javascript:void(0)", ""])
+    pages = listing.page_numbers()
+    results = listing.crawl(pages, PAGER, NEXT, lambda num: ("id", "page-{}".format(num)),
+                            lambda num: "page {} shown {}".format(num, listing.shown))
+    assert results == ["page 1 shown 1", "page 2 shown 2", "page 3 shown 3"]
+    assert listing.waits == [NEXT[1], "page-2", NEXT[1], "page-3"]
+
+
+class Tabs:
+    opened = []
+
+    def __init__(self, driver, size):
+        Tabs.opened.append(size)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        return False
+
+    def map(self, urls, read, ready):
+        self.urls = urls
+        return [(url, read(index), ready(index)) for index, url in enumerate(urls)]
+
+
+def test_crawl_loads_page_links_directly_in_tabs(monkeypatch):
+    monkeypatch.setattr(pagination, "TabPool", Tabs)
+    listing = Listing(["https://store.example/search/?term=a&page=2"], pages=2)
+    results = listing.crawl([1, 2], PAGER, NEXT, lambda num: ("id", num), lambda num: num * 10)
+    assert results == [("https://store.example/search/?term=a&page=1", 10, ("id", 1)),
+                       ("https://store.example/search/?term=a&page=2", 20, ("id", 2))]
+    assert Tabs.opened == [2]
+    assert listing.waits == []
@@ -0,0 +1,67 @@
+import pytest
+import wait_engine
+from readiness import Readiness
+
+
+class Clock:
+    def __init__(self):
+        self.now = 100.0
+
+    def time(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+class Page(Readiness):
+    """
+    Page whose DOM changes until mutations_until and whose requests are in
+    flight until requests_until, in seconds of the fake clock
+    """
+
+    def __init__(self, clock, mutations_until=0, requests_until=0):
+        self.clock = clock
+        self.mutations_until = mutations_until
+        self.requests_until = requests_until
+        self.regions = []
+
+    def watch(self, by=None, value=None):
+        self.regions.append((by, value))
+        now = self.clock.now
+        return {"now": now * 1000,
+                "inflight": 1 if now < self.requests_until else 0,
+                "lastNetwork": min(now, self.requests_until) * 1000,
+                "lastMutation": min(now, self.mutations_until) * 1000 or None}
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = Clock()
+    monkeypatch.setattr(wait_engine, "time", fake)
+    return fake
+
+
+def test_settle_waits_for_dom_and_network(clock):
+    page = Page(clock, mutations_until=100.4, requests_until=101)
+    assert page.settle("id", "results")
+    assert clock.now >= 101.5
+    assert set(page.regions) == {("id", "results")}
+
+
+def test_settle_ignores_what_it_is_told_to(clock):
+    assert Page(clock, requests_until=1000).wait_dom_quiet(quiet=0.3)
+    assert clock.now < 101
+    assert Page(clock, mutations_until=1000).wait_network_idle(network_idle=0.5)
+
+
+def test_settle_gives_up_at_the_cap(clock):
+    page = Page(clock, mutations_until=1000)
+    assert not page.settle(timeout=2)
+    assert clock.now == pytest.approx(102)
+
+
+def test_a_quiet_page_waits_the_quiet_period_from_the_start(clock):
+    page = Page(clock)
+    assert page.settle(quiet=0.3, network_idle=None)
+    assert 100.3 <= clock.now < 100.6
@@ -0,0 +1,83 @@
+import json
+import pytest
+import resource_profiles
+from resource_profiles import ResourceProfile, page_weight
+
+
+def network(method, **params):
+    return {"method": method, "params": params}
+
+
+def log_entry(event):
+    return {"message": json.dumps({"message": event})}
+
+
+PAGE = [network("Network.requestWillBeSent"),
+        network("Network.loadingFinished", encodedDataLength=1000),
+        network("Network.loadingFinished", encodedDataLength=500.0),
+        network("Network.loadingFailed", blockedReason="inspector"),
+        network("Network.loadingFailed", errorText="net::ERR_ABORTED")]
+
+
+class FakeDriver:
+    def __init__(self):
+        self.pending = []
+
+    def get_log(self, kind):
+        assert kind == "performance"
+        entries, self.pending = self.pending, []
+        return [log_entry(event) for event in entries]
+
+
+class Loader:
+    def navigate(self, url, force=False, load=None, ready=None):
+        self.driver.pending.extend(self.page)
+        return True
+
+
+class Measured(ResourceProfile, Loader):
+    def __init__(self, event, page):
+        self.event = event
+        self.driver = FakeDriver()
+        self.report = {}
+        self.page = page
+
+
+@pytest.fixture(autouse=True)
+def fresh_baselines(monkeypatch):
+    monkeypatch.setattr(resource_profiles, "BASELINES", {})
+
+
+def test_page_weight():
+    assert page_weight(PAGE) == {"bytes": 1500, "requests": 2, "blocked": 1}
+
+
+def test_savings_against_the_full_baseline():
+    full = Measured({"resources": "full"}, PAGE * 2)
+    full.navigate("https://example.com/")
+    light = Measured({"resources": "text-only"}, PAGE)
+    light.navigate("https://example.com/")
+    [entry] = light.report["resources"]
+    assert entry["profile"] == "text-only"
+    assert entry["bytes"] == 1500 and entry["bytes_saved"] == 1500
+    baseline = full.report["resources"][0]
+    assert entry["load_ms_saved"] == baseline["navigate_ms"] - entry["navigate_ms"]
+    assert baseline["bytes_saved"] is None
+
+
+def test_loads_outside_navigate_are_reported_as_other():
+    sele = Measured({"resources": "no-media"}, [])
+    sele.driver.pending.extend(PAGE)
+    sele.navigate("https://example.com/")
+    sele.driver.pending.extend(PAGE[:2])
+    sele.record_other_loads()
+    sele.record_other_loads()
+    assert [(entry["url"], entry["bytes"]) for entry in sele.report["resources"]] == [
+        ("other", 1500), ("https://example.com/", 0), ("other", 1000)]
+
+
+def test_nothing_is_measured_without_a_profile():
+    sele = Measured({}, PAGE)
+    sele.navigate("https://example.com/")
+    sele.record_other_loads()
+    assert sele.report == {}
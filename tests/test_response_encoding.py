@@ -0,0 +1,36 @@
+import base64
+import gzip
+import json
+import response_encoding
+from response_encoding import truncate, build_response, TRUNCATED
+
+
+def test_truncate_caps_nested_strings_on_character_boundaries():
+    counter = [0]
+    value = truncate({"a": ["é" * 10, "ok"], "n": 3}, 5, counter)
+    assert value == {"a": ["éé" + TRUNCATED.format(16), "ok"], "n": 3}
+    assert counter == [1]
+
+
+def test_auto_encoding_compresses_large_bodies():
+    small = build_response({"a": "b"}, {})
+    assert small["body"] == '{"a": "b"}' and "isBase64Encoded" not in small
+    assert small["headers"]["X-Body-Encoding"] == "identity"
+    assert "Content-Encoding" not in small["headers"]
+    large = build_response({"a": "b" * 100}, {"compress_above": 10})
+    assert large["headers"]["Content-Encoding"] == "gzip"
+    assert large["headers"]["X-Body-Encoding"] == "gzip"
+    assert json.loads(gzip.decompress(base64.b64decode(large["body"]))) == {"a": "b" * 100}
+
+
+def test_zstd_falls_back_to_gzip_without_zstandard(monkeypatch):
+    monkeypatch.setattr(response_encoding, "zstandard", None)
+    response = build_response({"a": "b"}, {"encoding": "zstd"})
+    assert response["headers"]["Content-Encoding"] == "gzip"
+    assert response["isBase64Encoded"]
+
+
+def test_max_field_bytes_counts_truncated_fields():
+    response = build_response({"a": "x" * 10, "b": ["y" * 3]}, {"max_field_bytes": 4})
+    assert json.loads(response["body"]) == {"a": "xxxx" + TRUNCATED.format(6), "b": ["yyy"]}
+    assert response["headers"]["X-Truncated-Fields"] == "1"
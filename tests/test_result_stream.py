@@ -0,0 +1,38 @@
+import io
+import json
+import sys
+from result_stream import NdjsonSink, open_sink
+
+
+class Context:
+    def __init__(self, stream):
+        self.response_stream = stream
+
+
+def test_sink_writes_one_json_line_per_record():
+    for stream in (io.StringIO(), io.BytesIO()):
+        sink = NdjsonSink(stream)
+        size = sink.write("a", {"text": "é"})
+        sink.write("b", [1])
+        data = stream.getvalue()
+        lines = (data if isinstance(data, str) else data.decode("utf-8")).splitlines()
+        assert [json.loads(line) for line in lines] == [
+            {"scenario": "a", "result": {"text": "é"}}, {"scenario": "b", "result": [1]}]
+        assert size == len(lines[0].encode("utf-8")) + 1
+        assert sink.records == 2
+
+
+def test_open_sink_targets(tmp_path):
+    with open_sink({}) as sink:
+        assert sink is None
+    with open_sink("main") as sink:
+        assert sink is None
+    with open_sink({"stream": "-"}) as sink:
+        assert sink.stream is sys.__stdout__
+    stream = io.BytesIO()
+    with open_sink({"stream": "-"}, Context(stream)) as sink:
+        assert sink.stream is stream
+    path = tmp_path / "results.ndjson"
+    with open_sink({"stream": str(path)}) as sink:
+        sink.write("a", "A")
+    assert json.loads(path.read_text()) == {"scenario": "a", "result": "A"}
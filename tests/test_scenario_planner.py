@@ -0,0 +1,70 @@
+from scenario_planner import scenario, plan_scenarios, page_groups, count_loads, target_of
+
+
+class Site:
+    @scenario("https://Example.com")
+    def home_text(self):
+        pass
+
+    @scenario("https://example.com/", writes=True)
+    def home_search(self):
+        pass
+
+    @scenario("https://example.com/", session=True, writes=True)
+    def login(self):
+        pass
+
+    @scenario()
+    def after_search(self):
+        pass
+
+    @scenario("https://example.com/other")
+    def other_text(self):
+        pass
+
+    def undeclared(self):
+        pass
+
+
+def test_scenario_normalizes_the_url_and_exposes_the_target():
+    target = target_of(Site, "home_text")
+    assert target.url == "https://example.com/"
+    assert not target.writes and not target.session
+    sele = Site()
+    Site.home_text(sele)
+    assert getattr(sele, "current_target") is None
+
+
+def test_undeclared_methods_are_barriers():
+    target = target_of(Site, "undeclared")
+    assert target.writes and target.session
+
+
+def test_count_loads_reloads_after_a_write():
+    assert count_loads(Site, {"a": "home_text", "b": "home_text"}) == 1
+    assert count_loads(Site, {"a": "home_search", "b": "home_text"}) == 2
+    assert count_loads(Site, {"a": "home_text", "o": "other_text", "b": "home_text"}) == 3
+
+
+def test_read_only_scenarios_of_a_page_run_first():
+    plan = plan_scenarios(Site, {"s": "home_search", "o": "other_text", "t": "home_text"})
+    assert list(plan.order) == ["t", "s", "o"]
+    assert (plan.naive, plan.planned, plan.saved) == (3, 2, 1)
+
+
+def test_url_less_scenarios_move_with_the_one_before_them():
+    plan = plan_scenarios(Site, {"s": "home_search", "f": "after_search", "t": "home_text"})
+    assert list(plan.order) == ["t", "s", "f"]
+
+
+def test_nothing_moves_across_a_session_barrier():
+    scenarios = {"s": "home_search", "l": "login", "t": "home_text", "o": "other_text"}
+    plan = plan_scenarios(Site, scenarios)
+    assert list(plan.order) == ["s", "l", "t", "o"]
+
+
+def test_page_groups_keep_everything_after_a_barrier_together():
+    assert page_groups(Site, {"o": "other_text", "t": "home_text", "f": "after_search"}) == [
+        [("o", "other_text")], [("t", "home_text"), ("f", "after_search")]]
+    assert page_groups(Site, {"l": "login", "o": "other_text", "t": "home_text"}) == [
+        [("l", "login"), ("o", "other_text"), ("t", "home_text")]]
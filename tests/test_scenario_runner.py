@@ -0,0 +1,198 @@
+import time
+from concurrent.futures import TimeoutError as FutureTimeout
+import pytest
+import scenario_runner
+from scenario_runner import (event_option, keep, merge_report, run_scenarios, run_deadline,
+                             priority_units, scenario_budget, record_duration)
+from scenario_planner import scenario
+from fakes import FakeSele
+
+
+@pytest.fixture(autouse=True)
+def fresh_state(monkeypatch):
+    monkeypatch.setattr(scenario_runner, "DURATIONS", {})
+    FakeSele.sessions, FakeSele.launches, FakeSele.failing_launches = [], [], set()
+
+
+class Log:
+    def __init__(self):
+        self.records = []
+
+    def error(self, msg, **fields):
+        self.records.append((msg, fields))
+
+
+class Sink:
+    def __init__(self):
+        self.records = []
+
+    def write(self, key, result):
+        self.records.append((key, result))
+        return 7
+
+
+def test_event_option_ignores_the_main_string():
+    assert event_option("main", "concurrency", 1) == 1
+    assert event_option({"concurrency": 3}, "concurrency", 1) == 3
+
+
+def test_keep_streams_to_the_sink():
+    results, sink = {}, Sink()
+    keep(results, "a", "A", sink)
+    assert results == {"a": {"streamed": 7}}
+    assert sink.records == [("a", "A")]
+
+
+def test_merge_report_concatenates_lists_and_updates_dicts():
+    report = {"failed": ["a"], "timings": {"x": 1}}
+    merge_report(report, {"failed": ["b"], "timings": {"y": 2}})
+    assert report == {"failed": ["a", "b"], "timings": {"x": 1, "y": 2}}
+    merge_report(None, {"failed": ["c"]})
+
+
+def test_sequential_runs_on_one_session():
+    results = run_scenarios(FakeSele, {}, {"a": "read_a", "f": "follow_a", "b": "read_b"})
+    assert results == {"a": "A", "f": "follows a", "b": "B"}
+    assert len(FakeSele.sessions) == 1
+
+
+def test_priority_units_keep_url_less_scenarios_behind():
+    units = priority_units(FakeSele, {"priorities": {"b": 1}},
+                           {"a": "read_a", "f": "follow_a", "b": "read_b"})
+    assert units == [[("b", "read_b")], [("a", "read_a"), ("f", "follow_a")]]
+
+
+def test_parallel_keeps_results_when_a_scenario_fails():
+    report = {}
+    results = run_scenarios(FakeSele, {"concurrency": 3},
+                            {"a": "read_a", "f": "follow_a", "x": "broken", "b": "read_b"},
+                            report)
+    assert results == {"a": "A", "f": "follows a", "b": "B"}
+    assert report["failed"] == ["x"]
+    assert report["skipped"] == []
+    assert len(report["sessions"]) == 3
+
+
+def test_parallel_runs_url_less_scenarios_on_the_session_before_them():
+    run_scenarios(FakeSele, {"concurrency": 2}, {"a": "read_a", "f": "follow_a", "b": "read_b"})
+    sessions = sorted(sele.ran for sele in FakeSele.sessions)
+    assert sessions == [["read_a", "follow_a"], ["read_b"]]
+
+
+def test_parallel_keeps_results_when_a_session_cannot_launch(monkeypatch):
+    log = Log()
+    monkeypatch.setattr(scenario_runner, "LOG", log)
+    FakeSele.failing_launches = {1}
+    report = {}
+    results = run_scenarios(FakeSele, {"concurrency": 2},
+                            {"a": "read_a", "f": "follow_a", "b": "read_b"}, report)
+    lost = [key for key in ["a", "b"] if key not in results]
+    assert len(lost) == 1
+    assert report["failed"] == lost
+    assert report["skipped"] == (["f"] if lost == ["a"] else [])
+    assert log.records[0][0] == "session failed"
+    assert "chrome failed to start" in str(log.records[0][1]["error"])
+
+
+def test_failed_scenarios_are_logged(monkeypatch):
+    log = Log()
+    monkeypatch.setattr(scenario_runner, "LOG", log)
+    run_scenarios(FakeSele, {"concurrency": 2}, {"x": "broken", "a": "read_a"})
+    [(msg, fields)] = log.records
+    assert msg == "scenario failed"
+    assert (fields["key"], fields["scenario"]) == ("x", "broken")
+    assert isinstance(fields["error"], ValueError)
+
+
+class Streamed(FakeSele):
+    @scenario()
+    def streamed_so_far(self):
+        return [key for key, _ in self.event["sink"].records]
+
+
+def test_parallel_streams_each_result_when_its_scenario_finishes():
+    sink = Sink()
+    results = run_scenarios(Streamed, {"concurrency": 2, "sink": sink},
+                            {"a": "read_a", "s": "streamed_so_far", "b": "read_b"}, sink=sink)
+    assert results == {"a": {"streamed": 7}, "s": {"streamed": 7}, "b": {"streamed": 7}}
+    assert "a" in dict(sink.records)["s"]
+
+
+def test_deadline_reports_failures_and_keeps_going():
+    report = {}
+    results = run_scenarios(FakeSele, {"deadline": 30},
+                            {"x": "broken", "a": "read_a", "b": "read_b"}, report)
+    assert results == {"a": "A", "b": "B"}
+    assert report["failed"] == ["x"]
+    assert FakeSele.sessions[0].exits == [ValueError]
+
+
+def test_deadline_abandons_a_scenario_over_budget():
+    report = {}
+    start = time.time()
+    results = run_deadline(FakeSele, {"budgets": {"s": 0.2}},
+                           {"s": "slow", "a": "read_a"}, time.time() + 10, report)
+    assert time.time() - start < 1
+    assert results == {"a": "A"}
+    assert report["timed_out"] == ["s"]
+    assert len(FakeSele.sessions) == 2
+
+
+class Stuck(FakeSele):
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        if exc_type is FutureTimeout:
+            time.sleep(2)
+        return super().__exit__(exc_type, exc_val, exc_tb)
+
+
+def test_deadline_does_not_wait_for_an_abandoned_session():
+    start = time.time()
+    results = run_deadline(Stuck, {"budgets": {"s": 0.2}},
+                           {"s": "slow", "a": "read_a"}, time.time() + 10, {})
+    assert time.time() - start < 1
+    assert results == {"a": "A"}
+
+
+def test_deadline_keeps_results_when_a_new_session_cannot_launch():
+    FakeSele.failing_launches = {1}
+    report = {}
+    results = run_deadline(FakeSele, {}, {"x": "broken", "b": "read_b", "a": "read_a"},
+                           time.time() + 10, report)
+    assert results == {"a": "A"}
+    assert report["failed"] == ["x", "b"]
+
+
+def test_deadline_skips_what_no_longer_fits():
+    record_duration("read_b", 5)
+    report = {}
+    results = run_deadline(FakeSele, {}, {"a": "read_a", "b": "read_b"},
+                           time.time() + 2, report)
+    assert results == {"a": "A"}
+    assert report["skipped"] == ["b"]
+
+
+def test_deadline_follows_priorities_and_returns_declared_order():
+    results = run_scenarios(FakeSele, {"deadline": 30, "priorities": {"b": 5}},
+                            {"a": "read_a", "b": "read_b"})
+    assert list(results) == ["a", "b"]
+    assert FakeSele.sessions[0].ran == ["read_b", "read_a"]
+
+
+def test_scenario_budget():
+    assert scenario_budget({}, "a", "read_a", 20) == 20
+    assert scenario_budget({"budgets": {"a": 3}}, "a", "read_a", 20) == 3
+    record_duration("read_a", 1)
+    assert scenario_budget({}, "a", "read_a", 20) == scenario_runner.MIN_BUDGET
+    record_duration("read_a", 11)
+    assert scenario_runner.DURATIONS["read_a"] == pytest.approx(4)
+
+
+def test_parallel_stops_at_the_deadline():
+    report = {}
+    start = time.time()
+    results = run_scenarios(FakeSele, {"concurrency": 2, "deadline": 0.5, "deadline_reserve": 0},
+                            {"a": "read_a", "s": "slow", "t": "slow", "b": "read_b"}, report)
+    assert time.time() - start < 1
+    assert results == {"a": "A"}
+    assert sorted(report["timed_out"]) == ["s", "t"]
+    assert report["skipped"] == ["b"] and report["failed"] == []
@@ -0,0 +1,97 @@
+from selenium.common.exceptions import WebDriverException
+from search_fanout import SearchFanout
+
+READY = ("id", "search_results")
+
+
+class Search(SearchFanout):
+    """
+    Fans out over scripted attempts: failures[term] attempts fail before it works
+    """
+
+    def __init__(self, event, failures=None):
+        self.event = event
+        self.failures = dict(failures or {})
+        self.report = {}
+        self.batches = []
+
+    def rewrite_url(self, url):
+        return url
+
+    def fetch_in_tabs(self, urls, ready, read):
+        self.batches.append(list(urls))
+        fetched = []
+        for url in urls:
+            term = url.rsplit("=", 1)[1]
+            if self.failures.get(term, 0):
+                self.failures[term] -= 1
+                fetched.append((None, 0.5, WebDriverException("timeout " + term)))
+            else:
+                fetched.append(("results " + term, 0.25, None))
+        return fetched
+
+
+def url_for(term):
+    return "https://store.example/search/?term=" + term
+
+
+def test_failed_terms_are_retried_in_one_batch():
+    search = Search({"retries": 2}, failures={"b": 1, "c": 5})
+    outcome = search.fan_out(["a", "b", "c"], url_for, READY, read=None)
+    assert search.batches == [[url_for("a"), url_for("b"), url_for("c")],
+                              [url_for("b"), url_for("c")], [url_for("c")]]
+    assert outcome["a"] == {"attempts": 1, "seconds": 0.25, "results": "results a"}
+    assert outcome["b"] == {"attempts": 2, "seconds": 0.75, "results": "results b"}
+    assert outcome["c"] == {"attempts": 3, "seconds": 1.5, "error": "Message: timeout c\n"}
+
+
+def test_fallback_runs_after_the_last_retry():
+    search = Search({"retries": 0}, failures={"b": 1, "c": 1})
+
+    def fallback(term):
+        if term == "c":
+            raise WebDriverException("no search box")
+        return "typed " + term
+
+    outcome = search.fan_out(["a", "b", "c"], url_for, READY, None, fallback)
+    assert outcome["b"]["results"] == "typed b" and "error" not in outcome["b"]
+    assert outcome["b"]["attempts"] == 2
+    assert outcome["c"]["error"] == "Message: no search box\n"
+    assert list(outcome) == ["a", "b", "c"]
+
+
+def test_search_terms_and_size_come_from_the_event():
+    search = Search({"terms": ["x", "y"], "fanout_size": 0})
+    assert search.search_terms() == ["x", "y"]
+    assert search.fanout_size() == 1
+    assert len(Search({}).search_terms()) == 26
+
+
+class Session(SearchFanout):
+    launches = 0
+
+    def __init__(self, event):
+        self.event = event
+        self.report = {"sessions": [id(self)]}
+        self.driver = "driver"
+
+    def __enter__(self):
+        Session.launches += 1
+        if Session.launches == 2:
+            raise RuntimeError("chrome failed to start")
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        return True
+
+    def load_early(self, url, load, ready):
+        if url.endswith("broken"):
+            raise WebDriverException("broken page")
+
+
+def test_fetch_on_drivers_reports_launch_failures_as_errors():
+    fanout = Session({"fanout_size": 1})
+    fetched = fanout.fetch_on_drivers(["ok", "launch", "broken"], READY, lambda driver: driver)
+    assert [(result, type(error).__name__) for result, _, error in fetched] == [
+        ("driver", "NoneType"), (None, "RuntimeError"), (None, "WebDriverException")]
+    assert len(fanout.report["sessions"]) == 4
@@ -0,0 +1,65 @@
+import json
+import logging
+import pytest
+import structured_log
+from structured_log import (JsonFormatter, SamplingFilter, StructuredLogger, configure_logging,
+                            MAX_FIELD, SAMPLE_RATE)
+
+
+@pytest.fixture(autouse=True)
+def settings(monkeypatch):
+    monkeypatch.setitem(structured_log.SETTINGS, "max_field", MAX_FIELD)
+    monkeypatch.setitem(structured_log.SETTINGS, "sample", SAMPLE_RATE)
+    root = logging.getLogger("sele")
+    level = root.level
+    yield structured_log.SETTINGS
+    root.setLevel(level)
+
+
+def record(sampled=False, **fields):
+    entry = logging.LogRecord("sele.test", logging.INFO, __file__, 1, "page %s", ("read",), None)
+    entry.fields = fields
+    entry.sampled = sampled
+    return entry
+
+
+def test_formatter_writes_one_json_object_with_cut_fields(settings):
+    settings["max_field"] = 5
+    entry = json.loads(JsonFormatter().format(record(body="x" * 8, size=8, error=ValueError("e"))))
+    assert entry["msg"] == "page read" and entry["level"] == "INFO"
+    assert entry["body"] == "xxxxx...[3 more]"
+    assert entry["size"] == 8 and entry["error"] == "e"
+
+
+def test_sampling_only_drops_sampled_records(settings, monkeypatch):
+    monkeypatch.setattr(structured_log.random, "random", lambda: 0.5)
+    keep = SamplingFilter().filter
+    assert keep(record())
+    assert not keep(record(sampled=True))
+    settings["sample"] = 0.6
+    assert keep(record(sampled=True))
+
+
+def test_logger_puts_keyword_arguments_in_fields():
+    captured = []
+    logger = logging.getLogger("sele.test_structured_log")
+    handler = logging.Handler()
+    handler.emit = captured.append
+    logger.addHandler(handler)
+    try:
+        StructuredLogger(logger, {}).warning("lookup failed", sample=True, key="a")
+    finally:
+        logger.removeHandler(handler)
+    [entry] = captured
+    assert entry.fields == {"key": "a"} and entry.sampled
+    assert entry.levelno == logging.WARNING
+
+
+def test_configure_logging(settings):
+    configure_logging({"log_full_body": True, "log_sample": 0.5})
+    assert settings["max_field"] is None and settings["sample"] == 0.5
+    assert logging.getLogger("sele").level == logging.DEBUG
+    configure_logging("main")
+    assert settings["max_field"] == MAX_FIELD and settings["sample"] == SAMPLE_RATE
+    configure_logging({"log_level": "ERROR"})
+    assert logging.getLogger("sele").level == logging.ERROR
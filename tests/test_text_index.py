@@ -0,0 +1,44 @@
+from navigation import PageCache
+from text_index import TextIndex, TextSearch
+
+
+def test_containing_matches_own_text_in_document_order():
+    index = TextIndex([["Price 10", "Price 10 EUR"], ["Buy", "Buy now"], ["Sale 10%", "Sale 10%"]])
+    assert index.containing("10") == ["Price 10 EUR", "Sale 10%"]
+    assert index.containing("buy") == []
+    assert index.containing("Buy") == ["Buy now"]
+    assert index.containing("") == ["Price 10 EUR", "Buy now", "Sale 10%"]
+    assert index.containing("zz") == []
+
+
+def test_token_lookups_match_whole_words_case_insensitively():
+    index = TextIndex([["Add to Cart", "Add to Cart"], ["Cartoon sale", "Cartoon sale!"]])
+    assert index.with_token("cart") == ["Add to Cart"]
+    assert index.with_token("SALE") == ["Cartoon sale!"]
+    assert index.has_token("Add") and not index.has_token("car")
+
+
+class Page(TextSearch):
+    def __init__(self):
+        self.page_cache = PageCache()
+        self.loaded_url = "https://example.com/"
+        self.dom_clean = True
+        self.scripts = 0
+
+    @property
+    def driver(self):
+        return self
+
+    def execute_script(self, script):
+        self.scripts += 1
+        return [["Buy", "Buy now"]]
+
+
+def test_text_index_is_read_once_while_the_page_is_clean():
+    page = Page()
+    assert page.text_index().containing("B") == ["Buy now"]
+    assert page.text_index().has_token("buy")
+    assert page.scripts == 1
+    page.dom_clean = False
+    page.text_index()
+    assert page.scripts == 2
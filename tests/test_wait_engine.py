@@ -0,0 +1,141 @@
+import pytest
+from selenium.common.exceptions import NoSuchElementException, TimeoutException
+from selenium.webdriver.common.by import By
+import wait_engine
+from wait_engine import AdaptiveWait, poll_until, record_ready, first_poll
+
+
+class Clock:
+    def __init__(self):
+        self.now = 100.0
+        self.sleeps = []
+
+    def time(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(round(seconds, 4))
+        self.now += seconds
+
+
+@pytest.fixture(autouse=True)
+def clock(monkeypatch):
+    fake = Clock()
+    monkeypatch.setattr(wait_engine, "time", fake)
+    monkeypatch.setattr(wait_engine, "READY_HISTORY", {})
+    return fake
+
+
+def test_poll_until_backs_off_up_to_max_poll(clock):
+    calls = []
+
+    def check():
+        calls.append(clock.now)
+        return len(calls) == 8 and "ready"
+
+    value, seconds = poll_until(check, 30, first=0.5)
+    assert value == "ready"
+    assert clock.sleeps == [0.5, 0.75, 1.0, 1.0, 1.0, 1.0, 1.0]
+    assert seconds == pytest.approx(6.25)
+
+
+def test_poll_until_never_sleeps_past_the_timeout(clock):
+    with pytest.raises(TimeoutException, match="gone"):
+        poll_until(lambda: None, 0.1, first=0.08, message="gone")
+    assert sum(clock.sleeps) == pytest.approx(0.1)
+
+
+def test_ready_history_moves_the_first_poll():
+    locator = (By.ID, "x")
+    assert first_poll(locator) == wait_engine.FIRST_POLL
+    record_ready(locator, 1.0)
+    record_ready(locator, 0.0)
+    assert wait_engine.READY_HISTORY[locator] == pytest.approx(0.7)
+    assert first_poll(locator) == pytest.approx(0.63)
+    record_ready(locator, 100)
+    assert first_poll(locator) == wait_engine.MAX_POLL
+
+
+class Page(AdaptiveWait):
+    WAIT_BUDGETS = {(By.ID, "slow"): 0.5}
+
+    def __init__(self, ready_after=0, found=None):
+        self.ready_after = ready_after
+        self.found = found
+        self.lookups = []
+
+    @property
+    def driver(self):
+        return self
+
+    def find_element(self, by, value):
+        self.lookups.append((by, value))
+        if len(self.lookups) <= self.ready_after:
+            raise NoSuchElementException(value)
+        return "element"
+
+    def find_elements(self, by, value):
+        self.lookups.append((by, value))
+        return [] if len(self.lookups) <= self.ready_after else ["a", "b"]
+
+
+def test_wait_for_polls_with_the_compiled_locator(clock):
+    page = Page(ready_after=2)
+    assert page.wait_for(By.XPATH, "//div[@id='x']") == "element"
+    assert page.lookups == [(By.CSS_SELECTOR, 'div[id="x"]')] * 3
+    assert wait_engine.READY_HISTORY[(By.XPATH, "//div[@id='x']")] == pytest.approx(0.125)
+
+
+def test_wait_for_checks_the_condition():
+    page = Page()
+    with pytest.raises(TimeoutException):
+        page.wait_for(By.ID, "x", timeout=0.2, condition=lambda element: False)
+
+
+def test_wait_budgets(clock):
+    page = Page(ready_after=1000)
+    with pytest.raises(TimeoutException):
+        page.wait_for(By.ID, "slow")
+    assert clock.now == pytest.approx(100.5)
+    assert page.wait_budget(By.ID, "other") == wait_engine.DEFAULT_TIMEOUT
+    assert page.wait_budget(By.ID, "slow", 3) == 3
+
+
+def test_wait_for_elements_returns_empty_on_timeout():
+    assert Page(ready_after=1).wait_for_elements(By.TAG_NAME, "li") == ["a", "b"]
+    assert Page(ready_after=1000).wait_for_elements(By.TAG_NAME, "li", timeout=0.2) == []
+
+
+class Gate(AdaptiveWait):
+    def __init__(self, rounds):
+        self.rounds = list(rounds)
+        self.scripts = []
+
+    @property
+    def driver(self):
+        return self
+
+    def execute_script(self, script, locators):
+        self.scripts.append(locators)
+        return self.rounds.pop(0) if len(self.rounds) > 1 else self.rounds[0]
+
+
+def test_wait_all_runs_one_script_per_poll_with_compiled_locators():
+    gate = Gate([["a", None], ["a", "b"]])
+    locators = [(By.XPATH, "//form"), (By.ID, "submit")]
+    assert gate.wait_all(locators) == ["a", "b"]
+    assert gate.scripts == [[[By.TAG_NAME, "form"], [By.ID, "submit"]]] * 2
+    assert tuple(locators) in wait_engine.READY_HISTORY
+
+
+def test_wait_any_returns_at_the_first_match():
+    gate = Gate([[None, None], [None, "b"]])
+    assert gate.wait_any([(By.ID, "a"), (By.ID, "b")]) == [None, "b"]
+
+
+def test_wait_matches_uses_the_largest_budget(clock):
+    gate = Gate([[None]])
+    gate.WAIT_BUDGETS = {(By.ID, "a"): 0.3, (By.ID, "b"): 0.6}
+    with pytest.raises(TimeoutException, match="a, b"):
+        gate.wait_all([(By.ID, "a"), (By.ID, "b")])
+    assert clock.now == pytest.approx(100.6)
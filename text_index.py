@@ -0,0 +1,92 @@
+"""
+In-page text index for Sele classes.
+One //*[contains(text(), 'x')] query walks the whole DOM and reading innerText
+of its matches costs one round-trip per element. text_index walks the DOM once
+in the page, returns the text of every element with non-blank own text, and
+substring and token lookups then run in Python without touching the browser.
+"""
+import re
+from collections import defaultdict
+
+TOKEN = re.compile(r"\w+")
+
+TEXT_INDEX_JS = """
+var entries = [];
+var walker = document.createTreeWalker(document.documentElement, NodeFilter.SHOW_ELEMENT);
+for (var el = walker.currentNode; el; el = walker.nextNode()) {
+    for (var child = el.firstChild; child; child = child.nextSibling) {
+        if (child.nodeType === Node.TEXT_NODE) {
+            if (/\\S/.test(child.data)) {
+                entries.push([child.data, el.innerText === undefined ? el.textContent : el.innerText]);
+            }
+            break;
+        }
+    }
+}
+return entries;
+"""
+
+
+class TextIndex:
+    """
+    Elements of one page as (own text, innerText) pairs in document order. The
+    own text is the first text node child, which is what text() compares in
+    an XPath 1.0 contains(text(), ...). Elements whose own text is only
+    whitespace are left out, they never contain a visible character and
+    would send back the innerText of every wrapper around the content.
+    """
+
+    def __init__(self, entries):
+        self.entries = [(own, inner) for own, inner in entries]
+        self.chars = defaultdict(set)
+        self.tokens = defaultdict(set)
+        for number, (own, _) in enumerate(self.entries):
+            for char in set(own):
+                self.chars[char].add(number)
+            for token in set(TOKEN.findall(own.lower())):
+                self.tokens[token].add(number)
+
+    def containing(self, substring):
+        """
+        :param substring: text to look for, case sensitive like contains()
+        :return: innerText of the elements whose own text contains substring
+        """
+        if not substring:
+            return [inner for _, inner in self.entries]
+        candidates = min((self.chars.get(char, set()) for char in set(substring)), key=len)
+        return [self.entries[number][1] for number in sorted(candidates)
+                if substring in self.entries[number][0]]
+
+    def with_token(self, token):
+        """
+        :param token: word to look for, case insensitive
+        :return: innerText of the elements whose own text has token as a word
+        """
+        return [self.entries[number][1]
+                for number in sorted(self.tokens.get(token.lower(), ()))]
+
+    def has_token(self, token):
+        """
+        :param token: word to look for, case insensitive
+        :return: True when the own text of any element has token as a word
+        """
+        return token.lower() in self.tokens
+
+
+class TextSearch:
+    """
+    Mixin for Sele classes, needs self.driver and Navigator
+    """
+
+    def text_index(self):
+        """
+        :return: TextIndex of the loaded page, reused while the page is clean
+        """
+        if self.dom_clean:
+            entries = self.page_cache.get(self.loaded_url, "text_index")
+            if entries is not None:
+                return TextIndex(entries)
+        entries = self.driver.execute_script(TEXT_INDEX_JS)
+        if self.dom_clean:
+            self.page_cache.put(self.loaded_url, "text_index", entries)
+        return TextIndex(entries)
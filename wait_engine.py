@@ -0,0 +1,198 @@
+"""
+Adaptive polling waits for Sele classes.
+Implicit waits make every negative lookup pay the full timeout and fixed
+poll frequencies make a condition that is ready after 100 ms cost seconds.
+wait_for polls fast at first, backs off, and remembers how long each locator
+took to become ready so the next invocation starts polling near that time.
+Simple XPath locators are sent as ID, name, tag or CSS lookups, see
+locator_compiler.
+"""
+import time
+from selenium.common.exceptions import (
+    NoSuchElementException, StaleElementReferenceException, TimeoutException
+)
+from bulk_query import LOCATE_JS
+from locator_compiler import compile_locator
+
+DEFAULT_TIMEOUT = 5
+FIRST_POLL = 0.05
+MAX_POLL = 1.0
+BACKOFF = 1.5
+HISTORY_WEIGHT = 0.3
+
+READY_HISTORY = {}
+
+FIRST_MATCH_JS = LOCATE_JS + """
+return arguments[0].map(function (locator) {
+    var found = locate(locator[0], locator[1]);
+    return found.length ? found[0] : null;
+});
+"""
+
+
+def record_ready(locator, seconds):
+    """
+    Keep a moving average of the time a locator took to become ready.
+    :param locator: (by, value) tuple
+    :param seconds: observed time to ready
+    """
+    previous = READY_HISTORY.get(locator)
+    if previous is None:
+        READY_HISTORY[locator] = seconds
+    else:
+        READY_HISTORY[locator] = previous + HISTORY_WEIGHT * (seconds - previous)
+
+
+def first_poll(locator):
+    """
+    :param locator: (by, value) tuple
+    :return: seconds to sleep after the first failed check
+    """
+    observed = READY_HISTORY.get(locator)
+    if not observed:
+        return FIRST_POLL
+    return min(max(FIRST_POLL, observed * 0.9), MAX_POLL)
+
+
+def poll_until(check, timeout, first=FIRST_POLL, message=""):
+    """
+    Call check until it returns something truthy, sleeping first, then
+    BACKOFF times longer between calls up to MAX_POLL.
+    :param check: callable returning a truthy value when ready
+    :param timeout: seconds before giving up
+    :param first: first sleep in seconds
+    :param message: TimeoutException message
+    :return: (value returned by check, seconds it took)
+    """
+    start = time.time()
+    deadline = start + timeout
+    poll = first
+    while True:
+        value = check()
+        now = time.time()
+        if value:
+            return value, now - start
+        if now >= deadline:
+            raise TimeoutException(message)
+        time.sleep(min(poll, deadline - now))
+        poll = min(poll * BACKOFF, MAX_POLL)
+
+
+class AdaptiveWait:
+    """
+    Mixin for Sele classes, needs self.driver.
+    WAIT_BUDGETS maps (by, value) locators to their own timeout in seconds.
+    """
+    WAIT_BUDGETS = {}
+
+    def disable_implicit_wait(self):
+        """
+        Negative lookups return at once, waiting is done by wait_for
+        """
+        self.driver.implicitly_wait(0)
+
+    def wait_budget(self, by, value, timeout=None):
+        """
+        :param by: selenium By strategy
+        :param value: locator value
+        :param timeout: seconds given by the caller, if any
+        :return: timeout argument, else the locator budget, else DEFAULT_TIMEOUT
+        """
+        if timeout is not None:
+            return timeout
+        return self.WAIT_BUDGETS.get((by, value), DEFAULT_TIMEOUT)
+
+    def wait_for(self, by, value, timeout=None, condition=None):
+        """
+        :param by: selenium By strategy
+        :param value: locator value
+        :param timeout: seconds, overrides the locator budget
+        :param condition: optional callable taking the element, e.g. is_displayed
+        :return: the element once it is present and condition holds
+        """
+        locator = (by, value)
+        find_by, find_value = compile_locator(by, value)
+
+        def check():
+            try:
+                element = self.driver.find_element(find_by, find_value)
+                if condition is None or condition(element):
+                    return element
+            except (NoSuchElementException, StaleElementReferenceException):
+                pass
+            return None
+
+        element, seconds = poll_until(
+            check, self.wait_budget(by, value, timeout), first_poll(locator),
+            "Timed out waiting for {}".format(value))
+        record_ready(locator, seconds)
+        return element
+
+    def wait_for_elements(self, by, value, timeout=None):
+        """
+        Like find_elements under an implicit wait, but polling adaptively.
+        :param by: selenium By strategy
+        :param value: locator value
+        :param timeout: seconds, overrides the locator budget
+        :return: matched elements, empty when none appeared in time
+        """
+        locator = (by, value)
+        find_by, find_value = compile_locator(by, value)
+        try:
+            elements, seconds = poll_until(
+                lambda: self.driver.find_elements(find_by, find_value),
+                self.wait_budget(by, value, timeout), first_poll(locator))
+        except TimeoutException:
+            return []
+        record_ready(locator, seconds)
+        return elements
+
+    def first_matches(self, locators):
+        """
+        :param locators: list of (by, value) tuples
+        :return: list with the first matching element or None per locator,
+                 resolved by one injected script
+        """
+        return self.driver.execute_script(
+            FIRST_MATCH_JS, [list(compile_locator(*locator)) for locator in locators])
+
+    def wait_matches(self, locators, ready, timeout=None):
+        """
+        :param locators: list of (by, value) tuples
+        :param ready: callable deciding from the match list whether to stop
+        :param timeout: seconds, overrides the largest locator budget
+        :return: list with the element or None per locator
+        """
+        locators = [tuple(locator) for locator in locators]
+        key = tuple(locators)
+        if timeout is None:
+            timeout = max(self.wait_budget(by, value) for by, value in locators)
+
+        def check():
+            found = self.first_matches(locators)
+            return found if ready(found) else None
+
+        found, seconds = poll_until(
+            check, timeout, first_poll(key),
+            "Timed out waiting for {}".format(", ".join(value for _, value in locators)))
+        record_ready(key, seconds)
+        return found
+
+    def wait_all(self, locators, timeout=None):
+        """
+        One polling loop for a gate on several elements.
+        :param locators: list of (by, value) tuples
+        :param timeout: seconds, overrides the largest locator budget
+        :return: list of elements, in locator order
+        """
+        return self.wait_matches(
+            locators, lambda found: all(element is not None for element in found), timeout)
+
+    def wait_any(self, locators, timeout=None):
+        """
+        :param locators: list of (by, value) tuples
+        :param timeout: seconds, overrides the largest locator budget
+        :return: list with the element or None per locator, at least one is set
+        """
+        return self.wait_matches(
+            locators, lambda found: any(element is not None for element in found), timeout)
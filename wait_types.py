@@ -1,56 +1,80 @@
 """
 Selenium Web Driver. Useful methods and properties
 """
-import json
+import sys
 import time
 from selenium import webdriver
 from selenium.webdriver.common.by import By
 from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as ec
-from selenium.common.exceptions import WebDriverException, NoSuchElementException
-from selenium.common.exceptions import ElementNotVisibleException, ElementNotSelectableException
+from selenium.common.exceptions import WebDriverException
+from driver_pool import POOL, options_key
+from navigation import Navigator, page_cache_for
+from resource_profiles import ResourceProfile
+from instrumentation import Instrumentation
+from wait_engine import AdaptiveWait
+from readiness import Readiness
+from async_sele import runner_for
+from result_stream import open_sink
+from response_encoding import build_response
+from structured_log import get_logger, configure_logging, flush
+from scenario_planner import scenario
 from env import U, P
 
+SCENARIOS = {
+    "implicit wait": "steam_implicit_wait",
+    "explicit wait": "expedia_explicit_wait",
+    "expedia work": "expedia_explicit_work"
+}
+
+LOG = get_logger(__name__)
+
 
 def handler(event, context):
     """
     This is the default aws lambda handler
+    Set "stream" in the event to write each result as an NDJSON line instead.
+    Scenarios that cannot finish before the Lambda times out are listed as skipped
+    or timed_out, also with "concurrency".
+    Set "orchestration" to "async" in the event to run them from an asyncio event loop.
     :param event: aws event
     :param context: aws context
     :return: json status code and body
     """
-    print(event, context)
-    with Sele(event) as sele:
-        try:
-            obj = {
-                "implicit wait": sele.steam_implicit_wait(),
-                "explicit wait": sele.expedia_explicit_wait(),
-                "expedia work": sele.expedia_explicit_work()
-            }
-            obj = json.dumps(obj)
-        except KeyboardInterrupt:
-            obj = {"error": str(KeyboardInterrupt)}
-            print(KeyboardInterrupt)
-
-    return {
-        "statusCode": 200,
-        "body": obj,
-        'headers': {'Content-Type': 'application/json'}
-    }
+    configure_logging(event)
+    LOG.info("invocation", event=event, context=context)
+    try:
+        report = {}
+        with open_sink(event, context) as sink:
+            obj = runner_for(event)(Sele, event, SCENARIOS, report, sink, context)
+        obj.update(report)
+    except KeyboardInterrupt:
+        obj = {"error": str(KeyboardInterrupt)}
+        LOG.error("interrupted")
+
+    response = build_response(obj, event)
+    flush()
+    return response
 
 
-class Sele:
+class Sele(Instrumentation, ResourceProfile, Navigator, AdaptiveWait, Readiness):
     """
     Initiate the driver instance and run the functions below.
     Since this is a file system, you have to instantiate this class by writing...
     with Sele(event) as sele:
     """
+    WAIT_BUDGETS = {
+        (By.XPATH, "//input[@id='stopFilter_stops-1']"): 8,
+        (By.XPATH, "//input[@id='stopFilter_stops-2']"): 8,
+        (By.XPATH, "//input[@id='airlineRowContainer_CX']"): 8,
+        (By.XPATH, "//input[@id='airlineRowContainer_LH']"): 8
+    }
 
     def __init__(self, event):
         self.event = event
         self.driver = None
         self.options = Options()
+        self.report = {}
+        self.page_cache = page_cache_for(event)
 
     def __enter__(self):
         if self.event != 'main':
@@ -60,120 +84,108 @@ class Sele:
             self.options.add_argument('--single-process')
             self.options.add_argument('--disable-dev-shm-usage')
         self.options.add_argument('--window-size=1600,900')
-        self.driver = webdriver.Chrome('/opt/chromedriver', options=self.options)
+        self.apply_profile_options()
+        self.apply_load_strategy()
+        self.driver = POOL.borrow(options_key(self.options), self.launch)
+        self.apply_profile_session()
+        self.instrument()
+        self.disable_implicit_wait()
         return self
 
     def __exit__(self, exc_type, exc_val, exc_tb):
-        self.driver.close()
-        self.driver.quit()
+        if exc_type is None:
+            self.record_other_loads()
+        self.uninstrument()
+        POOL.release(self.driver, discard=exc_type is not None)
         return True
 
+    def launch(self):
+        """
+        :return: a new chrome session, only used when the pool has none to lend
+        """
+        return webdriver.Chrome('/opt/chromedriver', options=self.options)
+
+    @scenario("https://store.steampowered.com/", writes=True)
     def steam_implicit_wait(self):
         """
         :return: search result from steam website
         """
         base_url = "https://store.steampowered.com/"
-        self.driver.implicitly_wait(1)
-        self.driver.get(base_url)
+        self.navigate(base_url)
+        self.mark_dirty()
         try:
-            self.driver.implicitly_wait(1)
-            self.driver.find_element(By.XPATH, "//a[@class='global_action_link']").click()
-            self.driver.implicitly_wait(1)
-            self.driver.find_element(By.XPATH, "//input[@id='input_username']").send_keys(U)
-            self.driver.implicitly_wait(1)
-            self.driver.find_element(By.XPATH, "//input[@id='input_password']").send_keys(P)
-            self.driver.implicitly_wait(1)
-            self.driver.find_element(By.XPATH, "//button[contains(@class,'btn_medium')]").click()
+            self.wait_for(By.XPATH, "//a[@class='global_action_link']").click()
+            self.wait_for(By.XPATH, "//input[@id='input_username']").send_keys(U)
+            self.wait_for(By.XPATH, "//input[@id='input_password']").send_keys(P)
+            self.wait_for(By.XPATH, "//button[contains(@class,'btn_medium')]").click()
         except WebDriverException:
             self.driver.quit()
             raise WebDriverException
         finally:
-            self.driver.implicitly_wait(1)
-            body = self.driver.find_element(By.XPATH, "//html").get_attribute("innerText")
-            print(body)
+            body = self.wait_for(By.XPATH, "//html").get_attribute("innerText")
+            LOG.debug("page body", body=body)
         return body
 
+    @scenario("https://www.expedia.com.sg", writes=True)
     def expedia_explicit_wait(self):
         """
         :return: search result from expedia website
         """
         base_url = "https://www.expedia.com.sg"
-        self.driver.implicitly_wait(1)
-        self.driver.get(base_url)
+        self.navigate(base_url)
+        self.mark_dirty()
         try:
-            self.driver.implicitly_wait(1)
-            self.driver.find_element(By.XPATH, "//button[@id='tab-flight-tab-hp']").click()
-            self.driver.implicitly_wait(1)
-            self.driver.find_element(
+            self.wait_for(By.XPATH, "//button[@id='tab-flight-tab-hp']").click()
+            self.wait_for(
                 By.XPATH, "//input[@id='flight-origin-hp-flight']"
             ).send_keys("Hong Kong, Hong Kong SAR (HKG-Hong Kong Intl.)")
-            self.driver.implicitly_wait(1)
-            self.driver.find_element(
+            self.wait_for(
                 By.XPATH, "//input[@id='flight-destination-hp-flight']"
             ).send_keys("Bologna, Italy (BLQ-Guglielmo Marconi)")
-            self.driver.implicitly_wait(1)
-            self.driver.find_element(
+            self.wait_for(
                 By.XPATH, "//input[@id='flight-departing-hp-flight']"
             ).send_keys("26/07/2019")
-            self.driver.implicitly_wait(1)
-            return_date = self.driver.find_element(
+            return_date = self.wait_for(
                 By.XPATH, "//input[@id='flight-returning-hp-flight']"
             )
             return_date.clear()
             return_date.send_keys("31/07/2019")
-            self.driver.implicitly_wait(3)
-            self.driver.find_element(
+            self.wait_for(
                 By.XPATH,
                 "//form[@id='gcw-flights-form-hp-flight']//button[contains(@class, 'gcw-submit')]"
             ).click()
 
-            wait = WebDriverWait(
-                self.driver, 8, poll_frequency=4,
-                ignored_exceptions=[NoSuchElementException,
-                                    ElementNotVisibleException, ElementNotSelectableException]
-            )
-            element = wait.until(
-                ec.presence_of_element_located((By.XPATH, "//input[@id='stopFilter_stops-1']")))
-            element.click()
+            self.wait_for(By.XPATH, "//input[@id='stopFilter_stops-1']").click()
         except WebDriverException:
             self.driver.quit()
             raise WebDriverException
         finally:
-            self.driver.implicitly_wait(1)
-            body = self.driver.find_element(By.XPATH, "//html").get_attribute("innerText")
-            print(body)
+            body = self.wait_for(By.XPATH, "//html").get_attribute("innerText")
+            LOG.debug("page body", body=body)
         return body
 
+    @scenario(writes=True)
     def expedia_explicit_work(self):
         """
         :return: search result from expedia website
         """
         try:
-            wait = WebDriverWait(
-                self.driver, 8, poll_frequency=1,
-                ignored_exceptions=[NoSuchElementException,
-                                    ElementNotVisibleException, ElementNotSelectableException]
-            )
-            wait.until(
-                ec.presence_of_element_located(
-                    (By.XPATH, "//input[@id='stopFilter_stops-1']"))).click()
-            wait.until(
-                ec.presence_of_element_located(
-                    (By.XPATH, "//input[@id='stopFilter_stops-2']"))).click()
-            wait.until(
-                ec.presence_of_element_located(
-                    (By.XPATH, "//input[@id='airlineRowContainer_CX']"))).click()
-            wait.until(
-                ec.presence_of_element_located(
-                    (By.XPATH, "//input[@id='airlineRowContainer_LH']"))).click()
-            time.sleep(3)
+            self.watch()
+            filters = self.wait_all([
+                (By.XPATH, "//input[@id='stopFilter_stops-1']"),
+                (By.XPATH, "//input[@id='stopFilter_stops-2']"),
+                (By.XPATH, "//input[@id='airlineRowContainer_CX']"),
+                (By.XPATH, "//input[@id='airlineRowContainer_LH']")
+            ])
+            for element in filters:
+                element.click()
+            self.settle(timeout=3)
         except WebDriverException:
             self.driver.quit()
             raise WebDriverException
         finally:
-            self.driver.implicitly_wait(1)
-            body = self.driver.find_element(By.XPATH, "//html").get_attribute("innerText")
-            print(body)
+            body = self.wait_for(By.XPATH, "//html").get_attribute("innerText")
+            LOG.debug("page body", body=body)
         return body
 
 
@@ -181,4 +193,5 @@ if __name__ == '__main__':
     START = time.time()
     HAND = handler('main', 'main')
     END = time.time()
-    print("Time spent operating this lambda function: " + str(END - START) + " seconds")
+    print("Time spent operating this lambda function: " + str(END - START) + " seconds",
+          file=sys.stderr)
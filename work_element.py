@@ -3,47 +3,74 @@ Simple Usage with headless chrome
 AWS lambda layers are located at /opt/ directory.
 Note that env will never be commited remotely
 """
-import json
+import sys
 import time
 from selenium import webdriver
 from selenium.webdriver.common.by import By
 from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.common.action_chains import ActionChains
 from selenium.common.exceptions import WebDriverException
+from driver_pool import POOL, options_key
+from bulk_query import BulkQuery
+from navigation import Navigator, page_cache_for
+from resource_profiles import ResourceProfile
+from instrumentation import Instrumentation
+from wait_engine import AdaptiveWait
+from readiness import Readiness
+from element_cache import ElementCache
+from scenario_planner import run_planned, scenario
+from async_sele import runner_for
+from result_stream import open_sink
+from response_encoding import build_response
+from structured_log import get_logger, configure_logging, flush
 from env import (USERNAME, PASSWORD)
 
+SCENARIOS = {
+    "browser interation": "steam_browser_interactions",
+    "click send": "steam_click_keys",
+    "element state": "steam_element_state",
+    "radio checkbox": "steam_radio_checkbox",
+    "element list": "steam_element_list",
+    "dropdown element": "steam_dropdown_element",
+    "hidden element": "steam_hidden_elements"
+}
+
+LOG = get_logger(__name__)
+
 
 def handler(event, context):
     """
+    Set "stream" in the event to write each result as an NDJSON line instead.
+    Scenarios that cannot finish before the Lambda times out are listed as skipped
+    or timed_out, also with "concurrency".
+    Set "orchestration" to "async" in the event to run them from an asyncio event loop.
     :param event: aws event
     :param context: aws context
     :return: json status code and body
     """
-    print(event, context)
-    with Sele(event) as sele:
-        try:
-            obj = {
-                "browser interation": sele.steam_browser_interactions(),
-                "click send": sele.steam_click_keys(),
-                "element state": sele.steam_element_state(),
-                "radio checkbox": sele.steam_radio_checkbox(),
-                "element list": sele.steam_element_list(),
-                "dropdown element": sele.steam_dropdown_element(),
-                "hidden element": sele.steam_hidden_elements()
-            }
-            obj = json.dumps(obj)
-        except KeyboardInterrupt:
-            obj = {"error": str(KeyboardInterrupt)}
-            print(KeyboardInterrupt)
+    configure_logging(event)
+    LOG.info("invocation", event=event, context=context)
+    headers = {}
+    try:
+        report = {}
+        with open_sink(event, context) as sink:
+            obj, plan = run_planned(Sele, event, SCENARIOS, report, sink, context,
+                                    runner_for(event))
+        obj.update(report)
+        if plan is not None:
+            LOG.info("page loads", planned=plan.planned, naive=plan.naive)
+            headers['X-Navigations-Saved'] = str(plan.saved)
+    except KeyboardInterrupt:
+        obj = {"error": str(KeyboardInterrupt)}
+        LOG.error("interrupted")
 
-    return {
-        "statusCode": 200,
-        "body": obj,
-        'headers': {'Content-Type': 'application/json'}
-    }
+    response = build_response(obj, event, headers)
+    flush()
+    return response
 
 
-class Sele:
+class Sele(Instrumentation, BulkQuery, ResourceProfile, Navigator, AdaptiveWait, Readiness,
+           ElementCache):
     """
     Initiate the driver instance.
     Since this is a file system, you have to instantiate this class by writing...
@@ -54,6 +81,8 @@ class Sele:
         self.event = event
         self.driver = None
         self.options = Options()
+        self.report = {}
+        self.page_cache = page_cache_for(event)
 
     def __enter__(self):
         if self.event != 'main':
@@ -63,219 +92,229 @@ class Sele:
         self.options.add_argument('--single-process')
         self.options.add_argument('--disable-dev-shm-usage')
         self.options.add_argument('--window-size=1920,1080')
-        self.driver = webdriver.Chrome('/opt/chromedriver', options=self.options)
+        self.apply_profile_options()
+        self.apply_load_strategy()
+        self.driver = POOL.borrow(options_key(self.options), self.launch)
+        self.apply_profile_session()
+        self.instrument()
+        self.disable_implicit_wait()
         return self
 
     def __exit__(self, exc_type, exc_val, exc_tb):
-        self.driver.close()
-        self.driver.quit()
+        if exc_type is None:
+            self.record_other_loads()
+        self.uninstrument()
+        POOL.release(self.driver, discard=exc_type is not None)
         return True
 
+    def launch(self):
+        """
+        :return: a new chrome session, only used when the pool has none to lend
+        """
+        return webdriver.Chrome('/opt/chromedriver', options=self.options)
+
+    @scenario("https://store.steampowered.com/", writes=True)
     def steam_browser_interactions(self):
         """
         :return: search result from steam website
         """
         base_url = "https://store.steampowered.com/"
         self.driver.maximize_window()
-        self.driver.get(base_url)
-        self.driver.implicitly_wait(1)
+        self.navigate(base_url)
+        self.mark_dirty()
         try:
             title = self.driver.title
-            print("Title of the webpage is: " + title)
-            print("Current Url of the web page is: " + self.driver.current_url)
+            LOG.debug("Title of the webpage", title=title)
+            LOG.debug("Current Url of the web page", url=self.driver.current_url)
             self.driver.refresh()
-            print("Browser Refreshed 1st time")
+            LOG.debug("Browser Refreshed 1st time")
             self.driver.get(self.driver.current_url)
-            print("Current Url of the web page is: " + self.driver.current_url)
-            print("Browser Refreshed 2nd time")
-            self.driver.get("https://steamcommunity.com/")
-            print("Current Url of the web page is: " + self.driver.current_url)
+            LOG.debug("Current Url of the web page", url=self.driver.current_url)
+            LOG.debug("Browser Refreshed 2nd time")
+            self.driver.get(self.rewrite_url("https://steamcommunity.com/"))
+            LOG.debug("Current Url of the web page", url=self.driver.current_url)
             self.driver.back()
-            print("Go one step back in browser history")
-            print("Current Url of the web page is: " + self.driver.current_url)
+            LOG.debug("Go one step back in browser history")
+            LOG.debug("Current Url of the web page", url=self.driver.current_url)
             self.driver.forward()
-            print("Go one step forward in browser history")
+            LOG.debug("Go one step forward in browser history")
             self.driver.back()
-            print("Current Url of the web page is: " + self.driver.current_url)
+            LOG.debug("Current Url of the web page", url=self.driver.current_url)
 
-            self.driver.implicitly_wait(1)
-            body = self.driver.find_element(By.XPATH, "//body").get_attribute("innerText")
-            print(body)
+            body = self.page_text()
+            LOG.debug("page body", body=body)
         except WebDriverException:
             self.driver.close()
             self.driver.quit()
             raise WebDriverException
         return body
 
+    @scenario("https://store.steampowered.com", writes=True, session=True)
     def steam_click_keys(self):
         """
         :return: search result from steam website
         """
         base_url = "https://store.steampowered.com"
         self.driver.maximize_window()
-        self.driver.get(base_url)
-        self.driver.implicitly_wait(1)
+        self.navigate(base_url)
+        self.mark_dirty()
         try:
-            self.driver.find_element(By.XPATH, "//a[@class='global_action_link']").click()
-            self.driver.find_element(
+            self.wait_for(By.XPATH, "//a[@class='global_action_link']").click()
+            self.wait_for(
                 By.XPATH, "//input[@id='input_username']"
             ).send_keys(USERNAME)
-            self.driver.find_element(
+            self.wait_for(
                 By.XPATH, "//input[@id='input_password']"
             ).send_keys(PASSWORD)
-            self.driver.find_element(
+            self.wait_for(
                 By.XPATH, "//button//span[contains(text(), 'Sign in')]"
             ).click()
-            self.driver.implicitly_wait(2)
-            self.driver.find_element(By.XPATH, "//span[@id='account_pulldown']").click()
-            self.driver.find_element(
+            self.wait_for(By.XPATH, "//span[@id='account_pulldown']").click()
+            self.wait_for(
                 By.XPATH, "//a[@class='popup_menu_item'][contains(text(),'Account details')]"
             ).click()
 
-            self.driver.implicitly_wait(2)
-            body = self.driver.find_element(By.XPATH, "//body").get_attribute("innerText")
-            print(body)
+            body = self.page_text()
+            LOG.debug("page body", body=body)
         except WebDriverException:
             self.driver.close()
             self.driver.quit()
             raise WebDriverException
         return body
 
+    @scenario("https://store.steampowered.com", load="eager")
     def steam_element_state(self):
         """
         :return: search result from steam website
         """
         base_url = "https://store.steampowered.com"
         self.driver.maximize_window()
-        self.driver.get(base_url)
-        self.driver.implicitly_wait(1)
+        self.navigate(base_url)
         try:
-            elems = self.driver.find_elements(By.XPATH, "//a")
+            elems = self.query_elements(By.XPATH, "//a", ["enabled", "displayed", "innerText"])
             for ele in elems:
-                if ele.is_enabled() and ele.is_displayed():
-                    print(ele.get_attribute("innerText").strip())
+                if ele["enabled"] and ele["displayed"]:
+                    LOG.debug("element", sample=True, text=ele["innerText"].strip())
 
-            self.driver.implicitly_wait(4)
-            body = self.driver.find_element(By.XPATH, "//body").get_attribute("innerText")
-            print(body)
+            body = self.page_text()
+            LOG.debug("page body", body=body)
         except WebDriverException:
             self.driver.close()
             self.driver.quit()
             raise WebDriverException
         return body
 
+    @scenario("https://store.steampowered.com/search", writes=True)
     def steam_radio_checkbox(self):
         """
         :return: search result from steam website
         """
         base_url = "https://store.steampowered.com/search"
         self.driver.maximize_window()
-        self.driver.get(base_url)
-        self.driver.implicitly_wait(1)
+        self.navigate(base_url)
+        self.mark_dirty()
         try:
-            tags = self.driver.find_elements(By.XPATH, "//div[@id='narrow_category1']//div")
-            print("tags: " + str(len(tags)))
-            tag_see_all = self.driver.find_element(
+            tags = self.wait_for_elements(By.XPATH, "//div[@id='narrow_category1']//div")
+            LOG.debug("tags", count=len(tags))
+            tag_see_all = self.wait_for(
                 By.XPATH, "//div[@id='additional_search_options']//div[2]//a[1]")
-            self.driver.implicitly_wait(1)
             tag_see_all.click()
+            self.watch(By.XPATH, "//div[@id='search_results']")
             for tag in tags:
                 if tag.is_enabled() and tag.is_displayed():
-                    self.driver.implicitly_wait(1)
                     tag.click()
-                    self.driver.implicitly_wait(1)
-                    body = self.driver.find_element(
+                    self.settle(By.XPATH, "//div[@id='search_results']")
+                    body = self.cached(
                         By.XPATH, "//div[@id='search_results']").get_attribute("innerText")
-                    print(body)
+                    LOG.debug("search results", sample=True, body=body)
                     if tag.is_selected():
                         tag.click()
 
-            self.driver.implicitly_wait(1)
-            body = self.driver.find_element(By.XPATH, "//body").get_attribute("innerText")
-            print(body)
+            body = self.page_text()
+            LOG.debug("page body", body=body)
         except WebDriverException:
             self.driver.close()
             self.driver.quit()
             raise WebDriverException
         return body
 
+    @scenario("https://store.steampowered.com/search", writes=True)
     def steam_element_list(self):
         """
         :return: search result from steam website
         """
         base_url = "https://store.steampowered.com/search"
         self.driver.maximize_window()
-        self.driver.get(base_url)
-        self.driver.implicitly_wait(1)
+        self.navigate(base_url)
+        self.mark_dirty()
         try:
-            tags = self.driver.find_elements(
+            tags = self.wait_for_elements(
                 By.XPATH,
                 "//div[contains(text(),'Narrow by number of "
                 "players')]/../following-sibling::div//div")
-            print("tags: " + str(len(tags)))
-            self.driver.implicitly_wait(1)
+            LOG.debug("tags", count=len(tags))
+            self.watch(By.XPATH, "//div[@id='search_results']")
             for tag in tags:
                 if tag.is_enabled() and tag.is_displayed():
-                    self.driver.implicitly_wait(1)
                     tag.click()
-                    self.driver.implicitly_wait(1)
-                    body = self.driver.find_element(
+                    self.settle(By.XPATH, "//div[@id='search_results']")
+                    body = self.cached(
                         By.XPATH, "//div[@id='search_results']").get_attribute("innerText")
-                    print(body)
+                    LOG.debug("search results", sample=True, body=body)
                     if tag.is_selected():
                         tag.click()
 
-            self.driver.implicitly_wait(1)
-            body = self.driver.find_element(By.XPATH, "//body").get_attribute("innerText")
-            print(body)
+            body = self.page_text()
+            LOG.debug("page body", body=body)
         except WebDriverException:
             self.driver.close()
             self.driver.quit()
             raise WebDriverException
         return body
 
+    @scenario("https://store.steampowered.com/search", writes=True)
     def steam_dropdown_element(self):
         """
         :return: search result from steam website
         """
         base_url = "https://store.steampowered.com/search"
         self.driver.maximize_window()
-        self.driver.get(base_url)
-        self.driver.implicitly_wait(1)
+        self.navigate(base_url)
+        self.mark_dirty()
         try:
             action = ActionChains(self.driver)
-            first_menu = self.driver.find_element(By.XPATH, "//a[contains(text(),'STORE')]")
+            first_menu = self.wait_for(By.XPATH, "//a[contains(text(),'STORE')]")
             action.move_to_element(first_menu).perform()
-            second_menu = self.driver.find_element(
+            second_menu = self.wait_for(
                 By.XPATH, "//div[@class='supernav_content']//a[contains(text(),'Stats')]")
             second_menu.click()
 
-            self.driver.implicitly_wait(1)
-            body = self.driver.find_element(By.XPATH, "//body").get_attribute("innerText")
-            print(body)
+            body = self.page_text()
+            LOG.debug("page body", body=body)
         except WebDriverException:
             self.driver.close()
             self.driver.quit()
             raise WebDriverException
         return body
 
+    @scenario("https://store.steampowered.com/search", load="eager",
+              ready=(By.ID, "search_results"))
     def steam_hidden_elements(self):
         """
         :return: search result from steam website
         """
         base_url = "https://store.steampowered.com/search"
         self.driver.maximize_window()
-        self.driver.get(base_url)
-        self.driver.implicitly_wait(1)
+        self.navigate(base_url)
         try:
-            eles = self.driver.find_elements(By.XPATH, "//html//*[string-length(text())>0]")
+            eles = self.query_elements(
+                By.XPATH, "//html//*[string-length(text())>0]", ["displayed", "innerText"])
             for ele in eles:
-                if ele.is_displayed():
-                    print(ele.get_attribute("innerText"))
+                if ele["displayed"]:
+                    LOG.debug("element", sample=True, text=ele["innerText"])
 
-            self.driver.implicitly_wait(1)
-            body = self.driver.find_element(By.XPATH, "//body").get_attribute("innerText")
-            print(body)
+            body = self.page_text()
+            LOG.debug("page body", body=body)
         except WebDriverException:
             self.driver.close()
             self.driver.quit()
@@ -287,4 +326,5 @@ if __name__ == '__main__':
     START = time.time()
     HAND = handler('main', 'main')
     END = time.time()
-    print("Time spent operating this lambda function: " + str(END - START) + " seconds")
+    print("Time spent operating this lambda function: " + str(END - START) + " seconds",
+          file=sys.stderr)